@@ -0,0 +1,32 @@
+"""add running state to run_analytics
+
+Revision ID: 5b8e2f0c7a41
+Revises: 3c1d9b7e4a10
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b8e2f0c7a41'
+down_revision: Union[str, Sequence[str], None] = '3c1d9b7e4a10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column(
+        'run_analytics',
+        sa.Column('running_state_json', postgresql.JSON(astext_type=sa.Text()), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('run_analytics', 'running_state_json')
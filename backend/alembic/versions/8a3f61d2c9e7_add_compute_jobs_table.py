@@ -0,0 +1,53 @@
+"""add compute_jobs table
+
+Revision ID: 8a3f61d2c9e7
+Revises: 5b8e2f0c7a41
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8a3f61d2c9e7'
+down_revision: Union[str, Sequence[str], None] = '5b8e2f0c7a41'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('compute_jobs',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('node_type', sa.String(length=20), nullable=False),
+    sa.Column('node_id', sa.UUID(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('progress', sa.Float(), nullable=False),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_compute_jobs_user_id', 'compute_jobs', ['user_id'], unique=False)
+    op.create_index('ix_compute_jobs_status_created_at', 'compute_jobs', ['status', 'created_at'], unique=False)
+    op.create_index(
+        'uq_compute_jobs_queued_node',
+        'compute_jobs',
+        ['user_id', 'node_type', 'node_id'],
+        unique=True,
+        postgresql_where=sa.text("status = 'queued'"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('uq_compute_jobs_queued_node', table_name='compute_jobs')
+    op.drop_index('ix_compute_jobs_status_created_at', table_name='compute_jobs')
+    op.drop_index('ix_compute_jobs_user_id', table_name='compute_jobs')
+    op.drop_table('compute_jobs')
@@ -0,0 +1,32 @@
+"""add simulation_results retention index
+
+Revision ID: a5d7f9b1c3e6
+Revises: f3c5e7a9b1d4
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a5d7f9b1c3e6'
+down_revision: Union[str, Sequence[str], None] = 'f3c5e7a9b1d4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_simulation_results_user_id_engine_created_at',
+        'simulation_results',
+        ['user_id', 'engine', 'created_at'],
+        unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_simulation_results_user_id_engine_created_at', table_name='simulation_results')
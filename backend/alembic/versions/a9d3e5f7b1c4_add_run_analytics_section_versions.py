@@ -0,0 +1,33 @@
+"""add per-section versions to run analytics
+
+Revision ID: a9d3e5f7b1c4
+Revises: f7a1c3e5b9d2
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a9d3e5f7b1c4'
+down_revision: Union[str, Sequence[str], None] = 'f7a1c3e5b9d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # NULL: all sections were computed together at input_version
+    op.add_column(
+        'run_analytics',
+        sa.Column('section_versions_json', postgresql.JSON(astext_type=sa.Text()), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('run_analytics', 'section_versions_json')
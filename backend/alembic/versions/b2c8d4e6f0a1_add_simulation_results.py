@@ -0,0 +1,38 @@
+"""add simulation_results table
+
+Revision ID: b2c8d4e6f0a1
+Revises: a9d3e5f7b1c4
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b2c8d4e6f0a1'
+down_revision: Union[str, Sequence[str], None] = 'a9d3e5f7b1c4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('simulation_results',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('key', sa.String(length=64), nullable=False),
+    sa.Column('engine', sa.String(length=30), nullable=False),
+    sa.Column('result_json', sa.JSON(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'key', name='uq_simulation_results_user_id_key')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('simulation_results')
@@ -0,0 +1,34 @@
+"""add equity level bucket size
+
+Revision ID: b7e9a1c3d5f8
+Revises: a5d7f9b1c3e6
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7e9a1c3d5f8'
+down_revision: Union[str, Sequence[str], None] = 'a5d7f9b1c3e6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('run_equity_levels', sa.Column('bucket_size', sa.Integer(), nullable=True))
+    # existing levels were downsampled into resolution / 3 equal buckets
+    op.execute(
+        "UPDATE run_equity_levels "
+        "SET bucket_size = (source_count + resolution / 3 - 1) / (resolution / 3)"
+    )
+    op.alter_column('run_equity_levels', 'bucket_size', nullable=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('run_equity_levels', 'bucket_size')
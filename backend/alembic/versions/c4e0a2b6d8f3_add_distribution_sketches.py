@@ -0,0 +1,38 @@
+"""add distribution sketches to analytics snapshots
+
+Revision ID: c4e0a2b6d8f3
+Revises: b2c8d4e6f0a1
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e0a2b6d8f3'
+down_revision: Union[str, Sequence[str], None] = 'b2c8d4e6f0a1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+TABLES = ('run_analytics', 'variant_analytics', 'strategy_analytics', 'portfolio_analytics')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # NULL until the next metrics compute of the node
+    for table in TABLES:
+        op.add_column(
+            table,
+            sa.Column('distribution_json', postgresql.JSON(astext_type=sa.Text()), nullable=True),
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in TABLES:
+        op.drop_column(table, 'distribution_json')
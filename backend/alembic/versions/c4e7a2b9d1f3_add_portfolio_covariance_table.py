@@ -0,0 +1,44 @@
+"""add portfolio_covariance table
+
+Revision ID: c4e7a2b9d1f3
+Revises: 8a3f61d2c9e7
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e7a2b9d1f3'
+down_revision: Union[str, Sequence[str], None] = '8a3f61d2c9e7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('portfolio_covariance',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('portfolio_id', sa.UUID(), nullable=False),
+    sa.Column('strategy_versions_json', sa.JSON(), nullable=False),
+    sa.Column('bucket', sa.String(length=10), nullable=False),
+    sa.Column('day0', sa.Integer(), nullable=False),
+    sa.Column('data', sa.LargeBinary(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['portfolio_id'], ['portfolios.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('portfolio_id', name='uq_portfolio_covariance_portfolio_id')
+    )
+    op.create_index('ix_portfolio_covariance_user_id', 'portfolio_covariance', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_portfolio_covariance_user_id', table_name='portfolio_covariance')
+    op.drop_table('portfolio_covariance')
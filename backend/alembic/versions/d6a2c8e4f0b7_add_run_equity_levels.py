@@ -0,0 +1,43 @@
+"""add run_equity_levels table
+
+Revision ID: d6a2c8e4f0b7
+Revises: c4e0a2b6d8f3
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd6a2c8e4f0b7'
+down_revision: Union[str, Sequence[str], None] = 'c4e0a2b6d8f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('run_equity_levels',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('user_id', sa.UUID(), nullable=False),
+    sa.Column('run_id', sa.UUID(), nullable=False),
+    sa.Column('resolution', sa.Integer(), nullable=False),
+    sa.Column('point_count', sa.Integer(), nullable=False),
+    sa.Column('source_count', sa.Integer(), nullable=False),
+    sa.Column('data', sa.LargeBinary(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['run_id'], ['runs.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('run_id', 'resolution', name='uq_run_equity_levels_run_id_resolution')
+    )
+    op.create_index('ix_run_equity_levels_user_id', 'run_equity_levels', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_run_equity_levels_user_id', table_name='run_equity_levels')
+    op.drop_table('run_equity_levels')
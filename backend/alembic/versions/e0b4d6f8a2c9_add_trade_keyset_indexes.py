@@ -0,0 +1,29 @@
+"""add keyset indexes for trade listings
+
+Revision ID: e0b4d6f8a2c9
+Revises: d6a2c8e4f0b7
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e0b4d6f8a2c9'
+down_revision: Union[str, Sequence[str], None] = 'd6a2c8e4f0b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index('ix_trades_user_id_timestamp_id', 'trades', ['user_id', 'timestamp', 'id'], unique=False)
+    op.create_index('ix_trades_run_id_timestamp_id', 'trades', ['run_id', 'timestamp', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_trades_run_id_timestamp_id', table_name='trades')
+    op.drop_index('ix_trades_user_id_timestamp_id', table_name='trades')
@@ -0,0 +1,38 @@
+"""add rollup stats to run, variant and strategy analytics
+
+Revision ID: e2b6f4a8c0d5
+Revises: c4e7a2b9d1f3
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2b6f4a8c0d5'
+down_revision: Union[str, Sequence[str], None] = 'c4e7a2b9d1f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in ('run_analytics', 'variant_analytics', 'strategy_analytics'):
+        op.add_column(
+            table,
+            sa.Column('rollup_stats_json', postgresql.JSON(astext_type=sa.Text()), nullable=True),
+        )
+
+    # existing roll-ups have no stats yet; rebuild them on next compute
+    op.execute("UPDATE variant_analytics SET is_dirty = true")
+    op.execute("UPDATE strategy_analytics SET is_dirty = true")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in ('strategy_analytics', 'variant_analytics', 'run_analytics'):
+        op.drop_column(table, 'rollup_stats_json')
@@ -0,0 +1,32 @@
+"""add compute job leases
+
+Revision ID: f3c5e7a9b1d4
+Revises: e0b4d6f8a2c9
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3c5e7a9b1d4'
+down_revision: Union[str, Sequence[str], None] = 'e0b4d6f8a2c9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('compute_jobs', sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+    op.add_column('compute_jobs', sa.Column('attempts', sa.Integer(), server_default='0', nullable=False))
+    # jobs already running get a lease from their start time
+    op.execute("UPDATE compute_jobs SET heartbeat_at = started_at, attempts = 1 WHERE status = 'running'")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('compute_jobs', 'attempts')
+    op.drop_column('compute_jobs', 'heartbeat_at')
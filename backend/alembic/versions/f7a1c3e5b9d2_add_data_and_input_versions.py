@@ -0,0 +1,49 @@
+"""add data_version to hierarchy nodes and input_version to snapshots
+
+Revision ID: f7a1c3e5b9d2
+Revises: e2b6f4a8c0d5
+Create Date: 2026-10-18
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f7a1c3e5b9d2'
+down_revision: Union[str, Sequence[str], None] = 'e2b6f4a8c0d5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+NODE_TABLES = ('runs', 'variants', 'strategies', 'portfolios')
+SNAPSHOT_TABLES = ('run_analytics', 'variant_analytics', 'strategy_analytics', 'portfolio_analytics')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table in NODE_TABLES:
+        op.add_column(table, sa.Column('data_version', sa.Integer(), server_default='0', nullable=False))
+
+    for table in SNAPSHOT_TABLES:
+        op.add_column(table, sa.Column('input_version', sa.Integer(), server_default='0', nullable=False))
+
+    # snapshots already flagged dirty start out stale
+    op.execute("UPDATE run_analytics SET input_version = -1 WHERE is_dirty")
+    op.execute("UPDATE variant_analytics SET input_version = -1 WHERE is_dirty")
+    op.execute("UPDATE strategy_analytics SET input_version = -1 WHERE is_dirty")
+    op.execute(
+        "UPDATE portfolio_analytics SET input_version = -1 "
+        "WHERE id IN (SELECT id FROM portfolios WHERE is_dirty)"
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in SNAPSHOT_TABLES:
+        op.drop_column(table, 'input_version')
+
+    for table in NODE_TABLES:
+        op.drop_column(table, 'data_version')
@@ -0,0 +1,220 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from sqlalchemy.orm import Session
+from edge_lab.analytics.portfolio_equity import PortfolioEquityEngine
+
+
+class AllocationEngine:
+    """
+    Portfolio weights from the cached daily covariance snapshot
+    (CovarianceEngine).
+
+    Trade streams for the equity path are cached per portfolio, keyed on
+    the strategy snapshots' updated_at, so re-weighting never reloads
+    trades or recomputes child analytics. The cache is bounded by bytes
+    and shared across threads under a lock.
+    """
+
+    MODES = (
+        "equal_weight",
+        "inverse_vol",
+        "risk_parity",
+        "kelly",
+        "min_variance",
+    )
+
+    DEFAULT_CONFIG = {
+        "kelly_fraction": 0.5,
+        "max_weight": 1.0,
+    }
+
+    CACHE_BYTES = 128_000_000
+
+    _cache: OrderedDict = OrderedDict()
+    _cache_lock = threading.Lock()
+
+    @staticmethod
+    def cached_streams(
+        db: Session,
+        user_id,
+        portfolio_id,
+        strategy_snapshots: list,
+    ) -> list[tuple[np.ndarray, np.ndarray]]:
+        """
+        Trade streams for the snapshots, aligned with their order.
+        """
+        strategy_ids = [s.strategy_id for s in strategy_snapshots]
+        fingerprint = tuple((s.strategy_id, s.updated_at) for s in strategy_snapshots)
+
+        key = (user_id, portfolio_id)
+
+        with AllocationEngine._cache_lock:
+            cached = AllocationEngine._cache.get(key)
+            if cached and cached[0] == fingerprint:
+                AllocationEngine._cache.move_to_end(key)
+                return cached[1]
+
+        streams = PortfolioEquityEngine.load_streams(db, user_id, strategy_ids)
+
+        nbytes = sum(ts.nbytes + r.nbytes for ts, r in streams)
+        if nbytes > AllocationEngine.CACHE_BYTES:
+            return streams
+
+        with AllocationEngine._cache_lock:
+            AllocationEngine._cache.pop(key, None)
+            total = sum(entry[2] for entry in AllocationEngine._cache.values())
+            while AllocationEngine._cache and total + nbytes > AllocationEngine.CACHE_BYTES:
+                _, (_, _, evicted) = AllocationEngine._cache.popitem(last=False)
+                total -= evicted
+            AllocationEngine._cache[key] = (fingerprint, streams, nbytes)
+
+        return streams
+
+    # -----------------------------
+    # WEIGHTS
+    # -----------------------------
+    @staticmethod
+    def weights(
+        mode: str,
+        cov: np.ndarray | None,
+        mean: np.ndarray,
+        config: dict | None = None,
+    ) -> np.ndarray:
+        """
+        cov is None when there is too little history; every mode then
+        falls back to equal weight.
+        """
+        if mode not in AllocationEngine.MODES:
+            raise ValueError(
+                f"Unknown allocation mode '{mode}'. Use one of: {', '.join(AllocationEngine.MODES)}."
+            )
+
+        config = {**AllocationEngine.DEFAULT_CONFIG, **(config or {})}
+        n = mean.size
+
+        if n == 0:
+            return np.zeros(0)
+
+        if mode == "equal_weight" or cov is None:
+            return np.full(n, 1 / n)
+
+        cov = AllocationEngine.regularize(cov)
+
+        if mode == "inverse_vol":
+            w = AllocationEngine.inverse_vol(cov)
+        elif mode == "risk_parity":
+            w = AllocationEngine.risk_parity(cov)
+        elif mode == "min_variance":
+            w = AllocationEngine.min_variance(cov)
+        else:
+            return AllocationEngine.kelly(
+                cov,
+                mean,
+                fraction=float(config["kelly_fraction"]),
+                max_weight=float(config["max_weight"]),
+            )
+
+        return AllocationEngine.cap(w, float(config["max_weight"]))
+
+    @staticmethod
+    def regularize(cov: np.ndarray) -> np.ndarray:
+        # small ridge keeps flat or collinear strategies solvable
+        ridge = 1e-10 + 1e-8 * np.trace(cov) / cov.shape[0]
+        return cov + ridge * np.eye(cov.shape[0])
+
+    @staticmethod
+    def inverse_vol(cov: np.ndarray) -> np.ndarray:
+        inv = 1 / np.sqrt(np.diag(cov))
+        return inv / inv.sum()
+
+    @staticmethod
+    def risk_parity(cov: np.ndarray, tol: float = 1e-10, max_iter: int = 100) -> np.ndarray:
+        """
+        Equal risk contributions: Newton on 1/2 x'Cx - sum(log x / n),
+        whose optimum normalised to sum 1 has w_i (Cw)_i equal for all i.
+        """
+        n = cov.shape[0]
+        b = np.full(n, 1 / n)
+        x = 1 / np.sqrt(np.diag(cov))
+        x /= np.sqrt(x @ cov @ x)
+
+        for _ in range(max_iter):
+            grad = cov @ x - b / x
+            if np.abs(grad).max() < tol:
+                break
+            hess = cov + np.diag(b / x ** 2)
+            step = np.linalg.solve(hess, grad)
+
+            # damp to stay in the positive orthant
+            t = 1.0
+            while np.any(x - t * step <= 0):
+                t *= 0.5
+            x = x - t * step
+
+        return x / x.sum()
+
+    @staticmethod
+    def min_variance(cov: np.ndarray) -> np.ndarray:
+        """
+        Long-only minimum variance by active set: solve C w = 1 on the
+        free strategies, drop any that go negative, repeat.
+        """
+        n = cov.shape[0]
+        active = np.ones(n, dtype=bool)
+        w = np.zeros(n)
+
+        while active.any():
+            sub = np.linalg.solve(cov[np.ix_(active, active)], np.ones(active.sum()))
+            if np.all(sub >= 0):
+                w[:] = 0
+                w[active] = sub
+                break
+            idx = np.flatnonzero(active)
+            active[idx[sub < 0]] = False
+
+        if w.sum() <= 0:
+            return np.full(n, 1 / n)
+
+        return w / w.sum()
+
+    @staticmethod
+    def kelly(
+        cov: np.ndarray,
+        mean: np.ndarray,
+        fraction: float = 0.5,
+        max_weight: float = 1.0,
+    ) -> np.ndarray:
+        """
+        Fractional multivariate Kelly C^-1 mu, long-only and capped per
+        strategy. Weights are scaled down to sum at most 1; the rest is cash.
+        """
+        f = fraction * np.linalg.solve(cov, mean)
+        f = np.clip(f, 0.0, max_weight)
+
+        total = f.sum()
+        if total > 1:
+            f = f / total
+
+        return f
+
+    @staticmethod
+    def cap(w: np.ndarray, max_weight: float) -> np.ndarray:
+        """
+        Clip to max_weight and hand the excess to uncapped strategies.
+        """
+        if max_weight >= 1 or max_weight * w.size < 1:
+            return w
+
+        w = w.copy()
+        for _ in range(w.size):
+            over = w > max_weight
+            if not over.any():
+                break
+            excess = (w[over] - max_weight).sum()
+            w[over] = max_weight
+            free = w < max_weight
+            w[free] += excess * w[free] / w[free].sum()
+
+        return w
@@ -0,0 +1,221 @@
+import io
+from statistics import NormalDist
+
+import numpy as np
+from sqlalchemy.orm import Session
+from edge_lab.persistence.models import PortfolioCovariance
+from edge_lab.analytics.portfolio_equity import PortfolioEquityEngine
+
+
+class CovarianceEngine:
+    """
+    Per-portfolio covariance of daily strategy returns.
+
+    The snapshot stores the calendar-day return matrix (days x strategies,
+    1% risk per trade, zero on days without trades) together with its
+    cross products X'X and column sums. When a strategy snapshot changes
+    only that strategy's trades are reloaded and only its column of X and
+    its row/column of X'X are recomputed; covariance is derived on read.
+    """
+
+    BUCKET = "1D"
+
+    # -----------------------------
+    # BLOB
+    # -----------------------------
+    @staticmethod
+    def pack(matrix: np.ndarray, cross: np.ndarray, sums: np.ndarray) -> bytes:
+        buffer = io.BytesIO()
+        np.savez_compressed(buffer, matrix=matrix, cross=cross, sums=sums)
+        return buffer.getvalue()
+
+    @staticmethod
+    def unpack(data: bytes) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        with np.load(io.BytesIO(data), allow_pickle=False) as f:
+            return f["matrix"], f["cross"], f["sums"]
+
+    # -----------------------------
+    # DAILY BUCKETS
+    # -----------------------------
+    @staticmethod
+    def daily_column(timestamps: np.ndarray, r_values: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        (days since epoch, summed 1%-risk return) per trading day.
+        """
+        days = timestamps.astype("datetime64[D]").astype(np.int64)
+        unique, inverse = np.unique(days, return_inverse=True)
+        sums = np.bincount(
+            inverse,
+            weights=PortfolioEquityEngine.BASE_RISK_FRACTION * r_values,
+            minlength=unique.size,
+        )
+        return unique, sums
+
+    # -----------------------------
+    # SYNC (INCREMENTAL)
+    # -----------------------------
+    @staticmethod
+    def sync(
+        db: Session,
+        user_id,
+        portfolio_id,
+        strategy_snapshots: list,
+    ) -> PortfolioCovariance:
+        """
+        Bring the snapshot in line with the given strategy snapshots
+        (matrix order follows the list). Caller commits.
+        """
+        versions = [
+            [str(s.strategy_id), s.updated_at.isoformat()]
+            for s in strategy_snapshots
+        ]
+
+        row = (
+            db.query(PortfolioCovariance)
+            .filter(
+                PortfolioCovariance.user_id == user_id,
+                PortfolioCovariance.portfolio_id == portfolio_id,
+            )
+            .first()
+        )
+
+        if row and row.strategy_versions_json == versions:
+            return row
+
+        n = len(versions)
+
+        if row:
+            old_matrix, old_cross, old_sums = CovarianceEngine.unpack(row.data)
+            old_index = {sid: i for i, (sid, _) in enumerate(row.strategy_versions_json)}
+            old_versions = dict(map(tuple, row.strategy_versions_json))
+            day0 = row.day0
+        else:
+            old_matrix, old_cross, old_sums = np.zeros((0, 0)), np.zeros((0, 0)), np.zeros(0)
+            old_index, old_versions = {}, {}
+            day0 = 0
+
+        # carry unchanged strategies over into the new column order
+        matrix = np.zeros((old_matrix.shape[0], n))
+        cross = np.zeros((n, n))
+        sums = np.zeros(n)
+
+        kept = [(j, old_index[sid]) for j, (sid, _) in enumerate(versions) if sid in old_index]
+        if kept:
+            new_pos, old_pos = map(list, zip(*kept))
+            matrix[:, new_pos] = old_matrix[:, old_pos]
+            cross[np.ix_(new_pos, new_pos)] = old_cross[np.ix_(old_pos, old_pos)]
+            sums[new_pos] = old_sums[old_pos]
+
+        changed = [
+            j for j, (sid, version) in enumerate(versions)
+            if old_versions.get(sid) != version
+        ]
+
+        streams = PortfolioEquityEngine.load_streams(
+            db,
+            user_id,
+            [strategy_snapshots[j].strategy_id for j in changed],
+        )
+
+        for j, (timestamps, r_values) in zip(changed, streams):
+            days, values = CovarianceEngine.daily_column(timestamps, r_values)
+
+            if days.size:
+                if matrix.shape[0] == 0:
+                    day0 = int(days[0])
+                top = max(day0 - int(days[0]), 0)
+                bottom = max(int(days[-1]) - (day0 + matrix.shape[0] - 1), 0)
+                if top or bottom:
+                    matrix = np.pad(matrix, ((top, bottom), (0, 0)))
+                    day0 -= top
+
+            column = np.zeros(matrix.shape[0])
+            column[days - day0] = values
+
+            matrix[:, j] = column
+            products = matrix.T @ column
+            cross[j, :] = products
+            cross[:, j] = products
+            sums[j] = column.sum()
+
+        # trim days no strategy trades on any more, so the grid matches a rebuild
+        active = np.flatnonzero(np.any(matrix != 0, axis=1))
+        if active.size:
+            matrix = matrix[active[0]:active[-1] + 1]
+            day0 += int(active[0])
+        else:
+            matrix = np.zeros((0, n))
+            day0 = 0
+
+        data = CovarianceEngine.pack(matrix, cross, sums)
+
+        if row:
+            row.strategy_versions_json = versions
+            row.day0 = day0
+            row.data = data
+        else:
+            row = PortfolioCovariance(
+                user_id=user_id,
+                portfolio_id=portfolio_id,
+                strategy_versions_json=versions,
+                bucket=CovarianceEngine.BUCKET,
+                day0=day0,
+                data=data,
+            )
+            db.add(row)
+
+        return row
+
+    # -----------------------------
+    # READ
+    # -----------------------------
+    @staticmethod
+    def stats(row: PortfolioCovariance) -> dict:
+        """
+        Mean, covariance and correlation of daily returns; covariance and
+        correlation are None with fewer than two days.
+        """
+        matrix, cross, sums = CovarianceEngine.unpack(row.data)
+        days = matrix.shape[0]
+
+        result = {
+            "strategy_ids": [sid for sid, _ in row.strategy_versions_json],
+            "n_obs": days,
+            "mean": sums / days if days else np.zeros(sums.size),
+            "covariance": None,
+            "correlation": None,
+        }
+
+        if days < 2:
+            return result
+
+        cov = (cross - np.outer(sums, sums) / days) / (days - 1)
+        sd = np.sqrt(np.clip(np.diag(cov), 0, None))
+        denom = np.outer(sd, sd)
+        corr = np.divide(cov, denom, out=np.zeros_like(cov), where=denom > 0)
+        np.fill_diagonal(corr, 1.0)
+
+        result["covariance"] = cov
+        result["correlation"] = corr
+        return result
+
+    @staticmethod
+    def diversification_ratio(weights: np.ndarray, cov: np.ndarray) -> float | None:
+        variance = float(weights @ cov @ weights)
+        if variance <= 0:
+            return None
+        return float(weights @ np.sqrt(np.clip(np.diag(cov), 0, None)) / np.sqrt(variance))
+
+    @staticmethod
+    def value_at_risk(
+        weights: np.ndarray,
+        mean: np.ndarray,
+        cov: np.ndarray,
+        confidence: float = 0.95,
+    ) -> float:
+        """
+        Parametric one-day VaR as a positive fraction of equity.
+        """
+        z = NormalDist().inv_cdf(confidence)
+        sigma = np.sqrt(max(float(weights @ cov @ weights), 0.0))
+        return float(z * sigma - weights @ mean)
@@ -0,0 +1,183 @@
+import math
+
+import numpy as np
+
+
+class DistributionSketch:
+    """
+    Mergeable R-multiple distribution summaries.
+
+    A fixed-grid histogram (the same bin edges for every run, so parents
+    add counts) and a merging t-digest for quantiles. Both combine across
+    runs, variants, strategies and portfolios without reading trades.
+
+    Stored layout (distribution_json):
+        {"histogram": {"counts": [...], "underflow": int, "overflow": int},
+         "digest": {"centroids": [[mean, weight], ...]},
+         "count": int, "min": float, "max": float}
+    """
+
+    BIN_MIN = -10.0
+    BIN_MAX = 20.0
+    BIN_WIDTH = 0.25
+
+    # t-digest compression (delta); ~delta/2 centroids at most
+    COMPRESSION = 200
+
+    QUANTILES = (0.01, 0.05, 0.1, 0.25, 0.5, 0.75, 0.9, 0.95, 0.99)
+
+    # -----------------------------
+    # BUILD
+    # -----------------------------
+    @staticmethod
+    def bin_count() -> int:
+        return int(round((DistributionSketch.BIN_MAX - DistributionSketch.BIN_MIN) / DistributionSketch.BIN_WIDTH))
+
+    @staticmethod
+    def from_r(r_values: np.ndarray) -> dict | None:
+        if r_values.size == 0:
+            return None
+
+        r_values = np.asarray(r_values, dtype=np.float64)
+        n_bins = DistributionSketch.bin_count()
+
+        idx = np.floor((r_values - DistributionSketch.BIN_MIN) / DistributionSketch.BIN_WIDTH).astype(np.int64)
+        inside = (idx >= 0) & (idx < n_bins)
+
+        counts = np.bincount(idx[inside], minlength=n_bins)
+
+        return {
+            "histogram": {
+                "counts": counts.tolist(),
+                "underflow": int(np.sum(idx < 0)),
+                "overflow": int(np.sum(idx >= n_bins)),
+            },
+            "digest": {
+                "centroids": DistributionSketch._compress(r_values, np.ones(r_values.size)),
+            },
+            "count": int(r_values.size),
+            "min": float(r_values.min()),
+            "max": float(r_values.max()),
+        }
+
+    # -----------------------------
+    # MERGE
+    # -----------------------------
+    @staticmethod
+    def merge(sketches: list) -> dict | None:
+        """
+        Combine child sketches; None entries (children without one) are skipped.
+        """
+        sketches = [s for s in sketches if s]
+        if not sketches:
+            return None
+
+        counts = np.sum([s["histogram"]["counts"] for s in sketches], axis=0)
+
+        centroids = np.array(
+            [c for s in sketches for c in s["digest"]["centroids"]],
+            dtype=np.float64,
+        )
+
+        return {
+            "histogram": {
+                "counts": counts.astype(np.int64).tolist(),
+                "underflow": sum(s["histogram"]["underflow"] for s in sketches),
+                "overflow": sum(s["histogram"]["overflow"] for s in sketches),
+            },
+            "digest": {
+                "centroids": DistributionSketch._compress(centroids[:, 0], centroids[:, 1]),
+            },
+            "count": sum(s["count"] for s in sketches),
+            "min": min(s["min"] for s in sketches),
+            "max": max(s["max"] for s in sketches),
+        }
+
+    @staticmethod
+    def _compress(means: np.ndarray, weights: np.ndarray) -> list:
+        """
+        One merging pass (k1 scale function): walk points in sorted order
+        and fold each into the current centroid while it stays within one
+        unit of k, so centroids are small in the tails and large mid-range.
+        """
+        delta = DistributionSketch.COMPRESSION
+
+        def k(q):
+            return delta / (2 * math.pi) * math.asin(2 * q - 1)
+
+        def k_inv(x):
+            return (math.sin(2 * math.pi * x / delta) + 1) / 2
+
+        order = np.argsort(means, kind="stable")
+        means = means[order]
+        weights = weights[order]
+        total = float(weights.sum())
+
+        out = []
+        cur_mean, cur_weight = float(means[0]), float(weights[0])
+        q0 = 0.0
+        q_limit = k_inv(min(k(q0) + 1, delta / 4))
+
+        for m, w in zip(means[1:].tolist(), weights[1:].tolist()):
+            if q0 + (cur_weight + w) / total <= q_limit:
+                cur_weight += w
+                cur_mean += (m - cur_mean) * w / cur_weight
+            else:
+                out.append([cur_mean, cur_weight])
+                q0 += cur_weight / total
+                q_limit = k_inv(min(k(min(q0, 1.0)) + 1, delta / 4))
+                cur_mean, cur_weight = m, w
+
+        out.append([cur_mean, cur_weight])
+        return out
+
+    # -----------------------------
+    # READ
+    # -----------------------------
+    @staticmethod
+    def quantile(sketch: dict, q: float) -> float:
+        """
+        Linear interpolation between centroid centres, anchored at min/max.
+        """
+        centroids = sketch["digest"]["centroids"]
+        total = sum(w for _, w in centroids)
+        target = q * total
+
+        prev_x, prev_c = sketch["min"], 0.0
+        cumulative = 0.0
+
+        for mean, weight in centroids:
+            centre = cumulative + weight / 2
+            if target <= centre:
+                if centre == prev_c:
+                    return mean
+                return prev_x + (mean - prev_x) * (target - prev_c) / (centre - prev_c)
+            prev_x, prev_c = mean, centre
+            cumulative += weight
+
+        if total == prev_c:
+            return sketch["max"]
+        return prev_x + (sketch["max"] - prev_x) * (target - prev_c) / (total - prev_c)
+
+    @staticmethod
+    def view(sketch: dict | None) -> dict | None:
+        """
+        API shape: histogram with bin edges and a fixed set of quantiles.
+        """
+        if not sketch:
+            return None
+
+        return {
+            "count": sketch["count"],
+            "min": sketch["min"],
+            "max": sketch["max"],
+            "histogram": {
+                "bin_min": DistributionSketch.BIN_MIN,
+                "bin_width": DistributionSketch.BIN_WIDTH,
+                **sketch["histogram"],
+            },
+            "quantiles": {
+                f"p{round(q * 100)}": DistributionSketch.quantile(sketch, q)
+                for q in DistributionSketch.QUANTILES
+            },
+        }
@@ -1,7 +1,7 @@
 import numpy as np
 import pandas as pd
 from sqlalchemy.orm import Session
-from edge_lab.persistence.models import Trade
+from edge_lab.analytics.trade_frame import TradeFrame
 
 
 class EquityBuilder:
@@ -14,20 +14,18 @@ class EquityBuilder:
         run_id,
         user_id,
     ):
-        trades = (
-            db.query(Trade)
-            .filter(
-                Trade.run_id == run_id,
-                Trade.user_id == user_id,
-            )
-            .order_by(Trade.created_at)
-            .all()
-        )
-
-        if not trades:
-            raise ValueError("No trades found for run.")
+        frame = TradeFrame.load(db=db, run_id=run_id, user_id=user_id)
+
+        return EquityBuilder.build_from_r(frame.r_multiple)
 
-        r_values = np.array([t.r_multiple for t in trades])
+    @staticmethod
+    def build_from_r(r_values: np.ndarray):
+        """
+        r_values in created_at order.
+        """
+
+        if r_values.size == 0:
+            raise ValueError("No trades found for run.")
 
         returns = EquityBuilder.BASE_RISK_FRACTION * r_values
 
@@ -42,4 +40,4 @@ class EquityBuilder:
         df["peak"] = df["equity"].cummax()
         df["drawdown"] = df["equity"] / df["peak"] - 1
 
-        return df
\ No newline at end of file
+        return df
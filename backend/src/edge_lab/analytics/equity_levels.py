@@ -0,0 +1,252 @@
+from typing import Callable
+
+import numpy as np
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from edge_lab.persistence.models import RunEquityLevel
+
+
+class EquityLevels:
+    """
+    Downsampled run equity curves for chart zoom levels.
+
+    Each level keeps, per bucket of consecutive trades, the points with the
+    lowest and highest equity and the deepest drawdown, so peaks, troughs
+    and the max drawdown survive at every zoom. Levels are stored in
+    run_equity_levels as packed little-endian columns (uint32 trade index,
+    float32 equity, float32 drawdown; 12 bytes per point) and written
+    with the equity section. Curves shorter than a level are not stored at
+    that level; readers fall back to the full equity_json.
+
+    Bucket i of a level covers trade indices [i * bucket_size,
+    (i + 1) * bucket_size). Trade appends fold the new point into the last
+    bucket; once every bucket is full, adjacent buckets merge (bucket_size
+    doubles), which keeps each bucket's extremes exact.
+    """
+
+    RESOLUTIONS = (500, 2000, 8000)
+
+    # points kept per bucket: equity min, equity max, drawdown min
+    POINTS_PER_BUCKET = 3
+
+    # -----------------------------
+    # BLOB
+    # -----------------------------
+    @staticmethod
+    def pack(index: np.ndarray, equity: np.ndarray, drawdown: np.ndarray) -> bytes:
+        return (
+            index.astype("<u4").tobytes()
+            + equity.astype("<f4").tobytes()
+            + drawdown.astype("<f4").tobytes()
+        )
+
+    @staticmethod
+    def unpack(data: bytes, point_count: int) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        index = np.frombuffer(data, dtype="<u4", count=point_count)
+        equity = np.frombuffer(data, dtype="<f4", count=point_count, offset=4 * point_count)
+        drawdown = np.frombuffer(data, dtype="<f4", count=point_count, offset=8 * point_count)
+        return index, equity, drawdown
+
+    # -----------------------------
+    # DOWNSAMPLE
+    # -----------------------------
+    @staticmethod
+    def buckets(resolution: int) -> int:
+        return max(resolution // EquityLevels.POINTS_PER_BUCKET, 1)
+
+    @staticmethod
+    def bucket_size(n: int, resolution: int) -> int:
+        return -(-n // EquityLevels.buckets(resolution))
+
+    @staticmethod
+    def downsample(equity: np.ndarray, drawdown: np.ndarray, resolution: int) -> np.ndarray:
+        """
+        Indices (sorted, first and last included) of at most ~resolution points.
+        """
+        n = equity.size
+        buckets = EquityLevels.buckets(resolution)
+        size = EquityLevels.bucket_size(n, resolution)
+
+        # pad the last bucket by repeating its final point
+        pad = buckets * size - n
+        eq = np.pad(equity, (0, pad), mode="edge").reshape(buckets, size)
+        dd = np.pad(drawdown, (0, pad), mode="edge").reshape(buckets, size)
+
+        offsets = np.arange(buckets) * size
+        picked = np.concatenate([
+            offsets + eq.argmin(axis=1),
+            offsets + eq.argmax(axis=1),
+            offsets + dd.argmin(axis=1),
+            [0, n - 1],
+        ])
+
+        return np.unique(np.minimum(picked, n - 1))
+
+    @staticmethod
+    def pick(index: np.ndarray, equity: np.ndarray, drawdown: np.ndarray, size: int) -> np.ndarray:
+        """
+        Positions (sorted) of the points to keep among already kept points
+        with sorted trade indices: per bucket of `size` trade indices the
+        equity min, equity max and drawdown min, plus the first and last.
+        """
+        group = index // size
+        first = np.searchsorted(group, np.unique(group))
+
+        def per_bucket(key):
+            # stable: ties keep the earliest point, like argmin
+            return np.lexsort((key, group))[first]
+
+        return np.unique(np.concatenate([
+            per_bucket(equity),
+            per_bucket(-equity),
+            per_bucket(drawdown),
+            [0, index.size - 1],
+        ]))
+
+    # -----------------------------
+    # PERSISTENCE
+    # -----------------------------
+    @staticmethod
+    def store(db: Session, user_id, run_id, equity_json: dict) -> None:
+        """
+        Upsert the run's levels on (run_id, resolution) and delete levels
+        the curve no longer reaches, so concurrent stores for the same run
+        never collide on the unique constraint; the caller commits.
+        """
+        equity = np.asarray(equity_json["equity"], dtype=np.float64)
+        drawdown = np.asarray(equity_json["drawdown"], dtype=np.float64)
+
+        rows = []
+        for resolution in EquityLevels.RESOLUTIONS:
+            if equity.size <= resolution:
+                break
+
+            index = EquityLevels.downsample(equity, drawdown, resolution)
+
+            rows.append({
+                "user_id": user_id,
+                "run_id": run_id,
+                "resolution": resolution,
+                "point_count": int(index.size),
+                "source_count": int(equity.size),
+                "bucket_size": EquityLevels.bucket_size(equity.size, resolution),
+                "data": EquityLevels.pack(index, equity[index], drawdown[index]),
+            })
+
+        (
+            db.query(RunEquityLevel)
+            .filter(
+                RunEquityLevel.user_id == user_id,
+                RunEquityLevel.run_id == run_id,
+                RunEquityLevel.resolution.notin_([row["resolution"] for row in rows]),
+            )
+            .delete(synchronize_session=False)
+        )
+
+        if rows:
+            db.execute(EquityLevels._upsert(db, rows))
+
+    @staticmethod
+    def _upsert(db: Session, rows: list[dict]):
+        dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+
+        stmt = dialect.insert(RunEquityLevel).values(rows)
+
+        return stmt.on_conflict_do_update(
+            index_elements=["run_id", "resolution"],
+            set_={
+                "point_count": stmt.excluded.point_count,
+                "source_count": stmt.excluded.source_count,
+                "bucket_size": stmt.excluded.bucket_size,
+                "data": stmt.excluded.data,
+                "created_at": stmt.excluded.created_at,
+            },
+        )
+
+    @staticmethod
+    def append(
+        db: Session,
+        user_id,
+        run_id,
+        index: int,
+        equity: float,
+        drawdown: float,
+        curve: Callable[[], dict],
+    ) -> None:
+        """
+        Fold the point at trade `index` (the curve's new last point) into
+        the stored levels in place; the caller holds the snapshot row lock
+        and commits. Levels the curve just outgrew, or not written from the
+        previous curve, are rebuilt from curve() (the full equity_json).
+        """
+        levels = {
+            level.resolution: level
+            for level in (
+                db.query(RunEquityLevel)
+                .filter(
+                    RunEquityLevel.user_id == user_id,
+                    RunEquityLevel.run_id == run_id,
+                )
+            )
+        }
+
+        for resolution in EquityLevels.RESOLUTIONS:
+            if index + 1 <= resolution:
+                break
+
+            level = levels.get(resolution)
+            if level is None or level.source_count != index:
+                # rare: rewrite every level from the full curve once
+                EquityLevels.store(db, user_id, run_id, curve())
+                return
+
+        for level in levels.values():
+            EquityLevels._fold(level, index, equity, drawdown)
+
+    @staticmethod
+    def _fold(level: RunEquityLevel, index: int, equity: float, drawdown: float) -> None:
+        kept_index, kept_equity, kept_drawdown = EquityLevels.unpack(level.data, level.point_count)
+
+        size = level.bucket_size
+        while index // size >= EquityLevels.buckets(level.resolution):
+            size *= 2
+
+        kept_index = np.append(kept_index.astype(np.int64), index)
+        kept_equity = np.append(kept_equity, np.float32(equity))
+        kept_drawdown = np.append(kept_drawdown, np.float32(drawdown))
+
+        keep = EquityLevels.pick(kept_index, kept_equity, kept_drawdown, size)
+
+        level.data = EquityLevels.pack(kept_index[keep], kept_equity[keep], kept_drawdown[keep])
+        level.point_count = int(keep.size)
+        level.source_count = index + 1
+        level.bucket_size = size
+
+    @staticmethod
+    def load(db: Session, user_id, run_id, resolution: int) -> dict | None:
+        """
+        The smallest stored level with at least `resolution` points, in
+        one row read. None when no level is that fine (serve full equity).
+        """
+        level = (
+            db.query(RunEquityLevel)
+            .filter(
+                RunEquityLevel.user_id == user_id,
+                RunEquityLevel.run_id == run_id,
+                RunEquityLevel.resolution >= resolution,
+            )
+            .order_by(RunEquityLevel.resolution)
+            .first()
+        )
+        if level is None:
+            return None
+
+        index, equity, drawdown = EquityLevels.unpack(level.data, level.point_count)
+
+        return {
+            "index": index.tolist(),
+            "equity": equity.tolist(),
+            "drawdown": drawdown.tolist(),
+            "resolution": level.resolution,
+            "source_count": level.source_count,
+        }
@@ -1,8 +1,13 @@
 from fastapi import HTTPException
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
+import os
 import uuid
-import statistics
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 
+from edge_lab.persistence.database import SessionLocal
 from edge_lab.persistence.models import (
     User,
     Run,
@@ -13,8 +18,10 @@ from edge_lab.persistence.models import (
     StrategyAnalytics,
     Portfolio,
     PortfolioAnalytics,
+    Trade,
 )
 
+from edge_lab.analytics.trade_frame import TradeFrame
 from edge_lab.analytics.metrics import MetricsEngine
 from edge_lab.analytics.equity import EquityBuilder
 from edge_lab.analytics.monte_carlo import MonteCarloEngine
@@ -22,10 +29,38 @@ from edge_lab.analytics.risk_of_ruin import RiskOfRuinEngine
 from edge_lab.analytics.walk_forward import WalkForwardEngine
 from edge_lab.analytics.regime_detection import RegimeDetectionEngine
 from edge_lab.analytics.kelly_simulation import KellySimulationEngine
+from edge_lab.analytics.portfolio_equity import PortfolioEquityEngine
+from edge_lab.analytics.allocation import AllocationEngine
+from edge_lab.analytics.covariance import CovarianceEngine
+from edge_lab.analytics.incremental import IncrementalRunAnalytics
+from edge_lab.analytics.rollup import RollupStats
+from edge_lab.analytics.distribution import DistributionSketch
+from edge_lab.analytics.equity_levels import EquityLevels
+from edge_lab.analytics.simulation_cache import SimulationCache
 from edge_lab.services.dirty_propagation import DirtyPropagationService
 
 
 class HierarchyComputeService:
+
+    # Process pool size for dirty leaf runs; 1 computes them in-session
+    COMPUTE_WORKERS = int(os.getenv("COMPUTE_WORKERS", "1"))
+
+    # RunAnalytics JSON sections, each stored as <name>_json
+    RUN_SECTIONS = (
+        "metrics",
+        "equity",
+        "walk_forward",
+        "monte_carlo",
+        "risk_of_ruin",
+        "regime",
+        "kelly",
+    )
+
+    # Refreshed when a parent compute visits a stale run. The simulation
+    # sections (monte_carlo, risk_of_ruin, regime, kelly) dominate compute
+    # time and are only rebuilt on demand or by a background job.
+    NESTED_RUN_SECTIONS = ("metrics", "equity", "walk_forward")
+
     @staticmethod
     def _get_owned_run(run_id: str, db: Session, current_user: User) -> Run:
         run = (
@@ -83,159 +118,724 @@ class HierarchyComputeService:
         return portfolio
 
     @staticmethod
-    def compute_run(run_id: str, db: Session, current_user: User) -> RunAnalytics:
-        run = HierarchyComputeService._get_owned_run(run_id, db, current_user)
+    def _dirty_run_ids(db: Session, current_user: User, run_filter) -> list[uuid.UUID]:
+        """
+        Runs under a node whose snapshot is missing or stale, in one query.
+        """
+        rows = (
+            db.query(Run.id)
+            .join(Variant, Variant.id == Run.variant_id)
+            .join(Strategy, Strategy.id == Variant.strategy_id)
+            .outerjoin(
+                RunAnalytics,
+                (RunAnalytics.run_id == Run.id)
+                & (RunAnalytics.user_id == current_user.id),
+            )
+            .filter(
+                Run.user_id == current_user.id,
+                run_filter,
+                (RunAnalytics.id.is_(None)) | (RunAnalytics.input_version < Run.data_version),
+            )
+            .all()
+        )
+        return [r[0] for r in rows]
 
-        snapshot = (
-            db.query(RunAnalytics)
+    @staticmethod
+    def _compute_run_isolated(run_id: str, user_id: uuid.UUID) -> None:
+        """
+        Pool entry point: one session per run.
+        """
+        db = SessionLocal()
+        try:
+            user = db.get(User, user_id)
+            # the parent rolls up after the fan-out; propagating here would
+            # bump it past the version it is computing and race siblings
+            HierarchyComputeService.compute_run(
+                run_id,
+                db,
+                user,
+                sections=HierarchyComputeService.NESTED_RUN_SECTIONS,
+                propagate=False,
+            )
+        finally:
+            db.close()
+
+    @staticmethod
+    def _fan_out_dirty_runs(db: Session, current_user: User, run_filter) -> None:
+        """
+        Compute every dirty leaf run under a node across a process pool,
+        so the serial roll-up below only aggregates clean snapshots.
+        """
+        workers = HierarchyComputeService.COMPUTE_WORKERS
+        if workers <= 1:
+            return
+
+        run_ids = HierarchyComputeService._dirty_run_ids(db, current_user, run_filter)
+        if len(run_ids) < 2:
+            return
+
+        # spawn: children build their own engine/connection pool
+        context = multiprocessing.get_context("spawn")
+
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(run_ids)),
+            mp_context=context,
+        ) as pool:
+            futures = [
+                pool.submit(
+                    HierarchyComputeService._compute_run_isolated,
+                    str(run_id),
+                    current_user.id,
+                )
+                for run_id in run_ids
+            ]
+            for f in futures:
+                f.result()
+
+        db.expire_all()
+
+    @staticmethod
+    def _pending_children(db: Session, current_user: User, model, snapshot_model, snapshot_on, parent_filter) -> list:
+        """
+        (child, snapshot) pairs under a node whose snapshot is missing or
+        stale, in one outer join instead of one lookup per child.
+        """
+        return (
+            db.query(model, snapshot_model)
+            .outerjoin(
+                snapshot_model,
+                snapshot_on & (snapshot_model.user_id == current_user.id),
+            )
             .filter(
-                RunAnalytics.user_id == current_user.id,
-                RunAnalytics.run_id == run.id,
+                model.user_id == current_user.id,
+                parent_filter,
+                (snapshot_model.id.is_(None)) | (snapshot_model.input_version < model.data_version),
+            )
+            .all()
+        )
+
+    @staticmethod
+    def _has_pending_children(db: Session, current_user: User, model, snapshot_model, snapshot_on, parent_filter) -> bool:
+        return (
+            db.query(model.id)
+            .outerjoin(
+                snapshot_model,
+                snapshot_on & (snapshot_model.user_id == current_user.id),
+            )
+            .filter(
+                model.user_id == current_user.id,
+                parent_filter,
+                (snapshot_model.id.is_(None)) | (snapshot_model.input_version < model.data_version),
             )
             .first()
+        ) is not None
+
+    @staticmethod
+    def _store_snapshot(
+        db: Session,
+        snapshot_model,
+        snapshot,
+        node_model,
+        node_id,
+        version: int,
+        values: dict,
+        identity: dict,
+    ):
+        """
+        Optimistic write of a snapshot built from node data_version `version`.
+        An existing row is only overwritten while its input_version is not
+        newer (compare-and-set), so a slower writer never rolls a snapshot
+        back. is_dirty is derived from the node at write time: a node bumped
+        while it was being computed stays dirty.
+
+        Returns (snapshot, stored); stored is False when a newer snapshot
+        won the compare-and-set, and the caller must then skip every side
+        effect of its write (levels, roll-ups, propagation).
+        """
+        stale = (
+            select(node_model.data_version > version)
+            .where(node_model.id == node_id)
+            .scalar_subquery()
         )
-        if snapshot and snapshot.is_dirty is False:
-            return snapshot
 
-        metrics = MetricsEngine.generate_for_run(
-            db=db,
-            run_id=run.id,
-            user_id=current_user.id,
+        if snapshot is None:
+            snapshot = snapshot_model(
+                **identity,
+                **values,
+                input_version=version,
+                is_dirty=stale,
+            )
+            db.add(snapshot)
+            return snapshot, True
+
+        matched = (
+            db.query(snapshot_model)
+            .filter(
+                snapshot_model.id == snapshot.id,
+                snapshot_model.input_version <= version,
+            )
+            .update(
+                {**values, "input_version": version, "is_dirty": stale},
+                synchronize_session=False,
+            )
         )
+        db.expire(snapshot)
 
-        equity_df = EquityBuilder.build_equity_series(
-            db=db,
-            run_id=run.id,
-            user_id=current_user.id,
+        return snapshot, matched > 0
+
+    @staticmethod
+    def compute_run(
+        run_id: str,
+        db: Session,
+        current_user: User,
+        sections: tuple[str, ...] | None = None,
+        propagate: bool = True,
+    ) -> RunAnalytics:
+        """
+        sections: subset of RUN_SECTIONS to refresh (default all). Sections
+        that are already at the run's data_version are skipped.
+        """
+        sections = HierarchyComputeService._check_sections(sections)
+
+        row = (
+            db.query(Run, RunAnalytics)
+            .outerjoin(
+                RunAnalytics,
+                (RunAnalytics.run_id == Run.id)
+                & (RunAnalytics.user_id == current_user.id),
+            )
+            .filter(
+                Run.id == uuid.UUID(run_id),
+                Run.user_id == current_user.id,
+            )
+            .first()
         )
-        equity = {
-            "equity": equity_df["equity"].tolist(),
-            "drawdown": equity_df["drawdown"].tolist(),
-        }
+        if not row:
+            raise HTTPException(status_code=404, detail="Run not found.")
 
-        walk_forward = WalkForwardEngine.run(
-            db=db,
-            run_id=run.id,
-            user_id=current_user.id,
+        run, snapshot = row
+        stale = HierarchyComputeService.stale_sections(snapshot, run.data_version)
+        if not set(sections) & set(stale):
+            return snapshot
+
+        return HierarchyComputeService._compute_run_node(
+            run,
+            snapshot,
+            db,
+            current_user,
+            propagate=propagate,
+            sections=tuple(s for s in sections if s in stale),
         )
 
-        monte_carlo = MonteCarloEngine.bootstrap_run(
-            db=db,
-            run_id=run.id,
-            user_id=current_user.id,
-            simulations=3000,
+    @staticmethod
+    def _check_sections(sections) -> tuple[str, ...]:
+        if sections is None:
+            return HierarchyComputeService.RUN_SECTIONS
+
+        unknown = [s for s in sections if s not in HierarchyComputeService.RUN_SECTIONS]
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown section(s): {', '.join(unknown)}. "
+                f"Use: {', '.join(HierarchyComputeService.RUN_SECTIONS)}.",
+            )
+
+        return tuple(sections)
+
+    @staticmethod
+    def section_versions(snapshot: RunAnalytics) -> dict:
+        # NULL for snapshots written before sections were tracked
+        return snapshot.section_versions_json or dict.fromkeys(
+            HierarchyComputeService.RUN_SECTIONS,
+            snapshot.input_version,
         )
 
-        risk_of_ruin = RiskOfRuinEngine.simulate(
-            db=db,
-            run_id=run.id,
-            user_id=current_user.id,
-            simulations=3000,
-            position_fraction=0.01,
-            ruin_threshold=0.7,
+    @staticmethod
+    def stale_sections(snapshot: RunAnalytics | None, data_version: int) -> list[str]:
+        if snapshot is None:
+            return list(HierarchyComputeService.RUN_SECTIONS)
+
+        versions = HierarchyComputeService.section_versions(snapshot)
+        return [
+            s for s in HierarchyComputeService.RUN_SECTIONS
+            if versions.get(s, -1) < data_version
+        ]
+
+    @staticmethod
+    def _run_section(name: str, frame: TradeFrame, db: Session, current_user: User):
+        """
+        Bootstrap sections are memoized on the R multiset (SimulationCache).
+        """
+        if name == "metrics":
+            return MetricsEngine.generate_from_r(frame.by_timestamp().r_multiple)
+
+        if name == "equity":
+            equity_df = EquityBuilder.build_from_r(frame.r_multiple)
+            return {
+                "equity": equity_df["equity"].tolist(),
+                "drawdown": equity_df["drawdown"].tolist(),
+            }
+
+        if name == "walk_forward":
+            return WalkForwardEngine.run_from_r(frame.r_multiple)
+
+        if name == "regime":
+            # order-dependent, not memoized
+            return RegimeDetectionEngine.detect_from_log_returns(frame.log_return)
+
+        if name == "monte_carlo":
+            params = {"simulations": 3000}
+            compute = partial(MonteCarloEngine.bootstrap_from_r, frame.r_multiple, **params)
+        elif name == "risk_of_ruin":
+            params = {
+                "simulations": 3000,
+                "position_fraction": 0.01,
+                "ruin_threshold": 0.7,
+                "max_trades": 500,
+            }
+            compute = partial(RiskOfRuinEngine.simulate_from_r, frame.r_multiple, **params)
+        else:
+            # the grid sweep fills every chart point with a ruin probability
+            params = {"mode": "grid"}
+            compute = partial(KellySimulationEngine.generate_from_r, frame.r_multiple, **params)
+
+        return SimulationCache.get_or_compute(
+            db,
+            current_user.id,
+            name,
+            frame.r_multiple,
+            params,
+            compute,
         )
 
-        regime = RegimeDetectionEngine.detect(
+    @staticmethod
+    def _compute_run_node(
+        run: Run,
+        snapshot: RunAnalytics | None,
+        db: Session,
+        current_user: User,
+        propagate: bool = True,
+        sections: tuple[str, ...] | None = None,
+    ) -> RunAnalytics:
+        """
+        propagate=False when the caller rebuilds the parent right after;
+        a stale child always has stale ancestors already.
+
+        Only the metrics section moves input_version, feeds roll-ups and
+        propagates; the other sections are refreshed in place. A new
+        snapshot always gets metrics and equity (both non-null).
+        """
+        sections = sections or HierarchyComputeService.RUN_SECTIONS
+        if snapshot is None:
+            sections = tuple(dict.fromkeys(("metrics", "equity", *sections)))
+
+        # read before loading trades: a concurrent bump leaves the run stale
+        version = run.data_version
+
+        frame = TradeFrame.load(
             db=db,
             run_id=run.id,
             user_id=current_user.id,
+            data_version=version,
         )
 
-        kelly = KellySimulationEngine.generate_for_run(
-            db=db,
-            run_id=run.id,
-            user_id=current_user.id,
+        values = {
+            f"{name}_json": HierarchyComputeService._run_section(name, frame, db, current_user)
+            for name in sections
+        }
+
+        section_versions = {} if snapshot is None else HierarchyComputeService.section_versions(snapshot)
+        section_versions = {**section_versions, **dict.fromkeys(sections, version)}
+        values["section_versions_json"] = section_versions
+
+        with_metrics = "metrics" in sections
+
+        if "equity" in sections and not with_metrics:
+            # the rewritten equity_json already holds any appended tail
+            values["running_state_json"] = None
+
+        if with_metrics:
+            values["running_state_json"] = IncrementalRunAnalytics.state_from_frame(frame)
+            rollup_stats = values["rollup_stats_json"] = RollupStats.from_run_metrics(values["metrics_json"])
+            values["distribution_json"] = DistributionSketch.from_r(frame.r_multiple)
+
+            # what the clean ancestors currently count for this run
+            if snapshot is None:
+                previous_stats, counted = None, True
+            else:
+                previous_stats, counted = snapshot.rollup_stats_json, snapshot.rollup_stats_json is not None
+
+        snapshot, stored = HierarchyComputeService._store_snapshot(
+            db,
+            RunAnalytics,
+            snapshot,
+            Run,
+            run.id,
+            version if with_metrics else snapshot.input_version,
+            values,
+            {"user_id": current_user.id, "run_id": run.id},
         )
 
-        existing = (
+        # levels follow the equity_json that won the compare-and-set
+        if stored and "equity" in sections:
+            EquityLevels.store(db, current_user.id, run.id, values["equity_json"])
+
+        db.commit()
+
+        if not (stored and propagate and with_metrics):
+            return snapshot
+
+        HierarchyComputeService._swap_run_contribution(
+            db,
+            current_user,
+            run,
+            previous_stats,
+            rollup_stats,
+            counted,
+        )
+
+        return snapshot
+
+    @staticmethod
+    def append_trade(db: Session, current_user: User, run: Run, r_multiple: float, timestamp) -> bool:
+        """
+        Fold one trade appended in timestamp order into the run's metrics,
+        equity and distribution, and move those sections (and
+        input_version) to the run's data_version like a compute would; the
+        ancestors get the run's new contribution through the roll-up swap.
+        The caller has committed the trade with its from_trades bump.
+
+        The snapshot row is locked so concurrent appends apply one after
+        the other. False, leaving the run stale for the next compute,
+        unless the snapshot is exactly one trade behind: running state
+        present, trade in order, metrics/equity at data_version - 1 and
+        one trade more than the running count (a compute that raced the
+        insert may already include it).
+        """
+        snapshot = (
             db.query(RunAnalytics)
             .filter(
                 RunAnalytics.user_id == current_user.id,
                 RunAnalytics.run_id == run.id,
             )
+            .with_for_update()
             .first()
         )
+        if snapshot is None:
+            return False
+
+        version, trade_count = (
+            db.query(
+                Run.data_version,
+                select(func.count(Trade.id))
+                .where(Trade.run_id == Run.id)
+                .scalar_subquery(),
+            )
+            .filter(Run.id == run.id)
+            .one()
+        )
 
-        if existing:
-            existing.metrics_json = metrics
-            existing.equity_json = equity
-            existing.walk_forward_json = walk_forward
-            existing.monte_carlo_json = monte_carlo
-            existing.risk_of_ruin_json = risk_of_ruin
-            existing.regime_json = regime
-            existing.kelly_json = kelly
-            existing.is_dirty = False
-            snapshot = existing
-        else:
-            snapshot = RunAnalytics(
-                user_id=current_user.id,
-                run_id=run.id,
-                metrics_json=metrics,
-                equity_json=equity,
-                walk_forward_json=walk_forward,
-                monte_carlo_json=monte_carlo,
-                risk_of_ruin_json=risk_of_ruin,
-                regime_json=regime,
-                kelly_json=kelly,
-                is_dirty=False,
+        section_versions = HierarchyComputeService.section_versions(snapshot)
+        state = snapshot.running_state_json
+
+        values = None
+        if (
+            state is not None
+            and section_versions.get("metrics") == version - 1
+            and section_versions.get("equity") == version - 1
+            and trade_count == state["count"] + 1
+        ):
+            values = IncrementalRunAnalytics.append_values(snapshot, r_multiple, timestamp)
+
+        if values is None:
+            # the next compute rebuilds the state from trades
+            snapshot.running_state_json = None
+            db.commit()
+            return False
+
+        previous_stats = snapshot.rollup_stats_json
+        rollup_stats = values["rollup_stats_json"] = RollupStats.from_run_metrics(values["metrics_json"])
+        values["section_versions_json"] = {**section_versions, "metrics": version, "equity": version}
+
+        snapshot, stored = HierarchyComputeService._store_snapshot(
+            db,
+            RunAnalytics,
+            snapshot,
+            Run,
+            run.id,
+            version,
+            values,
+            {},
+        )
+
+        if stored:
+            state = values["running_state_json"]
+
+            def curve():
+                base = values.get("equity_json", snapshot.equity_json)
+                return {
+                    "equity": base["equity"] + state["tail_equity"],
+                    "drawdown": base["drawdown"] + state["tail_drawdown"],
+                }
+
+            EquityLevels.append(
+                db,
+                current_user.id,
+                run.id,
+                state["count"] - 1,
+                state["equity"],
+                state["equity"] / state["equity_peak"] - 1,
+                curve,
             )
-            db.add(snapshot)
 
         db.commit()
 
-        DirtyPropagationService.from_run(
+        if not stored:
+            return False
+
+        HierarchyComputeService._swap_run_contribution(
             db,
-            current_user.id,
+            current_user,
+            run,
+            previous_stats,
+            rollup_stats,
+            previous_stats is not None,
+        )
+
+        return True
+
+    @staticmethod
+    def _swap_run_contribution(db: Session, current_user: User, run: Run, old_stats, new_stats, counted: bool) -> None:
+        """
+        Swap a run's roll-up contribution into its ancestors, or invalidate
+        them (resetting their roll-ups) when that is not possible; commits.
+        counted: whether the clean ancestors count the run at all.
+        """
+        rolled_up = counted and HierarchyComputeService._roll_up_run(
+            db,
+            current_user,
             run.variant_id,
+            old_stats,
+            new_stats,
         )
 
-        db.commit()
+        if not rolled_up:
+            DirtyPropagationService.from_runs(
+                db,
+                current_user.id,
+                [run.id],
+                reset_rollups=True,
+            )
 
-        return snapshot
+        db.commit()
 
     @staticmethod
-    def compute_variant(variant_id: str, db: Session, current_user: User) -> VariantAnalytics:
-        variant = HierarchyComputeService._get_owned_variant(variant_id, db, current_user)
-
-        snapshot = (
-            db.query(VariantAnalytics)
+    def _roll_up_run(db: Session, current_user: User, variant_id, old_stats, new_stats) -> bool:
+        """
+        Swap one run's contribution into its variant's and strategy's roll-up
+        statistics instead of invalidating them. A level catches up to its
+        node's data_version once none of its children is pending. False when
+        the variant has to be rebuilt; the caller then propagates as usual.
+
+        The parent snapshot rows are locked (variant, then strategy) until
+        the caller commits, so concurrent sibling swaps apply one after the
+        other instead of overwriting each other's read-modify-write.
+        """
+        row = (
+            db.query(VariantAnalytics, Variant.strategy_id, Variant.data_version)
+            .join(Variant, Variant.id == VariantAnalytics.variant_id)
             .filter(
                 VariantAnalytics.user_id == current_user.id,
-                VariantAnalytics.variant_id == variant.id,
+                VariantAnalytics.variant_id == variant_id,
             )
+            .with_for_update(of=VariantAnalytics)
             .first()
         )
-        if snapshot and snapshot.is_dirty is False:
-            return snapshot
+        if not row:
+            return False
 
-        runs = (
-            db.query(Run)
+        variant_snapshot, strategy_id, variant_version = row
+        if variant_snapshot.rollup_stats_json is None:
+            return False
+
+        variant_old = variant_snapshot.rollup_stats_json
+        variant_new = RollupStats.replace(variant_old, old_stats, new_stats)
+        if variant_new is None or variant_new["expectancy_R"]["count"] == 0:
+            return False
+
+        variant_pending = HierarchyComputeService._has_pending_children(
+            db,
+            current_user,
+            Run,
+            RunAnalytics,
+            RunAnalytics.run_id == Run.id,
+            Run.variant_id == variant_id,
+        )
+
+        HierarchyComputeService._store_snapshot(
+            db,
+            VariantAnalytics,
+            variant_snapshot,
+            Variant,
+            variant_id,
+            variant_snapshot.input_version if variant_pending else variant_version,
+            {
+                "rollup_stats_json": variant_new,
+                "aggregated_metrics_json": RollupStats.summary(variant_new),
+                "distribution_json": HierarchyComputeService._merged_distribution(
+                    db,
+                    current_user,
+                    Run,
+                    RunAnalytics,
+                    RunAnalytics.run_id == Run.id,
+                    Run.variant_id == variant_id,
+                ),
+                "run_count": variant_snapshot.run_count + (old_stats is None),
+            },
+            {},
+        )
+
+        row = (
+            db.query(StrategyAnalytics, Strategy.data_version)
+            .join(Strategy, Strategy.id == StrategyAnalytics.strategy_id)
             .filter(
-                Run.variant_id == variant.id,
-                Run.user_id == current_user.id,
+                StrategyAnalytics.user_id == current_user.id,
+                StrategyAnalytics.strategy_id == strategy_id,
+            )
+            .with_for_update(of=StrategyAnalytics)
+            .first()
+        )
+
+        strategy_new = None
+        if row and row[0].rollup_stats_json:
+            strategy_snapshot, strategy_version = row
+            strategy_new = RollupStats.replace(strategy_snapshot.rollup_stats_json, variant_old, variant_new)
+
+        if strategy_new is None:
+            DirtyPropagationService.from_variants(db, current_user.id, [variant_id], reset_rollups=True)
+            return True
+
+        strategy_pending = HierarchyComputeService._has_pending_children(
+            db,
+            current_user,
+            Variant,
+            VariantAnalytics,
+            VariantAnalytics.variant_id == Variant.id,
+            Variant.strategy_id == strategy_id,
+        )
+
+        HierarchyComputeService._store_snapshot(
+            db,
+            StrategyAnalytics,
+            strategy_snapshot,
+            Strategy,
+            strategy_id,
+            strategy_snapshot.input_version if strategy_pending else strategy_version,
+            {
+                "rollup_stats_json": strategy_new,
+                "aggregated_metrics_json": RollupStats.summary(strategy_new),
+                "distribution_json": HierarchyComputeService._merged_distribution(
+                    db,
+                    current_user,
+                    Variant,
+                    VariantAnalytics,
+                    VariantAnalytics.variant_id == Variant.id,
+                    Variant.strategy_id == strategy_id,
+                ),
+            },
+            {},
+        )
+
+        DirtyPropagationService.from_strategies(db, current_user.id, [strategy_id])
+        return True
+
+    @staticmethod
+    def _merged_distribution(db: Session, current_user: User, model, snapshot_model, snapshot_on, parent_filter) -> dict | None:
+        """
+        Re-merge a parent's distribution from its children's stored sketches
+        (digests cannot subtract a replaced child the way RollupStats can).
+        """
+        rows = (
+            db.query(snapshot_model.distribution_json)
+            .join(model, snapshot_on)
+            .filter(
+                snapshot_model.user_id == current_user.id,
+                parent_filter,
             )
             .all()
         )
+        return DistributionSketch.merge([r[0] for r in rows])
 
-        for r in runs:
-            r_snapshot = (
-                db.query(RunAnalytics)
-                .filter(
-                    RunAnalytics.user_id == current_user.id,
-                    RunAnalytics.run_id == r.id,
-                )
-                .first()
+    @staticmethod
+    def compute_variant(variant_id: str, db: Session, current_user: User, progress=None) -> VariantAnalytics:
+        row = (
+            db.query(Variant, VariantAnalytics)
+            .outerjoin(
+                VariantAnalytics,
+                (VariantAnalytics.variant_id == Variant.id)
+                & (VariantAnalytics.user_id == current_user.id),
+            )
+            .filter(
+                Variant.id == uuid.UUID(variant_id),
+                Variant.user_id == current_user.id,
             )
-            if r_snapshot is None or r_snapshot.is_dirty:
-                HierarchyComputeService.compute_run(str(r.id), db, current_user)
+            .first()
+        )
+        if not row:
+            raise HTTPException(status_code=404, detail="Variant not found.")
+
+        variant, snapshot = row
+        if snapshot and snapshot.input_version >= variant.data_version:
+            return snapshot
+
+        return HierarchyComputeService._compute_variant_node(variant, snapshot, db, current_user, progress)
+
+    @staticmethod
+    def _compute_variant_node(
+        variant: Variant,
+        snapshot: VariantAnalytics | None,
+        db: Session,
+        current_user: User,
+        progress=None,
+        propagate: bool = True,
+    ) -> VariantAnalytics:
+        variant_id = variant.id
+        version = variant.data_version
+
+        HierarchyComputeService._fan_out_dirty_runs(
+            db,
+            current_user,
+            Run.variant_id == variant_id,
+        )
+
+        pending = HierarchyComputeService._pending_children(
+            db,
+            current_user,
+            Run,
+            RunAnalytics,
+            RunAnalytics.run_id == Run.id,
+            Run.variant_id == variant_id,
+        )
+
+        for i, (r, r_snapshot) in enumerate(pending):
+            HierarchyComputeService._compute_run_node(
+                r,
+                r_snapshot,
+                db,
+                current_user,
+                propagate=False,
+                sections=HierarchyComputeService.NESTED_RUN_SECTIONS,
+            )
+            if progress:
+                progress(i + 1, len(pending))
 
         run_snapshots = (
             db.query(RunAnalytics)
             .join(Run, RunAnalytics.run_id == Run.id)
             .filter(
                 Run.user_id == current_user.id,
-                Run.variant_id == variant.id,
-                RunAnalytics.is_dirty == False,
+                Run.variant_id == variant_id,
+                RunAnalytics.input_version >= Run.data_version,
             )
             .all()
         )
@@ -246,121 +846,110 @@ class HierarchyComputeService:
                 detail="No valid run analytics snapshots available.",
             )
 
-        expectancies = []
-        log_growths = []
-        sharpes = []
-        max_drawdowns = []
-
-        for s in run_snapshots:
-            metrics = s.metrics_json or {}
-            e = metrics.get("expectancy_R")
-            g = metrics.get("log_growth")
-            sh = metrics.get("sharpe")
-            d = metrics.get("max_drawdown_R")
-            if e is not None:
-                expectancies.append(e)
-            if g is not None:
-                log_growths.append(g)
-            if sh is not None:
-                sharpes.append(sh)
-            if d is not None:
-                max_drawdowns.append(d)
-
-        if not expectancies:
+        stats = RollupStats.combine([
+            s.rollup_stats_json or RollupStats.from_run_metrics(s.metrics_json)
+            for s in run_snapshots
+        ])
+
+        if stats["expectancy_R"]["count"] == 0:
             raise HTTPException(
                 status_code=400,
                 detail="No valid expectancy values to aggregate.",
             )
 
-        aggregated = {
-            "mean_expectancy": statistics.mean(expectancies),
-            "mean_log_growth": statistics.mean(log_growths) if log_growths else None,
-            "mean_sharpe": statistics.mean(sharpes) if sharpes else None,
-            "mean_max_drawdown": statistics.mean(max_drawdowns) if max_drawdowns else None,
-            "std_expectancy": statistics.pstdev(expectancies) if len(expectancies) > 1 else 0.0,
-            "best_run_expectancy": max(expectancies),
-            "worst_run_expectancy": min(expectancies),
-        }
+        aggregated = RollupStats.summary(stats)
 
-        existing = (
-            db.query(VariantAnalytics)
-            .filter(
-                VariantAnalytics.user_id == current_user.id,
-                VariantAnalytics.variant_id == variant.id,
-            )
-            .first()
-        )
-
-        if existing:
-            existing.aggregated_metrics_json = aggregated
-            existing.run_count = len(run_snapshots)
-            existing.is_dirty = False
-            snapshot = existing
-        else:
-            snapshot = VariantAnalytics(
-                user_id=current_user.id,
-                variant_id=variant.id,
-                aggregated_metrics_json=aggregated,
-                run_count=len(run_snapshots),
-                is_dirty=False,
-            )
-            db.add(snapshot)
-
-        db.commit()
-
-        DirtyPropagationService.from_variant(
+        snapshot, stored = HierarchyComputeService._store_snapshot(
             db,
-            current_user.id,
-            variant.id,
+            VariantAnalytics,
+            snapshot,
+            Variant,
+            variant_id,
+            version,
+            {
+                "aggregated_metrics_json": aggregated,
+                "rollup_stats_json": stats,
+                "distribution_json": DistributionSketch.merge([s.distribution_json for s in run_snapshots]),
+                "run_count": len(run_snapshots),
+            },
+            {"user_id": current_user.id, "variant_id": variant_id},
         )
 
         db.commit()
 
+        if propagate and stored:
+            DirtyPropagationService.from_variants(
+                db,
+                current_user.id,
+                [variant_id],
+            )
+            db.commit()
+
         return snapshot
 
     @staticmethod
-    def compute_strategy(strategy_id: str, db: Session, current_user: User) -> StrategyAnalytics:
-        strategy = HierarchyComputeService._get_owned_strategy(strategy_id, db, current_user)
-
-        snapshot = (
-            db.query(StrategyAnalytics)
+    def compute_strategy(strategy_id: str, db: Session, current_user: User, progress=None) -> StrategyAnalytics:
+        row = (
+            db.query(Strategy, StrategyAnalytics)
+            .outerjoin(
+                StrategyAnalytics,
+                (StrategyAnalytics.strategy_id == Strategy.id)
+                & (StrategyAnalytics.user_id == current_user.id),
+            )
             .filter(
-                StrategyAnalytics.user_id == current_user.id,
-                StrategyAnalytics.strategy_id == strategy.id,
+                Strategy.id == uuid.UUID(strategy_id),
+                Strategy.user_id == current_user.id,
             )
             .first()
         )
-        if snapshot and snapshot.is_dirty is False:
+        if not row:
+            raise HTTPException(status_code=404, detail="System not found.")
+
+        strategy, snapshot = row
+        if snapshot and snapshot.input_version >= strategy.data_version:
             return snapshot
 
-        variants = (
-            db.query(Variant)
-            .filter(
-                Variant.user_id == current_user.id,
-                Variant.strategy_id == strategy.id,
-            )
-            .all()
+        return HierarchyComputeService._compute_strategy_node(strategy, snapshot, db, current_user, progress)
+
+    @staticmethod
+    def _compute_strategy_node(
+        strategy: Strategy,
+        snapshot: StrategyAnalytics | None,
+        db: Session,
+        current_user: User,
+        progress=None,
+        propagate: bool = True,
+    ) -> StrategyAnalytics:
+        strategy_id = strategy.id
+        version = strategy.data_version
+
+        HierarchyComputeService._fan_out_dirty_runs(
+            db,
+            current_user,
+            Variant.strategy_id == strategy_id,
         )
 
-        for v in variants:
-            v_snapshot = (
-                db.query(VariantAnalytics)
-                .filter(
-                    VariantAnalytics.user_id == current_user.id,
-                    VariantAnalytics.variant_id == v.id,
-                )
-                .first()
-            )
-            if v_snapshot is None or v_snapshot.is_dirty:
-                HierarchyComputeService.compute_variant(str(v.id), db, current_user)
+        pending = HierarchyComputeService._pending_children(
+            db,
+            current_user,
+            Variant,
+            VariantAnalytics,
+            VariantAnalytics.variant_id == Variant.id,
+            Variant.strategy_id == strategy_id,
+        )
+
+        for i, (v, v_snapshot) in enumerate(pending):
+            HierarchyComputeService._compute_variant_node(v, v_snapshot, db, current_user, propagate=False)
+            if progress:
+                progress(i + 1, len(pending))
 
         variant_snapshots = (
             db.query(VariantAnalytics)
             .join(Variant, VariantAnalytics.variant_id == Variant.id)
             .filter(
                 Variant.user_id == current_user.id,
-                Variant.strategy_id == strategy.id,
-                VariantAnalytics.is_dirty == False,
+                Variant.strategy_id == strategy_id,
+                VariantAnalytics.input_version >= Variant.data_version,
             )
             .all()
         )
@@ -368,56 +957,135 @@ class HierarchyComputeService:
         if not variant_snapshots:
             raise HTTPException(status_code=400, detail="No valid variant analytics.")
 
-        expectancies = []
-        log_growths = []
-
-        for s in variant_snapshots:
-            metrics = s.aggregated_metrics_json or {}
-            e = metrics.get("mean_expectancy")
-            g = metrics.get("mean_log_growth")
-            if e is not None:
-                expectancies.append(e)
-            if g is not None:
-                log_growths.append(g)
+        # merged over every run beneath the strategy, not a mean of variant means
+        stats = RollupStats.combine([
+            s.rollup_stats_json for s in variant_snapshots
+            if s.rollup_stats_json
+        ])
 
-        if not expectancies:
+        if stats["expectancy_R"]["count"] == 0:
             raise HTTPException(status_code=400, detail="No valid values to aggregate.")
 
-        aggregated = {
-            "mean_expectancy": statistics.mean(expectancies),
-            "mean_log_growth": statistics.mean(log_growths) if log_growths else None,
-        }
+        aggregated = RollupStats.summary(stats)
 
-        existing = (
-            db.query(StrategyAnalytics)
+        snapshot, stored = HierarchyComputeService._store_snapshot(
+            db,
+            StrategyAnalytics,
+            snapshot,
+            Strategy,
+            strategy_id,
+            version,
+            {
+                "aggregated_metrics_json": aggregated,
+                "rollup_stats_json": stats,
+                "distribution_json": DistributionSketch.merge([s.distribution_json for s in variant_snapshots]),
+                "variant_count": len(variant_snapshots),
+            },
+            {"user_id": current_user.id, "strategy_id": strategy_id},
+        )
+
+        db.commit()
+
+        if propagate and stored:
+            DirtyPropagationService.from_strategies(
+                db,
+                current_user.id,
+                [strategy_id],
+            )
+            db.commit()
+
+        return snapshot
+
+    @staticmethod
+    def compute_portfolio(portfolio_id: str, db: Session, current_user: User, progress=None) -> PortfolioAnalytics:
+        row = (
+            db.query(Portfolio, PortfolioAnalytics)
+            .outerjoin(
+                PortfolioAnalytics,
+                (PortfolioAnalytics.id == Portfolio.id)
+                & (PortfolioAnalytics.user_id == current_user.id),
+            )
             .filter(
-                StrategyAnalytics.user_id == current_user.id,
-                StrategyAnalytics.strategy_id == strategy.id,
+                Portfolio.id == uuid.UUID(portfolio_id),
+                Portfolio.user_id == current_user.id,
             )
             .first()
         )
+        if not row:
+            raise HTTPException(status_code=404, detail="Portfolio not found.")
 
-        if existing:
-            existing.aggregated_metrics_json = aggregated
-            existing.variant_count = len(variant_snapshots)
-            existing.is_dirty = False
-            snapshot = existing
-        else:
-            snapshot = StrategyAnalytics(
-                user_id=current_user.id,
-                strategy_id=strategy.id,
-                aggregated_metrics_json=aggregated,
-                variant_count=len(variant_snapshots),
-                is_dirty=False,
-            )
-            db.add(snapshot)
+        portfolio, snapshot = row
+        if snapshot and snapshot.input_version >= portfolio.data_version:
+            return snapshot
 
-        db.commit()
+        version = portfolio.data_version
 
-        DirtyPropagationService.from_strategy(
+        HierarchyComputeService._fan_out_dirty_runs(
             db,
-            current_user.id,
-            strategy.id,
+            current_user,
+            Strategy.portfolio_id == portfolio.id,
+        )
+
+        pending = HierarchyComputeService._pending_children(
+            db,
+            current_user,
+            Strategy,
+            StrategyAnalytics,
+            StrategyAnalytics.strategy_id == Strategy.id,
+            Strategy.portfolio_id == portfolio.id,
+        )
+
+        for i, (s, s_snapshot) in enumerate(pending):
+            HierarchyComputeService._compute_strategy_node(s, s_snapshot, db, current_user, propagate=False)
+            if progress:
+                progress(i + 1, len(pending))
+
+        strategy_snapshots = HierarchyComputeService._clean_strategy_snapshots(db, current_user, portfolio.id)
+
+        if not strategy_snapshots:
+            raise HTTPException(status_code=400, detail="No strategy analytics available.")
+
+        mode = snapshot.allocation_mode if snapshot else "equal_weight"
+        config = snapshot.allocation_config_json if snapshot else None
+
+        combined_metrics, equity = HierarchyComputeService._combine_portfolio(
+            db,
+            current_user,
+            portfolio.id,
+            strategy_snapshots,
+            mode,
+            config,
+        )
+
+        snapshot, _ = HierarchyComputeService._store_snapshot(
+            db,
+            PortfolioAnalytics,
+            snapshot,
+            Portfolio,
+            portfolio.id,
+            version,
+            {
+                "combined_metrics_json": combined_metrics,
+                "combined_equity_json": equity,
+                "distribution_json": DistributionSketch.merge([s.distribution_json for s in strategy_snapshots]),
+                "strategy_count": len(strategy_snapshots),
+            },
+            {
+                "id": portfolio.id,
+                "user_id": current_user.id,
+                "name": portfolio.name,
+                "allocation_mode": mode,
+                "allocation_config_json": config,
+            },
+        )
+
+        (
+            db.query(Portfolio)
+            .filter(Portfolio.id == portfolio.id)
+            .update(
+                {Portfolio.is_dirty: Portfolio.data_version > version},
+                synchronize_session=False,
+            )
         )
 
         db.commit()
@@ -425,69 +1093,103 @@ class HierarchyComputeService:
         return snapshot
 
     @staticmethod
-    def compute_portfolio(portfolio_id: str, db: Session, current_user: User) -> PortfolioAnalytics:
+    def reallocate_portfolio(
+        portfolio_id: str,
+        mode: str,
+        config: dict | None,
+        db: Session,
+        current_user: User,
+    ) -> PortfolioAnalytics:
+        """
+        Re-weight an existing snapshot over its clean strategy snapshots;
+        children are never recomputed.
+        """
         portfolio = HierarchyComputeService._get_owned_portfolio(portfolio_id, db, current_user)
 
-        if portfolio.is_dirty is False:
-            snapshot = (
-                db.query(PortfolioAnalytics)
-                .filter(
-                    PortfolioAnalytics.user_id == current_user.id,
-                    PortfolioAnalytics.id == portfolio.id,
-                )
-                .first()
-            )
-            if snapshot:
-                return snapshot
-
-        strategies = (
-            db.query(Strategy)
+        snapshot = (
+            db.query(PortfolioAnalytics)
             .filter(
-                Strategy.user_id == current_user.id,
-                Strategy.portfolio_id == portfolio.id,
+                PortfolioAnalytics.user_id == current_user.id,
+                PortfolioAnalytics.id == portfolio.id,
             )
-            .all()
+            .first()
         )
+        if not snapshot:
+            raise HTTPException(status_code=404, detail="Portfolio analytics not computed.")
 
-        for s in strategies:
-            s_snapshot = (
-                db.query(StrategyAnalytics)
-                .filter(
-                    StrategyAnalytics.user_id == current_user.id,
-                    StrategyAnalytics.strategy_id == s.id,
-                )
-                .first()
+        strategy_snapshots = HierarchyComputeService._clean_strategy_snapshots(db, current_user, portfolio.id)
+
+        if not strategy_snapshots:
+            raise HTTPException(status_code=400, detail="No strategy analytics available.")
+
+        try:
+            combined_metrics, equity = HierarchyComputeService._combine_portfolio(
+                db,
+                current_user,
+                portfolio.id,
+                strategy_snapshots,
+                mode,
+                config,
             )
-            if s_snapshot is None or s_snapshot.is_dirty:
-                HierarchyComputeService.compute_strategy(str(s.id), db, current_user)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        snapshot.allocation_mode = mode
+        snapshot.allocation_config_json = config
+        snapshot.combined_metrics_json = combined_metrics
+        snapshot.combined_equity_json = equity
+        snapshot.strategy_count = len(strategy_snapshots)
 
-        strategy_snapshots = (
+        db.commit()
+
+        return snapshot
+
+    @staticmethod
+    def _clean_strategy_snapshots(db: Session, current_user: User, portfolio_id) -> list[StrategyAnalytics]:
+        return (
             db.query(StrategyAnalytics)
             .join(Strategy, Strategy.id == StrategyAnalytics.strategy_id)
             .filter(
                 StrategyAnalytics.user_id == current_user.id,
-                StrategyAnalytics.is_dirty == False,
-                Strategy.portfolio_id == portfolio.id,
+                StrategyAnalytics.input_version >= Strategy.data_version,
+                Strategy.portfolio_id == portfolio_id,
             )
+            .order_by(StrategyAnalytics.strategy_id)
             .all()
         )
 
-        if not strategy_snapshots:
-            raise HTTPException(status_code=400, detail="No strategy analytics available.")
+    @staticmethod
+    def _combine_portfolio(
+        db: Session,
+        current_user: User,
+        portfolio_id,
+        strategy_snapshots: list[StrategyAnalytics],
+        mode: str,
+        config: dict | None,
+    ) -> tuple[dict, dict]:
+        covariance = CovarianceEngine.sync(
+            db,
+            current_user.id,
+            portfolio_id,
+            strategy_snapshots,
+        )
+        stats = CovarianceEngine.stats(covariance)
 
-        weights = [1 / len(strategy_snapshots)] * len(strategy_snapshots)
+        weights = AllocationEngine.weights(mode, stats["covariance"], stats["mean"], config)
 
-        horizon = 50
-        capital = 1
-        equity = []
+        streams = AllocationEngine.cached_streams(
+            db,
+            current_user.id,
+            portfolio_id,
+            strategy_snapshots,
+        )
 
-        for _ in range(horizon):
-            step = 0
-            for w, s in zip(weights, strategy_snapshots):
-                g = s.aggregated_metrics_json.get("mean_log_growth", 0) or 0
-                step += w * g
-            capital *= (1 + step)
-            equity.append(capital)
+        merged = PortfolioEquityEngine.build_from_streams(streams, weights)
+        equity = {
+            "timestamp": merged["timestamp"],
+            "equity": merged["equity"],
+            "drawdown": merged["drawdown"],
+        }
 
         combined_metrics = {
             "combined_mean_log_growth": sum(
@@ -498,38 +1200,25 @@ class HierarchyComputeService:
                 w * (s.aggregated_metrics_json.get("mean_expectancy", 0) or 0)
                 for w, s in zip(weights, strategy_snapshots)
             ),
+            "total_trades": merged["summary"]["total_trades"],
+            "final_equity": merged["summary"]["final_equity"],
+            "log_growth": merged["summary"]["log_growth"],
+            "max_drawdown": merged["summary"]["max_drawdown"],
+            "weights": {
+                str(s.strategy_id): float(w)
+                for w, s in zip(weights, strategy_snapshots)
+            },
         }
 
-        snapshot = (
-            db.query(PortfolioAnalytics)
-            .filter(
-                PortfolioAnalytics.user_id == current_user.id,
-                PortfolioAnalytics.id == portfolio.id,
+        if stats["covariance"] is not None:
+            combined_metrics["diversification_ratio"] = CovarianceEngine.diversification_ratio(
+                weights,
+                stats["covariance"],
             )
-            .first()
-        )
-
-        if snapshot:
-            snapshot.combined_metrics_json = combined_metrics
-            snapshot.combined_equity_json = {"equity": equity}
-            snapshot.strategy_count = len(strategy_snapshots)
-            snapshot.is_dirty = False
-        else:
-            snapshot = PortfolioAnalytics(
-                id=portfolio.id,
-                user_id=current_user.id,
-                name=portfolio.name,
-                allocation_mode="equal_weight",
-                allocation_config_json=None,
-                combined_metrics_json=combined_metrics,
-                combined_equity_json={"equity": equity},
-                strategy_count=len(strategy_snapshots),
-                is_dirty=False,
+            combined_metrics["var_95"] = CovarianceEngine.value_at_risk(
+                weights,
+                stats["mean"],
+                stats["covariance"],
             )
-            db.add(snapshot)
 
-        portfolio.is_dirty = False
-
-        db.commit()
-
-        return snapshot
+        return combined_metrics, equity
@@ -0,0 +1,178 @@
+import math
+import numpy as np
+
+from edge_lab.persistence.models import RunAnalytics
+from edge_lab.analytics.metrics import MetricsEngine
+from edge_lab.analytics.equity import EquityBuilder
+from edge_lab.analytics.trade_frame import TradeFrame
+from edge_lab.analytics.distribution import DistributionSketch
+
+
+class IncrementalRunAnalytics:
+    """
+    O(1) updates of metrics_json / equity_json when a trade is appended.
+
+    RunAnalytics.running_state_json holds the running aggregates. It is
+    rebuilt by every full compute_run and cleared whenever an append
+    cannot be applied in order (or a trade is edited/deleted), in which
+    case the next compute_run falls back to a full recompute.
+    Simulation-based sections are not touched and stay lazy.
+    HierarchyComputeService.append_trade writes the result.
+
+    Appended equity points go to a bounded tail in running_state_json
+    instead of rewriting the equity_json array; the tail is folded into
+    equity_json once it holds TAIL_MAX points. Read equity through
+    equity(), which joins both.
+    """
+
+    TAIL_MAX = 256
+
+    @staticmethod
+    def state_from_frame(frame: TradeFrame) -> dict:
+        ordered = frame.by_timestamp()
+        r_values = ordered.r_multiple
+
+        wins = r_values[r_values > 0]
+        losses = r_values[r_values <= 0]
+        safe_r = r_values[r_values > -1]
+
+        cumulative = np.cumsum(r_values)
+
+        equity = np.exp(
+            np.cumsum(np.log(1 + EquityBuilder.BASE_RISK_FRACTION * frame.r_multiple))
+        )
+
+        return {
+            "count": int(r_values.size),
+            "wins": int(wins.size),
+            "sum_r": float(np.sum(r_values)),
+            "sum_r2": float(np.sum(r_values ** 2)),
+            "sum_win_r": float(np.sum(wins)),
+            "sum_loss_r": float(np.sum(losses)),
+            "safe_count": int(safe_r.size),
+            "sum_log1p_r": float(np.sum(np.log1p(safe_r))),
+            "cum_r": float(cumulative[-1]),
+            "peak_r": float(np.max(cumulative)),
+            "max_dd_r": float(np.min(cumulative - np.maximum.accumulate(cumulative))),
+            "equity": float(equity[-1]),
+            "equity_peak": float(np.max(equity)),
+            "last_timestamp": str(ordered.timestamp[-1]),
+            "tail_equity": [],
+            "tail_drawdown": [],
+        }
+
+    @staticmethod
+    def append(state: dict, r_multiple: float) -> dict:
+        state = dict(state)
+
+        state["count"] += 1
+        state["sum_r"] += r_multiple
+        state["sum_r2"] += r_multiple * r_multiple
+
+        if r_multiple > 0:
+            state["wins"] += 1
+            state["sum_win_r"] += r_multiple
+        else:
+            state["sum_loss_r"] += r_multiple
+
+        if r_multiple > -1:
+            state["safe_count"] += 1
+            state["sum_log1p_r"] += math.log1p(r_multiple)
+
+        state["cum_r"] += r_multiple
+        state["peak_r"] = max(state["peak_r"], state["cum_r"])
+        state["max_dd_r"] = min(state["max_dd_r"], state["cum_r"] - state["peak_r"])
+
+        state["equity"] *= 1 + EquityBuilder.BASE_RISK_FRACTION * r_multiple
+        state["equity_peak"] = max(state["equity_peak"], state["equity"])
+
+        return state
+
+    @staticmethod
+    def metrics_from_state(state: dict) -> dict:
+        n = state["count"]
+        wins = state["wins"]
+        losses = n - wins
+
+        mean = state["sum_r"] / n
+        variance = max(state["sum_r2"] / n - mean * mean, 0.0)
+
+        return MetricsEngine.summarize(
+            total_trades=n,
+            wins=wins,
+            losses=losses,
+            total_R=state["sum_r"],
+            avg_win_R=state["sum_win_r"] / wins if wins > 0 else 0,
+            avg_loss_R=state["sum_loss_r"] / losses if losses > 0 else 0,
+            volatility_R=math.sqrt(variance),
+            log_growth=(
+                state["sum_log1p_r"] / state["safe_count"]
+                if state["safe_count"] > 0
+                else 0.0
+            ),
+            max_dd=state["max_dd_r"],
+        )
+
+    @staticmethod
+    def equity(snapshot: RunAnalytics) -> dict:
+        """
+        equity_json with any appended tail points.
+        """
+        state = snapshot.running_state_json or {}
+        tail_equity = state.get("tail_equity")
+        if not tail_equity:
+            return snapshot.equity_json
+
+        return {
+            "equity": snapshot.equity_json["equity"] + tail_equity,
+            "drawdown": snapshot.equity_json["drawdown"] + state["tail_drawdown"],
+        }
+
+    @staticmethod
+    def append_values(snapshot: RunAnalytics, r_multiple: float, timestamp) -> dict | None:
+        """
+        Snapshot column values with one appended trade folded in; the
+        snapshot itself is not modified. equity_json is only included
+        when the tail is folded into it.
+
+        None when the trade does not extend the run in timestamp order.
+        """
+        state = snapshot.running_state_json
+
+        if (
+            state is None
+            or timestamp is None
+            or str(np.datetime64(timestamp, "us")) < state["last_timestamp"]
+        ):
+            return None
+
+        state = IncrementalRunAnalytics.append(state, r_multiple)
+        state["last_timestamp"] = str(np.datetime64(timestamp, "us"))
+
+        drawdown = state["equity"] / state["equity_peak"] - 1
+
+        # new lists: the previous state is still referenced by the snapshot
+        state["tail_equity"] = state.get("tail_equity", []) + [state["equity"]]
+        state["tail_drawdown"] = state.get("tail_drawdown", []) + [drawdown]
+
+        values = {}
+
+        if len(state["tail_equity"]) >= IncrementalRunAnalytics.TAIL_MAX:
+            # one full rewrite of equity_json per TAIL_MAX appends
+            values["equity_json"] = {
+                "equity": snapshot.equity_json["equity"] + state["tail_equity"],
+                "drawdown": snapshot.equity_json["drawdown"] + state["tail_drawdown"],
+            }
+            state["tail_equity"] = []
+            state["tail_drawdown"] = []
+
+        values["metrics_json"] = IncrementalRunAnalytics.metrics_from_state(state)
+        values["running_state_json"] = state
+
+        if snapshot.distribution_json:
+            values["distribution_json"] = DistributionSketch.merge([
+                snapshot.distribution_json,
+                DistributionSketch.from_r(np.array([r_multiple])),
+            ])
+
+        return values
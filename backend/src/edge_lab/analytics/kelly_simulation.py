@@ -1,6 +1,6 @@
 import numpy as np
 from sqlalchemy.orm import Session
-from edge_lab.persistence.models import Trade
+from edge_lab.analytics.trade_frame import TradeFrame
 from edge_lab.analytics.risk_of_ruin import RiskOfRuinEngine
 
 
@@ -8,6 +8,13 @@ class KellySimulationEngine:
 
     BASE_RISK_FRACTION = 0.01  # must match equity model
 
+    # grid: risk of ruin simulated at every grid fraction
+    # analytic: Newton optimum, ruin simulated only around the safe fraction
+    MODES = ("grid", "analytic")
+
+    # upper end of the default grid; the analytic optimum is clipped to it
+    MAX_FRACTION = 5.0
+
     @staticmethod
     def evaluate_fractions(
         db: Session,
@@ -16,37 +23,57 @@ class KellySimulationEngine:
         fractions=None,
         ruin_threshold: float = 0.7,
         use_ror_constraint: bool = True,
+    ):
+        frame = TradeFrame.load(db=db, run_id=run_id, user_id=user_id)
+
+        return KellySimulationEngine.evaluate_fractions_from_r(
+            frame.r_multiple,
+            fractions=fractions,
+            ruin_threshold=ruin_threshold,
+            use_ror_constraint=use_ror_constraint,
+        )
+
+    @staticmethod
+    def evaluate_fractions_from_r(
+        r_values: np.ndarray,
+        fractions=None,
+        ruin_threshold: float = 0.7,
+        use_ror_constraint: bool = True,
     ):
         if fractions is None:
             fractions = np.linspace(0.0, 5.0, 50)
             # 5x of base risk (0–5% effective risk)
 
-        trades = (
-            db.query(Trade)
-            .filter(
-                Trade.run_id == run_id,
-                Trade.user_id == user_id,
-            )
-            .all()
-        )
-
-        if not trades:
+        if r_values.size == 0:
             raise ValueError("No trades found for run.")
 
-        r_values = np.array([t.r_multiple for t in trades])
-
         # Effective system returns
         base_returns = KellySimulationEngine.BASE_RISK_FRACTION * r_values
 
+        valid_fractions = [
+            f for f in fractions
+            if not np.any(1 + f * base_returns <= 0)
+        ]
+
+        # Common random numbers: all fractions share one set of paths
+        ror_fractions = [
+            f for f in valid_fractions
+            if use_ror_constraint and f > 0
+        ]
+        ror_results = RiskOfRuinEngine.simulate_fractions_from_returns(
+            raw_returns=base_returns,
+            fractions=ror_fractions,
+            simulations=1000,
+            ruin_threshold=ruin_threshold,
+        )
+        ror_by_fraction = dict(zip(ror_fractions, ror_results))
+
         results = []
 
-        for f in fractions:
+        for f in valid_fractions:
 
             effective_returns = f * base_returns
 
-            if np.any(1 + effective_returns <= 0):
-                continue
-
             mean_log_growth = float(
                 np.mean(np.log(1 + effective_returns))
             )
@@ -56,14 +83,9 @@ class KellySimulationEngine:
                 "mean_log_growth": mean_log_growth,
             }
 
-            if use_ror_constraint and f > 0:
-                ror = RiskOfRuinEngine.simulate_from_returns(
-                    raw_returns=base_returns,
-                    simulations=1000,
-                    position_fraction=float(f),
-                    ruin_threshold=ruin_threshold,
-                )
+            ror = ror_by_fraction.get(f)
 
+            if ror is not None:
                 entry["ruin_probability"] = ror["ruin_probability"]
                 entry["mean_max_drawdown"] = ror["mean_max_drawdown"]
             else:
@@ -95,17 +117,189 @@ class KellySimulationEngine:
             "safe_fraction": safe_fraction,
         }
 
+    # -----------------------------
+    # ANALYTIC (NEWTON)
+    # -----------------------------
+    @staticmethod
+    def growth_optimal_fraction(
+        base_returns: np.ndarray,
+        max_fraction: float = 5.0,
+        tol: float = 1e-12,
+        max_iter: int = 50,
+    ) -> dict:
+        """
+        argmax_f mean(log(1 + f x)) by safeguarded Newton on the exact
+        derivatives g' = mean(x / (1 + f x)), g'' = -mean(x^2 / (1 + f x)^2).
+        g is concave, so the root of g' is kept bracketed and any step
+        leaving the bracket falls back to bisection.
+        """
+        x = base_returns
+        worst = float(x.min())
+
+        # 1 + f x > 0 on [0, limit)
+        limit = -1 / worst if worst < 0 else np.inf
+
+        def slope(f):
+            return float(np.mean(x / (1 + f * x)))
+
+        result = {"iterations": 0, "converged": True, "bounded": False}
+
+        if slope(0.0) <= 0:
+            result["fraction"] = 0.0
+            return result
+
+        hi = min(limit, max_fraction)
+        if hi == max_fraction and slope(max_fraction) >= 0:
+            result["fraction"] = max_fraction
+            result["bounded"] = True
+            return result
+
+        lo = 0.0
+        f = min(float(np.mean(x) / np.mean(x * x)), 0.5 * (lo + hi))
+
+        for i in range(1, max_iter + 1):
+            d = 1 + f * x
+            g1 = float(np.mean(x / d))
+            g2 = -float(np.mean((x / d) ** 2))
+
+            if g1 > 0:
+                lo = f
+            else:
+                hi = f
+
+            step = g1 / g2
+            candidate = f - step
+            if not lo < candidate < hi:
+                candidate = 0.5 * (lo + hi)
+
+            done = abs(candidate - f) <= tol * max(1.0, f)
+            f = candidate
+            result["iterations"] = i
+            if done:
+                break
+        else:
+            result["converged"] = False
+
+        result["fraction"] = f
+        return result
+
+    @staticmethod
+    def optimize_from_r(
+        r_values: np.ndarray,
+        fractions=None,
+        ruin_threshold: float = 0.7,
+        simulations: int = 1000,
+        bracket_points: int = 4,
+        rounds: int = 2,
+    ):
+        """
+        Analytic mode: growth-optimal fraction by Newton, log growth on the
+        grid in one vectorized pass, and risk of ruin simulated only at
+        bracket_points fractions per round while narrowing the largest
+        fraction below the optimum with ruin < 5%. Rounds share one set of
+        bootstrap paths (common random numbers).
+        """
+        if fractions is None:
+            fractions = np.linspace(0.0, KellySimulationEngine.MAX_FRACTION, 50)
+
+        if r_values.size == 0:
+            raise ValueError("No trades found for run.")
+
+        base_returns = KellySimulationEngine.BASE_RISK_FRACTION * r_values
+
+        optimum = KellySimulationEngine.growth_optimal_fraction(
+            base_returns,
+            max_fraction=float(np.max(fractions)),
+        )
+        f_opt = optimum["fraction"]
+
+        def log_growth(f):
+            return np.mean(np.log1p(np.outer(f, base_returns)), axis=1)
+
+        fractions = np.asarray(fractions, dtype=np.float64)
+        valid = fractions[np.all(1 + np.outer(fractions, base_returns) > 0, axis=1)]
+
+        results = [
+            {
+                "fraction": float(f),
+                "mean_log_growth": float(g),
+                "ruin_probability": None,
+                "mean_max_drawdown": None,
+            }
+            for f, g in zip(valid, log_growth(valid))
+        ]
+
+        # ruin is non-decreasing in f; bracket the 5% crossing on (0, f_opt]
+        seed = int(np.random.default_rng().integers(2 ** 63))
+        simulated = {}
+        lo, hi = 0.0, f_opt
+
+        for _ in range(rounds if f_opt > 0 else 0):
+            points = lo + (hi - lo) * np.arange(1, bracket_points + 1) / bracket_points
+            ror = RiskOfRuinEngine.simulate_fractions_from_returns(
+                raw_returns=base_returns,
+                fractions=points,
+                simulations=simulations,
+                ruin_threshold=ruin_threshold,
+                rng=np.random.default_rng(seed),
+            )
+            simulated.update(zip(points.tolist(), ror))
+
+            unsafe = [i for i, r in enumerate(ror) if r["ruin_probability"] >= 0.05]
+            if not unsafe:
+                break
+            lo, hi = (lo if unsafe[0] == 0 else float(points[unsafe[0] - 1])), float(points[unsafe[0]])
+
+        def entry(f):
+            ror = simulated.get(f)
+            return {
+                "fraction": float(f),
+                "mean_log_growth": float(log_growth(np.array([f]))[0]),
+                "ruin_probability": None if ror is None else ror["ruin_probability"],
+                "mean_max_drawdown": None if ror is None else ror["mean_max_drawdown"],
+            }
+
+        bracket = [entry(f) for f in sorted(simulated)]
+
+        # the first round's top point is f_opt itself
+        growth_optimal = entry(f_opt)
+
+        safe_candidates = [
+            b for b in bracket
+            if b["ruin_probability"] < 0.05
+        ]
+
+        return {
+            "all_results": sorted(results + bracket, key=lambda x: x["fraction"]),
+            "growth_optimal": growth_optimal,
+            "safe_fraction": safe_candidates[-1] if safe_candidates else None,
+            "analytic": {
+                "iterations": optimum["iterations"],
+                "converged": optimum["converged"],
+                "bounded": optimum["bounded"],
+                "simulated_fractions": len(bracket),
+            },
+        }
+
     @staticmethod
     def generate_for_run(
         db: Session,
         run_id,
         user_id,
     ):
-        raw_results = KellySimulationEngine.evaluate_fractions(
-            db=db,
-            run_id=run_id,
-            user_id=user_id,
-        )
+        frame = TradeFrame.load(db=db, run_id=run_id, user_id=user_id)
+
+        return KellySimulationEngine.generate_from_r(frame.r_multiple)
+
+    @staticmethod
+    def generate_from_r(r_values: np.ndarray, mode: str = "grid"):
+        if mode not in KellySimulationEngine.MODES:
+            raise ValueError(f"Unknown Kelly mode '{mode}'.")
+
+        if mode == "analytic":
+            return KellySimulationEngine.optimize_from_r(r_values)
+
+        raw_results = KellySimulationEngine.evaluate_fractions_from_r(r_values)
 
         clean_results = []
 
@@ -125,8 +319,22 @@ class KellySimulationEngine:
                 ),
             })
 
+        # exact optimum alongside the grid point; the ruin sweep stays
+        base_returns = KellySimulationEngine.BASE_RISK_FRACTION * np.asarray(r_values, dtype=np.float64)
+        optimum = KellySimulationEngine.growth_optimal_fraction(
+            base_returns,
+            max_fraction=KellySimulationEngine.MAX_FRACTION,
+        )
+
         return {
             "all_results": clean_results,
             "growth_optimal": raw_results["growth_optimal"],
             "safe_fraction": raw_results["safe_fraction"],
+            "analytic": {
+                "fraction": optimum["fraction"],
+                "mean_log_growth": float(np.mean(np.log1p(optimum["fraction"] * base_returns))),
+                "iterations": optimum["iterations"],
+                "converged": optimum["converged"],
+                "bounded": optimum["bounded"],
+            },
         }
\ No newline at end of file
@@ -1,6 +1,6 @@
 import numpy as np
 from sqlalchemy.orm import Session
-from edge_lab.persistence.models import Trade
+from edge_lab.analytics.trade_frame import TradeFrame
 import uuid
 
 
@@ -44,30 +44,24 @@ class MetricsEngine:
         run_id: uuid.UUID,
         user_id: uuid.UUID,
     ):
+        frame = TradeFrame.load(db=db, run_id=run_id, user_id=user_id)
 
-        trades = (
-            db.query(Trade)
-            .filter(
-                Trade.run_id == run_id,
-                Trade.user_id == user_id,
-            )
-            .order_by(Trade.timestamp.asc())
-            .all()
-        )
+        return MetricsEngine.generate_from_r(frame.by_timestamp().r_multiple)
 
-        if not trades:
-            raise ValueError("No trades found.")
+    @staticmethod
+    def generate_from_r(r_values: np.ndarray):
+        """
+        r_values in timestamp order (drawdown depends on sequence).
+        """
 
-        r_values = np.array([t.r_multiple for t in trades if t.r_multiple is not None])
+        if r_values.size == 0:
+            raise ValueError("No trades found.")
 
         total_trades = len(r_values)
         wins = np.sum(r_values > 0)
         losses = np.sum(r_values <= 0)
 
-        win_rate = wins / total_trades
-
         total_R = np.sum(r_values)
-        avg_R = np.mean(r_values)
 
         win_r = r_values[r_values > 0]
         loss_r = r_values[r_values <= 0]
@@ -75,16 +69,8 @@ class MetricsEngine:
         avg_win_R = np.mean(win_r) if len(win_r) > 0 else 0
         avg_loss_R = np.mean(loss_r) if len(loss_r) > 0 else 0
 
-        expectancy = win_rate * avg_win_R + (1 - win_rate) * avg_loss_R
-
         volatility_R = np.std(r_values)
 
-        if avg_loss_R != 0:
-            b = avg_win_R / abs(avg_loss_R)
-            kelly_f = (win_rate * b - (1 - win_rate)) / b
-        else:
-            kelly_f = 0
-
         safe_r = r_values[r_values > -1]
 
         if len(safe_r) > 0:
@@ -97,6 +83,45 @@ class MetricsEngine:
         drawdown = cumulative - peak
         max_dd = np.min(drawdown)
 
+        return MetricsEngine.summarize(
+            total_trades=total_trades,
+            wins=wins,
+            losses=losses,
+            total_R=total_R,
+            avg_win_R=avg_win_R,
+            avg_loss_R=avg_loss_R,
+            volatility_R=volatility_R,
+            log_growth=log_growth,
+            max_dd=max_dd,
+        )
+
+    @staticmethod
+    def summarize(
+        total_trades,
+        wins,
+        losses,
+        total_R,
+        avg_win_R,
+        avg_loss_R,
+        volatility_R,
+        log_growth,
+        max_dd,
+    ):
+        """
+        Shared metrics_json layout for full and incremental computes.
+        """
+
+        win_rate = wins / total_trades
+        avg_R = total_R / total_trades
+
+        expectancy = win_rate * avg_win_R + (1 - win_rate) * avg_loss_R
+
+        if avg_loss_R != 0:
+            b = avg_win_R / abs(avg_loss_R)
+            kelly_f = (win_rate * b - (1 - win_rate)) / b
+        else:
+            kelly_f = 0
+
         def safe(x):
             if np.isnan(x) or np.isinf(x):
                 return 0.0
@@ -116,4 +141,4 @@ class MetricsEngine:
             "kelly_f": round(safe(kelly_f), 4),
             "log_growth": round(safe(log_growth), 6),
             "max_drawdown_R": round(safe(max_dd), 4),
-        }
\ No newline at end of file
+        }
@@ -1,55 +1,73 @@
 import numpy as np
 from sqlalchemy.orm import Session
-from edge_lab.persistence.models import Trade
+from edge_lab.analytics.trade_frame import TradeFrame
 
 
 class MonteCarloEngine:
 
     BASE_RISK_FRACTION = 0.01
 
+    # Upper bound on elements per (chunk, n) simulation matrix (~16 MB float64)
+    CHUNK_ELEMENTS = 2_000_000
+
     @staticmethod
     def bootstrap_run(
         db: Session,
         run_id,
         user_id,
         simulations: int = 10000,
+        rng: np.random.Generator | None = None,
     ):
-        trades = (
-            db.query(Trade)
-            .filter(
-                Trade.run_id == run_id,
-                Trade.user_id == user_id,
-            )
-            .all()
+        frame = TradeFrame.load(db=db, run_id=run_id, user_id=user_id)
+
+        return MonteCarloEngine.bootstrap_from_r(
+            frame.r_multiple,
+            simulations=simulations,
+            rng=rng,
         )
 
-        if not trades:
+    @staticmethod
+    def bootstrap_from_r(
+        r_values: np.ndarray,
+        simulations: int = 10000,
+        rng: np.random.Generator | None = None,
+        chunk_size: int | None = None,
+    ):
+        """
+        Batched bootstrap: paths are simulated as (chunk, n) matrices.
+        chunk_size defaults to CHUNK_ELEMENTS // n rows.
+        """
+
+        if r_values.size == 0:
             raise ValueError("No trades found for run.")
 
-        r_values = np.array([t.r_multiple for t in trades])
+        if rng is None:
+            rng = np.random.default_rng()
+
         base_returns = MonteCarloEngine.BASE_RISK_FRACTION * r_values
         n = len(base_returns)
 
-        final_returns = []
-        max_drawdowns = []
-
-        for _ in range(simulations):
+        if chunk_size is None:
+            chunk_size = max(1, MonteCarloEngine.CHUNK_ELEMENTS // n)
 
-            sample = np.random.choice(base_returns, size=n, replace=True)
+        final_returns = np.empty(simulations, dtype=np.float64)
+        max_drawdowns = np.empty(simulations, dtype=np.float64)
 
-            equity = np.cumprod(1 + sample)
+        for start in range(0, simulations, chunk_size):
+            stop = min(start + chunk_size, simulations)
 
-            final_return = equity[-1] - 1
+            idx = rng.integers(0, n, size=(stop - start, n))
+            equity = base_returns[idx]
 
-            peak = np.maximum.accumulate(equity)
-            drawdown = equity / peak - 1
-            max_dd = np.min(drawdown)
+            # In place: equity = cumprod(1 + sample)
+            equity += 1
+            np.cumprod(equity, axis=1, out=equity)
 
-            final_returns.append(final_return)
-            max_drawdowns.append(max_dd)
+            final_returns[start:stop] = equity[:, -1] - 1
 
-        final_returns = np.array(final_returns)
-        max_drawdowns = np.array(max_drawdowns)
+            peaks = np.maximum.accumulate(equity, axis=1)
+            np.divide(equity, peaks, out=peaks)
+            max_drawdowns[start:stop] = peaks.min(axis=1) - 1
 
         return {
             "mean_final_return": float(np.mean(final_returns)),
@@ -59,4 +77,4 @@ class MonteCarloEngine:
             "mean_max_dd": float(np.mean(max_drawdowns)),
             "worst_case_dd": float(np.min(max_drawdowns)),
             "p95_dd": float(np.percentile(max_drawdowns, 95)),
-        }
\ No newline at end of file
+        }
@@ -0,0 +1,157 @@
+import numpy as np
+from sqlalchemy.orm import Session
+from edge_lab.persistence.models import Trade, Run, Variant, Strategy
+
+
+class PortfolioEquityEngine:
+    """
+    Real portfolio equity from the strategies' trade streams.
+
+    Each strategy is a sleeve holding its allocation weight of capital and
+    risking BASE_RISK_FRACTION of the sleeve per trade, rebalanced to the
+    target weights after every trade. Streams are merged by Trade.timestamp.
+    """
+
+    BASE_RISK_FRACTION = 0.01  # must match EquityBuilder
+
+    @staticmethod
+    def load_streams(
+        db: Session,
+        user_id,
+        strategy_ids: list,
+    ) -> list[tuple[np.ndarray, np.ndarray]]:
+        """
+        One column query for all strategies; returns a (timestamp,
+        r_multiple) pair per strategy id, each sorted by timestamp.
+        """
+        empty = (np.empty(0, dtype="datetime64[us]"), np.empty(0, dtype=np.float64))
+
+        if not strategy_ids:
+            return []
+
+        rows = (
+            db.query(
+                Strategy.id,
+                Trade.timestamp,
+                Trade.r_multiple,
+            )
+            .join(Run, Run.id == Trade.run_id)
+            .join(Variant, Variant.id == Run.variant_id)
+            .join(Strategy, Strategy.id == Variant.strategy_id)
+            .filter(
+                Trade.user_id == user_id,
+                Strategy.id.in_(strategy_ids),
+            )
+            .order_by(Strategy.id, Trade.timestamp, Trade.created_at)
+            .all()
+        )
+
+        if not rows:
+            return [empty for _ in strategy_ids]
+
+        owners, timestamps, r_values = zip(*rows)
+        n = len(rows)
+
+        timestamps = np.array(timestamps, dtype="datetime64[us]")
+        r_values = np.fromiter(r_values, dtype=np.float64, count=n)
+
+        # rows are grouped by strategy: slice on the group boundaries
+        slices = {}
+        start = 0
+        for i in range(1, n + 1):
+            if i == n or owners[i] != owners[start]:
+                slices[owners[start]] = slice(start, i)
+                start = i
+
+        streams = []
+        for strategy_id in strategy_ids:
+            s = slices.get(strategy_id)
+            streams.append(empty if s is None else (timestamps[s], r_values[s]))
+
+        return streams
+
+    @staticmethod
+    def merge(streams: list[tuple[np.ndarray, np.ndarray]]):
+        """
+        K-way merge of timestamp-sorted streams.
+
+        Returns (timestamp, r_multiple, stream_index) in merged order; ties
+        keep stream order. The stable sort on already-sorted runs is a
+        linear merge for int64 keys.
+        """
+        if not streams:
+            return (
+                np.empty(0, dtype="datetime64[us]"),
+                np.empty(0, dtype=np.float64),
+                np.empty(0, dtype=np.int64),
+            )
+
+        timestamps = np.concatenate([t for t, _ in streams])
+        r_values = np.concatenate([r for _, r in streams])
+        index = np.repeat(
+            np.arange(len(streams), dtype=np.int64),
+            [t.size for t, _ in streams],
+        )
+
+        order = np.argsort(timestamps.astype(np.int64), kind="stable")
+
+        return timestamps[order], r_values[order], index[order]
+
+    @staticmethod
+    def build_from_streams(
+        streams: list[tuple[np.ndarray, np.ndarray]],
+        weights: np.ndarray,
+    ) -> dict:
+        """
+        Merged equity and drawdown path, vectorized over the merged arrays.
+        weights[i] is the capital share of streams[i].
+        """
+        timestamps, r_values, index = PortfolioEquityEngine.merge(streams)
+
+        if r_values.size == 0:
+            return {
+                "timestamp": [],
+                "equity": [],
+                "drawdown": [],
+                "summary": {
+                    "total_trades": 0,
+                    "final_equity": 1.0,
+                    "log_growth": 0.0,
+                    "max_drawdown": 0.0,
+                },
+            }
+
+        returns = (
+            np.asarray(weights, dtype=np.float64)[index]
+            * PortfolioEquityEngine.BASE_RISK_FRACTION
+            * r_values
+        )
+        # a sleeve cannot lose more than it holds
+        returns = np.maximum(returns, -0.999999)
+
+        log_returns = np.log1p(returns)
+        equity = np.exp(np.cumsum(log_returns))
+        drawdown = equity / np.maximum.accumulate(equity) - 1
+
+        return {
+            "timestamp": np.datetime_as_string(timestamps, unit="s").tolist(),
+            "equity": equity.tolist(),
+            "drawdown": drawdown.tolist(),
+            "summary": {
+                "total_trades": int(r_values.size),
+                "final_equity": float(equity[-1]),
+                "log_growth": float(np.mean(log_returns)),
+                "max_drawdown": float(drawdown.min()),
+            },
+        }
+
+    @staticmethod
+    def build(
+        db: Session,
+        user_id,
+        strategy_ids: list,
+        weights: np.ndarray,
+    ) -> dict:
+        streams = PortfolioEquityEngine.load_streams(db, user_id, strategy_ids)
+
+        return PortfolioEquityEngine.build_from_streams(streams, weights)
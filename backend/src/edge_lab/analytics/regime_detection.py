@@ -1,7 +1,7 @@
 import numpy as np
 from sklearn.cluster import KMeans
 from sqlalchemy.orm import Session
-from edge_lab.persistence.models import Trade
+from edge_lab.analytics.trade_frame import TradeFrame
 
 
 class RegimeDetectionEngine:
@@ -15,24 +15,30 @@ class RegimeDetectionEngine:
         clusters: int = 2,
     ):
 
-        trades = (
-            db.query(Trade)
-            .filter(
-                Trade.run_id == run_id,
-                Trade.user_id == user_id,
-            )
-            .order_by(Trade.created_at)
-            .all()
+        frame = TradeFrame.load(db=db, run_id=run_id, user_id=user_id)
+
+        return RegimeDetectionEngine.detect_from_log_returns(
+            frame.log_return,
+            window=window,
+            clusters=clusters,
         )
 
-        if not trades or len(trades) <= window:
+    @staticmethod
+    def detect_from_log_returns(
+        log_returns: np.ndarray,
+        window: int = 20,
+        clusters: int = 2,
+    ):
+        """
+        log_returns in created_at order.
+        """
+
+        if log_returns.size <= window:
             return {
                 "labels": [],
                 "centroids": [],
             }
 
-        log_returns = np.array([t.log_return for t in trades])
-
         rolling_vol = []
         rolling_mean = []
 
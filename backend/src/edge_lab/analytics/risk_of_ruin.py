@@ -1,10 +1,31 @@
+import threading
+from collections import OrderedDict
+from typing import Callable
+
 import numpy as np
 from sqlalchemy.orm import Session
-from edge_lab.persistence.models import Trade
+from edge_lab.analytics.trade_frame import TradeFrame
 
 
 class RiskOfRuinEngine:
 
+    # Upper bound on elements per (simulations, block) matrix in streaming mode
+    STREAM_BLOCK_ELEMENTS = 2_000_000
+
+    # Interactive mode: resampled return matrices per (run version, shape)
+    # and per-path summaries per fraction on top of them, bounded by bytes
+    KERNEL_CACHE_BYTES = 320_000_000
+    SUMMARY_CACHE_BYTES = 64_000_000
+
+    # simulations * max_trades per kernel (~80 MB float64); a summary holds
+    # three float64 arrays of length simulations (~2.4 MB at the cap)
+    MAX_KERNEL_ELEMENTS = 10_000_000
+    MAX_SIMULATIONS = 100_000
+
+    _kernels: OrderedDict = OrderedDict()
+    _summaries: OrderedDict = OrderedDict()
+    _cache_lock = threading.Lock()
+
     @staticmethod
     def simulate_from_returns(
         raw_returns: np.ndarray,
@@ -54,6 +75,294 @@ class RiskOfRuinEngine:
             "worst_case_drawdown": float(np.min(max_drawdowns)),
         }
 
+    @staticmethod
+    def simulate_from_returns_streaming(
+        raw_returns: np.ndarray,
+        simulations: int = 10000,
+        position_fraction: float = 0.01,
+        ruin_threshold: float = 0.7,
+        max_trades: int = 500,
+        rng: np.random.Generator | None = None,
+        block_size: int | None = None,
+    ):
+        """
+        Memory-bounded variant of simulate_from_returns.
+
+        Walks the trade axis in blocks, carrying only per-path running
+        capital, peak, min drawdown and a ruined flag between blocks.
+        block_size defaults to STREAM_BLOCK_ELEMENTS // simulations trades.
+        """
+
+        if raw_returns.size == 0:
+            raise ValueError("No returns provided.")
+
+        if simulations < 1 or max_trades < 1:
+            raise ValueError("simulations and max_trades must be positive.")
+
+        if rng is None:
+            rng = np.random.default_rng()
+
+        if block_size is None:
+            block_size = max(1, RiskOfRuinEngine.STREAM_BLOCK_ELEMENTS // simulations)
+
+        capital = np.ones(simulations, dtype=np.float64)
+        peak = np.full(simulations, -np.inf, dtype=np.float64)
+        max_drawdowns = np.zeros(simulations, dtype=np.float64)
+        ruined = np.zeros(simulations, dtype=bool)
+
+        for start in range(0, max_trades, block_size):
+            width = min(block_size, max_trades - start)
+
+            idx = rng.integers(0, raw_returns.size, size=(simulations, width))
+            paths = raw_returns[idx]
+
+            # In place: paths = capital * cumprod(1 + f * r)
+            paths *= position_fraction
+            paths += 1
+            np.cumprod(paths, axis=1, out=paths)
+            paths *= capital[:, None]
+
+            ruined |= np.any(paths <= ruin_threshold, axis=1)
+
+            peaks = np.maximum.accumulate(paths, axis=1)
+            np.maximum(peaks, peak[:, None], out=peaks)
+
+            capital = paths[:, -1].copy()
+            peak = peaks[:, -1].copy()
+
+            np.divide(paths, peaks, out=paths)
+            np.minimum(max_drawdowns, paths.min(axis=1) - 1, out=max_drawdowns)
+
+        return {
+            "ruin_probability": float(np.mean(ruined)),
+            "mean_final_capital": float(np.mean(capital)),
+            "median_final_capital": float(np.median(capital)),
+            "mean_max_drawdown": float(np.mean(max_drawdowns)),
+            "worst_case_drawdown": float(np.min(max_drawdowns)),
+        }
+
+    @staticmethod
+    def simulate_fractions_from_returns(
+        raw_returns: np.ndarray,
+        fractions,
+        simulations: int = 1000,
+        ruin_threshold: float = 0.7,
+        max_trades: int = 500,
+        rng: np.random.Generator | None = None,
+    ):
+        """
+        Common-random-numbers sweep over position fractions.
+
+        One bootstrap index matrix is drawn and every fraction is evaluated
+        against the same paths, as (fractions, simulations, max_trades)
+        blocks bounded by STREAM_BLOCK_ELEMENTS. Returns one result dict
+        per fraction, in input order.
+        """
+
+        if raw_returns.size == 0:
+            raise ValueError("No returns provided.")
+
+        fractions = np.asarray(fractions, dtype=np.float64)
+
+        if fractions.size == 0:
+            return []
+
+        if rng is None:
+            rng = np.random.default_rng()
+
+        idx = rng.integers(0, raw_returns.size, size=(simulations, max_trades))
+        sample = raw_returns[idx]
+
+        block = max(
+            1,
+            RiskOfRuinEngine.STREAM_BLOCK_ELEMENTS // (simulations * max_trades),
+        )
+
+        results = []
+
+        for start in range(0, fractions.size, block):
+            f = fractions[start:start + block]
+
+            capital_paths = f[:, None, None] * sample[None, :, :]
+            capital_paths += 1
+            np.cumprod(capital_paths, axis=2, out=capital_paths)
+
+            ruined = np.any(capital_paths <= ruin_threshold, axis=2)
+            final_capitals = capital_paths[:, :, -1]
+
+            peaks = np.maximum.accumulate(capital_paths, axis=2)
+            np.divide(capital_paths, peaks, out=peaks)
+            max_drawdowns = peaks.min(axis=2) - 1
+
+            for i in range(f.size):
+                results.append({
+                    "ruin_probability": float(np.mean(ruined[i])),
+                    "mean_final_capital": float(np.mean(final_capitals[i])),
+                    "median_final_capital": float(np.median(final_capitals[i])),
+                    "mean_max_drawdown": float(np.mean(max_drawdowns[i])),
+                    "worst_case_drawdown": float(np.min(max_drawdowns[i])),
+                })
+
+        return results
+
+    # -----------------------------
+    # INTERACTIVE (CACHED KERNELS)
+    # -----------------------------
+    @staticmethod
+    def _nbytes(value) -> int:
+        if isinstance(value, dict):
+            return sum(v.nbytes for v in value.values())
+        return value.nbytes
+
+    @staticmethod
+    def _lru_get(cache: OrderedDict, key):
+        with RiskOfRuinEngine._cache_lock:
+            entry = cache.get(key)
+            if entry is None:
+                return None
+            cache.move_to_end(key)
+            return entry[0]
+
+    @staticmethod
+    def _lru_put(cache: OrderedDict, key, value, max_bytes: int):
+        """
+        Insert value and evict least recently used entries until the cache
+        fits in max_bytes. A value larger than max_bytes is not cached.
+        """
+        nbytes = RiskOfRuinEngine._nbytes(value)
+        if nbytes > max_bytes:
+            return
+
+        with RiskOfRuinEngine._cache_lock:
+            cache.pop(key, None)
+            total = sum(entry[1] for entry in cache.values())
+            while cache and total + nbytes > max_bytes:
+                _, (_, evicted) = cache.popitem(last=False)
+                total -= evicted
+            cache[key] = (value, nbytes)
+
+    @staticmethod
+    def kernel(
+        cache_key,
+        load_returns: Callable[[], np.ndarray],
+        simulations: int,
+        max_trades: int,
+    ) -> np.ndarray:
+        """
+        (simulations, max_trades) bootstrap sample of raw returns, drawn once
+        per cache_key (caller includes the data version) and shape.
+        load_returns is only called on a miss.
+        """
+        key = (cache_key, simulations, max_trades)
+        sample = RiskOfRuinEngine._lru_get(RiskOfRuinEngine._kernels, key)
+
+        if sample is None:
+            raw_returns = load_returns()
+            if raw_returns.size == 0:
+                raise ValueError("No trades found for run.")
+
+            idx = np.random.default_rng().integers(0, raw_returns.size, size=(simulations, max_trades))
+            sample = raw_returns[idx]
+            RiskOfRuinEngine._lru_put(
+                RiskOfRuinEngine._kernels,
+                key,
+                sample,
+                RiskOfRuinEngine.KERNEL_CACHE_BYTES,
+            )
+
+        return sample
+
+    @staticmethod
+    def path_summary(sample: np.ndarray, position_fraction: float) -> dict:
+        """
+        Threshold-independent per-path statistics: lowest capital, final
+        capital and max drawdown. Ruin for any threshold is then
+        min_capital <= threshold, so only fraction changes touch the paths.
+        """
+        simulations, max_trades = sample.shape
+        rows = max(1, RiskOfRuinEngine.STREAM_BLOCK_ELEMENTS // max_trades)
+
+        min_capital = np.empty(simulations)
+        final_capital = np.empty(simulations)
+        max_drawdown = np.empty(simulations)
+
+        for start in range(0, simulations, rows):
+            stop = min(start + rows, simulations)
+
+            paths = position_fraction * sample[start:stop]
+            paths += 1
+            np.cumprod(paths, axis=1, out=paths)
+
+            min_capital[start:stop] = paths.min(axis=1)
+            final_capital[start:stop] = paths[:, -1]
+
+            peaks = np.maximum.accumulate(paths, axis=1)
+            np.divide(paths, peaks, out=paths)
+            max_drawdown[start:stop] = paths.min(axis=1) - 1
+
+        return {
+            "min_capital": min_capital,
+            "final_capital": final_capital,
+            "max_drawdown": max_drawdown,
+        }
+
+    @staticmethod
+    def simulate_cached(
+        cache_key,
+        load_r_values: Callable[[], np.ndarray],
+        simulations: int = 10000,
+        position_fraction: float = 1.0,
+        ruin_threshold: float = 0.7,
+        max_trades: int = 500,
+    ) -> dict:
+        """
+        simulate_from_r on a cached kernel. Repeated calls for the same run
+        version reuse one set of paths, so results move smoothly with the
+        parameters; a threshold change is O(simulations). load_r_values is
+        only called when the kernel is not cached, so hits read no trades.
+        """
+        if simulations < 1 or max_trades < 1:
+            raise ValueError("simulations and max_trades must be positive.")
+
+        if simulations > RiskOfRuinEngine.MAX_SIMULATIONS:
+            raise ValueError(
+                f"simulations must not exceed {RiskOfRuinEngine.MAX_SIMULATIONS}."
+            )
+
+        if simulations * max_trades > RiskOfRuinEngine.MAX_KERNEL_ELEMENTS:
+            raise ValueError(
+                f"simulations * max_trades must not exceed {RiskOfRuinEngine.MAX_KERNEL_ELEMENTS}."
+            )
+
+        if not 0 < ruin_threshold < 1 or position_fraction <= 0:
+            raise ValueError("Require 0 < ruin_threshold < 1 and position_fraction > 0.")
+
+        key = (cache_key, simulations, max_trades, float(position_fraction))
+        summary = RiskOfRuinEngine._lru_get(RiskOfRuinEngine._summaries, key)
+
+        if summary is None:
+            sample = RiskOfRuinEngine.kernel(
+                cache_key,
+                lambda: 0.01 * load_r_values(),
+                simulations,
+                max_trades,
+            )
+            summary = RiskOfRuinEngine.path_summary(sample, position_fraction)
+            RiskOfRuinEngine._lru_put(
+                RiskOfRuinEngine._summaries,
+                key,
+                summary,
+                RiskOfRuinEngine.SUMMARY_CACHE_BYTES,
+            )
+
+        return {
+            "ruin_probability": float(np.mean(summary["min_capital"] <= ruin_threshold)),
+            "mean_final_capital": float(np.mean(summary["final_capital"])),
+            "median_final_capital": float(np.median(summary["final_capital"])),
+            "mean_max_drawdown": float(np.mean(summary["max_drawdown"])),
+            "worst_case_drawdown": float(np.min(summary["max_drawdown"])),
+        }
+
     @staticmethod
     def simulate(
         db: Session,
@@ -63,23 +372,42 @@ class RiskOfRuinEngine:
         position_fraction: float = 1.0,
         ruin_threshold: float = 0.7,
         max_trades: int = 500,
+        streaming: bool = False,
     ):
-        trades = (
-            db.query(Trade)
-            .filter(
-                Trade.run_id == run_id,
-                Trade.user_id == user_id,
-            )
-            .all()
+        frame = TradeFrame.load(db=db, run_id=run_id, user_id=user_id)
+
+        return RiskOfRuinEngine.simulate_from_r(
+            frame.r_multiple,
+            simulations=simulations,
+            position_fraction=position_fraction,
+            ruin_threshold=ruin_threshold,
+            max_trades=max_trades,
+            streaming=streaming,
         )
 
-        if not trades:
+    @staticmethod
+    def simulate_from_r(
+        r_values: np.ndarray,
+        simulations: int = 10000,
+        position_fraction: float = 1.0,
+        ruin_threshold: float = 0.7,
+        max_trades: int = 500,
+        streaming: bool = False,
+    ):
+        if r_values.size == 0:
             raise ValueError("No trades found for run.")
 
-        r_values = np.array([t.r_multiple for t in trades])
-
         base_returns = 0.01 * r_values
 
+        if streaming:
+            return RiskOfRuinEngine.simulate_from_returns_streaming(
+                raw_returns=base_returns,
+                simulations=simulations,
+                position_fraction=position_fraction,
+                ruin_threshold=ruin_threshold,
+                max_trades=max_trades,
+            )
+
         return RiskOfRuinEngine.simulate_from_returns(
             raw_returns=base_returns,
             simulations=simulations,
@@ -0,0 +1,199 @@
+import math
+
+
+class RollupStats:
+    """
+    Mergeable sufficient statistics for hierarchy roll-ups.
+
+    Every snapshot level stores, per run metric, the count, mean, M2
+    (Welford), min, max and trade-weighted sum over all runs beneath it.
+    Parents merge children in O(children) (Chan et al. parallel update),
+    and a single run change can be applied to ancestors by removing the
+    old contribution and merging the new one.
+
+    Only expectancy_R keeps exact min/max (summary() reports them); for
+    the other metrics min/max are outer bounds once a child was removed.
+    """
+
+    METRICS = (
+        "expectancy_R",
+        "log_growth",
+        "sharpe",
+        "max_drawdown_R",
+    )
+
+    EXACT_EXTREMES = ("expectancy_R",)
+
+    # -----------------------------
+    # SINGLE METRIC
+    # -----------------------------
+    @staticmethod
+    def empty() -> dict:
+        return {
+            "count": 0,
+            "mean": 0.0,
+            "m2": 0.0,
+            "min": None,
+            "max": None,
+            "weight": 0,
+            "weighted_sum": 0.0,
+        }
+
+    @staticmethod
+    def from_value(x: float, weight: int) -> dict:
+        return {
+            "count": 1,
+            "mean": float(x),
+            "m2": 0.0,
+            "min": float(x),
+            "max": float(x),
+            "weight": int(weight),
+            "weighted_sum": float(x) * weight,
+        }
+
+    @staticmethod
+    def merge(a: dict, b: dict) -> dict:
+        if b["count"] == 0:
+            return dict(a)
+        if a["count"] == 0:
+            return dict(b)
+
+        n = a["count"] + b["count"]
+        delta = b["mean"] - a["mean"]
+
+        return {
+            "count": n,
+            "mean": a["mean"] + delta * b["count"] / n,
+            "m2": a["m2"] + b["m2"] + delta * delta * a["count"] * b["count"] / n,
+            "min": min(a["min"], b["min"]),
+            "max": max(a["max"], b["max"]),
+            "weight": a["weight"] + b["weight"],
+            "weighted_sum": a["weighted_sum"] + b["weighted_sum"],
+        }
+
+    @staticmethod
+    def remove(a: dict, b: dict, exact_extremes: bool = True) -> dict | None:
+        """
+        Inverse of merge: a without the part b. With exact_extremes,
+        returns None when the result's min/max cannot be known (b held an
+        extreme); otherwise a's min/max are kept as outer bounds.
+        """
+        n = a["count"] - b["count"]
+
+        if n < 0:
+            return None
+        if b["count"] == 0:
+            return dict(a)
+        if n == 0:
+            return RollupStats.empty()
+
+        if exact_extremes and (b["min"] <= a["min"] or b["max"] >= a["max"]):
+            return None
+
+        mean = (a["mean"] * a["count"] - b["mean"] * b["count"]) / n
+        delta = b["mean"] - mean
+
+        return {
+            "count": n,
+            "mean": mean,
+            "m2": max(a["m2"] - b["m2"] - delta * delta * n * b["count"] / a["count"], 0.0),
+            "min": a["min"],
+            "max": a["max"],
+            "weight": a["weight"] - b["weight"],
+            "weighted_sum": a["weighted_sum"] - b["weighted_sum"],
+        }
+
+    # -----------------------------
+    # PER SNAPSHOT (ALL METRICS)
+    # -----------------------------
+    @staticmethod
+    def from_run_metrics(metrics: dict | None) -> dict:
+        """
+        Contribution of one run, from its metrics_json.
+        """
+        metrics = metrics or {}
+        weight = int(metrics.get("total_trades") or 0)
+
+        stats = {}
+        for name in RollupStats.METRICS:
+            x = metrics.get(name)
+            stats[name] = RollupStats.empty() if x is None else RollupStats.from_value(x, weight)
+
+        return stats
+
+    @staticmethod
+    def combine(children: list[dict]) -> dict:
+        stats = {name: RollupStats.empty() for name in RollupStats.METRICS}
+        for child in children:
+            for name in RollupStats.METRICS:
+                stats[name] = RollupStats.merge(stats[name], child[name])
+        return stats
+
+    @staticmethod
+    def replace(stats: dict, old: dict | None, new: dict) -> dict | None:
+        """
+        Swap one child's contribution; None if the parent must be rebuilt.
+        """
+        result = {}
+        for name in RollupStats.METRICS:
+            base = stats[name]
+            if old is not None:
+                exact = (
+                    name in RollupStats.EXACT_EXTREMES
+                    and not RollupStats._extremes_survive(base, old[name], new[name])
+                )
+                base = RollupStats.remove(base, old[name], exact_extremes=exact)
+                if base is None:
+                    return None
+            result[name] = RollupStats.merge(base, new[name])
+        return result
+
+    @staticmethod
+    def _extremes_survive(a: dict, old: dict, new: dict) -> bool:
+        """
+        Whether a's min/max, merged with new, are still exact once old is
+        removed: on each side old either did not hold the extreme or new
+        reaches at least as far.
+        """
+        if old["count"] == 0:
+            return True
+        if a["count"] < old["count"]:
+            return False
+
+        low = old["min"] > a["min"] or (new["count"] > 0 and new["min"] <= old["min"])
+        high = old["max"] < a["max"] or (new["count"] > 0 and new["max"] >= old["max"])
+        return low and high
+
+    # -----------------------------
+    # SUMMARIES
+    # -----------------------------
+    @staticmethod
+    def mean(s: dict) -> float | None:
+        return s["mean"] if s["count"] else None
+
+    @staticmethod
+    def pstdev(s: dict) -> float:
+        return math.sqrt(s["m2"] / s["count"]) if s["count"] > 1 else 0.0
+
+    @staticmethod
+    def weighted_mean(s: dict) -> float | None:
+        return s["weighted_sum"] / s["weight"] if s["weight"] else None
+
+    @staticmethod
+    def summary(stats: dict) -> dict:
+        """
+        aggregated_metrics_json layout shared by variant and strategy.
+        """
+        e = stats["expectancy_R"]
+
+        return {
+            "mean_expectancy": RollupStats.mean(e),
+            "mean_log_growth": RollupStats.mean(stats["log_growth"]),
+            "mean_sharpe": RollupStats.mean(stats["sharpe"]),
+            "mean_max_drawdown": RollupStats.mean(stats["max_drawdown_R"]),
+            "std_expectancy": RollupStats.pstdev(e),
+            "best_run_expectancy": e["max"],
+            "worst_run_expectancy": e["min"],
+            "trade_weighted_expectancy": RollupStats.weighted_mean(e),
+            "trade_weighted_log_growth": RollupStats.weighted_mean(stats["log_growth"]),
+        }
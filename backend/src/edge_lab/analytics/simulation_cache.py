@@ -0,0 +1,135 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Callable
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from edge_lab.persistence.models import SimulationResult
+
+
+class SimulationCache:
+    """
+    Content-addressed memoization of bootstrap simulations.
+
+    Monte Carlo, risk-of-ruin and Kelly sample trades with replacement, so
+    their output distribution depends only on the R multiset and the
+    engine parameters, not on trade order or any other trade field. Results
+    are keyed by a hash of the sorted R array plus parameters and kept in
+    an in-process LRU (shared across threads under a lock) backed by the
+    simulation_results table (per user).
+    The table keeps the newest MAX_ROWS_PER_ENGINE rows per user and
+    engine; older rows are pruned whenever a new one is stored.
+
+    Bump VERSION when an engine's output changes for the same inputs.
+    """
+
+    VERSION = 2
+
+    CACHE_SIZE = 256
+
+    MAX_ROWS_PER_ENGINE = 500
+
+    _cache: OrderedDict = OrderedDict()
+    _cache_lock = threading.Lock()
+
+    @staticmethod
+    def key(engine: str, r_values: np.ndarray, params: dict) -> str:
+        digest = hashlib.sha256()
+        digest.update(
+            json.dumps(
+                {"engine": engine, "version": SimulationCache.VERSION, "params": params},
+                sort_keys=True,
+            ).encode()
+        )
+        digest.update(np.sort(np.asarray(r_values, dtype=np.float64)).tobytes())
+        return digest.hexdigest()
+
+    @staticmethod
+    def get_or_compute(
+        db: Session | None,
+        user_id,
+        engine: str,
+        r_values: np.ndarray,
+        params: dict,
+        compute: Callable[[], dict],
+    ) -> dict:
+        """
+        compute() runs only on a miss in both tiers. db=None skips the table.
+        The persistent row is added in a savepoint; the caller commits.
+        """
+        key = SimulationCache.key(engine, r_values, params)
+        lru_key = (user_id, key)
+
+        with SimulationCache._cache_lock:
+            cached = SimulationCache._cache.get(lru_key)
+            if cached is not None:
+                SimulationCache._cache.move_to_end(lru_key)
+                return cached
+
+        result = None
+
+        if db is not None:
+            row = (
+                db.query(SimulationResult.result_json)
+                .filter(
+                    SimulationResult.user_id == user_id,
+                    SimulationResult.key == key,
+                )
+                .first()
+            )
+            if row:
+                result = row[0]
+
+        if result is None:
+            result = compute()
+
+            if db is not None:
+                try:
+                    with db.begin_nested():
+                        db.add(
+                            SimulationResult(
+                                user_id=user_id,
+                                key=key,
+                                engine=engine,
+                                result_json=result,
+                            )
+                        )
+                        db.flush()
+                        SimulationCache._prune(db, user_id, engine)
+                except IntegrityError:
+                    # a concurrent compute stored the same inputs first
+                    pass
+
+        with SimulationCache._cache_lock:
+            SimulationCache._cache[lru_key] = result
+            SimulationCache._cache.move_to_end(lru_key)
+            while len(SimulationCache._cache) > SimulationCache.CACHE_SIZE:
+                SimulationCache._cache.popitem(last=False)
+
+        return result
+
+    @staticmethod
+    def _prune(db: Session, user_id, engine: str) -> None:
+        """
+        Delete the user's rows for engine beyond the newest
+        MAX_ROWS_PER_ENGINE (one index range scan).
+        """
+        expired = (
+            select(SimulationResult.id)
+            .where(
+                SimulationResult.user_id == user_id,
+                SimulationResult.engine == engine,
+            )
+            .order_by(SimulationResult.created_at.desc(), SimulationResult.id)
+            .offset(SimulationCache.MAX_ROWS_PER_ENGINE)
+        )
+
+        (
+            db.query(SimulationResult)
+            .filter(SimulationResult.id.in_(expired.scalar_subquery()))
+            .delete(synchronize_session=False)
+        )
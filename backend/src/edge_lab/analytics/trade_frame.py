@@ -0,0 +1,167 @@
+import numpy as np
+from sqlalchemy.orm import Session
+from edge_lab.persistence.models import Run, Trade
+from edge_lab.persistence.trade_store import ColumnarTradeStore
+
+
+class TradeFrame:
+    """
+    Columnar view of a run's trades, loaded once and shared by all engines.
+
+    Rows are ordered by created_at (the order used by equity, walk forward
+    and regime detection). Use by_timestamp() for timestamp order.
+    """
+
+    def __init__(
+        self,
+        r_multiple: np.ndarray,
+        log_return: np.ndarray,
+        raw_return: np.ndarray,
+        timestamp: np.ndarray,
+        created_at: np.ndarray,
+    ):
+        self.r_multiple = r_multiple
+        self.log_return = log_return
+        self.raw_return = raw_return
+        self.timestamp = timestamp
+        self.created_at = created_at
+
+    def __len__(self):
+        return self.r_multiple.size
+
+    @property
+    def is_empty(self) -> bool:
+        return self.r_multiple.size == 0
+
+    def by_timestamp(self) -> "TradeFrame":
+        order = np.argsort(self.timestamp, kind="stable")
+        return TradeFrame(
+            r_multiple=self.r_multiple[order],
+            log_return=self.log_return[order],
+            raw_return=self.raw_return[order],
+            timestamp=self.timestamp[order],
+            created_at=self.created_at[order],
+        )
+
+    @staticmethod
+    def from_rows(rows) -> "TradeFrame":
+        """
+        Build a frame from (r_multiple, log_return, raw_return,
+        timestamp, created_at) tuples.
+        """
+        n = len(rows)
+
+        if n == 0:
+            return TradeFrame(
+                r_multiple=np.empty(0, dtype=np.float64),
+                log_return=np.empty(0, dtype=np.float64),
+                raw_return=np.empty(0, dtype=np.float64),
+                timestamp=np.empty(0, dtype="datetime64[us]"),
+                created_at=np.empty(0, dtype="datetime64[us]"),
+            )
+
+        r_multiple, log_return, raw_return, timestamp, created_at = zip(*rows)
+
+        return TradeFrame(
+            r_multiple=np.fromiter(r_multiple, dtype=np.float64, count=n),
+            log_return=np.fromiter(log_return, dtype=np.float64, count=n),
+            raw_return=np.fromiter(raw_return, dtype=np.float64, count=n),
+            timestamp=np.array(timestamp, dtype="datetime64[us]"),
+            created_at=np.array(created_at, dtype="datetime64[us]"),
+        )
+
+    def columns(self) -> dict:
+        return {
+            "r_multiple": self.r_multiple,
+            "log_return": self.log_return,
+            "raw_return": self.raw_return,
+            "timestamp": self.timestamp,
+            "created_at": self.created_at,
+        }
+
+    @staticmethod
+    def load(
+        db: Session,
+        run_id,
+        user_id,
+        data_version: int | None = None,
+    ) -> "TradeFrame":
+        """
+        Memory-mapped columnar store when its file matches the run's
+        data_version, otherwise Postgres. A stale file is rewritten from
+        the rows just read, so a burst of trade writes costs one rewrite
+        on the next load rather than one per write.
+
+        Pass data_version when the caller already read it; it must be read
+        before the trades so a concurrent write leaves the file stale.
+        """
+        if not ColumnarTradeStore.exists(user_id, run_id):
+            return TradeFrame.query(db=db, run_id=run_id, user_id=user_id)
+
+        if data_version is None:
+            data_version = TradeFrame._data_version(db, run_id, user_id)
+
+        columns = ColumnarTradeStore.read(user_id, run_id, data_version)
+
+        if columns is not None:
+            return TradeFrame(**columns)
+
+        frame = TradeFrame.query(db=db, run_id=run_id, user_id=user_id)
+
+        if data_version is not None:
+            ColumnarTradeStore.write(user_id, run_id, frame.columns(), data_version)
+
+        return frame
+
+    @staticmethod
+    def query(
+        db: Session,
+        run_id,
+        user_id,
+    ) -> "TradeFrame":
+        """
+        Single column query for the run; no ORM hydration.
+        """
+        rows = (
+            db.query(
+                Trade.r_multiple,
+                Trade.log_return,
+                Trade.raw_return,
+                Trade.timestamp,
+                Trade.created_at,
+            )
+            .filter(
+                Trade.run_id == run_id,
+                Trade.user_id == user_id,
+            )
+            .order_by(Trade.created_at)
+            .all()
+        )
+
+        return TradeFrame.from_rows(rows)
+
+    @staticmethod
+    def write_store(db: Session, run_id, user_id) -> None:
+        """
+        (Re)write the run's columnar store from Postgres.
+        """
+        if not ColumnarTradeStore.enabled():
+            return
+
+        data_version = TradeFrame._data_version(db, run_id, user_id)
+        if data_version is None:
+            return
+
+        frame = TradeFrame.query(db=db, run_id=run_id, user_id=user_id)
+        ColumnarTradeStore.write(user_id, run_id, frame.columns(), data_version)
+
+    @staticmethod
+    def _data_version(db: Session, run_id, user_id) -> int | None:
+        return (
+            db.query(Run.data_version)
+            .filter(
+                Run.id == run_id,
+                Run.user_id == user_id,
+            )
+            .scalar()
+        )
@@ -1,6 +1,6 @@
 import numpy as np
 from sqlalchemy.orm import Session
-from edge_lab.persistence.models import Trade
+from edge_lab.analytics.trade_frame import TradeFrame
 from edge_lab.analytics.metrics import MetricsEngine
 
 
@@ -15,20 +15,19 @@ class WalkForwardEngine:
         user_id,
     ):
 
-        trades = (
-            db.query(Trade)
-            .filter(
-                Trade.run_id == run_id,
-                Trade.user_id == user_id,
-            )
-            .order_by(Trade.created_at)
-            .all()
-        )
-
-        if not trades:
+        frame = TradeFrame.load(db=db, run_id=run_id, user_id=user_id)
+
+        return WalkForwardEngine.run_from_r(frame.r_multiple)
+
+    @staticmethod
+    def run_from_r(r_values: np.ndarray):
+        """
+        r_values in created_at order.
+        """
+
+        if r_values.size == 0:
             return []
 
-        r_values = np.array([t.r_multiple for t in trades])
         returns = WalkForwardEngine.BASE_RISK_FRACTION * r_values
 
         train_size = int(len(returns) * 0.6)
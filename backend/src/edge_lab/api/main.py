@@ -1,7 +1,7 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from edge_lab.api.routes import runs, variants, systems, trades, portfolio
+from edge_lab.api.routes import runs, variants, systems, trades, portfolio, jobs, analytics
 from edge_lab.api.routes import auth
 from edge_lab.api.routes import admin
 
@@ -15,6 +15,8 @@ app.include_router(runs.router, prefix="/runs")
 app.include_router(variants.router, prefix="/variants")
 app.include_router(systems.router, prefix="/systems")
 app.include_router(portfolio.router, prefix="/portfolio")
+app.include_router(jobs.router, prefix="/jobs")
+app.include_router(analytics.router, prefix="/analytics")
 
 app.add_middleware(
     CORSMiddleware,
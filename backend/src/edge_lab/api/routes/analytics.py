@@ -0,0 +1,43 @@
+from fastapi import APIRouter, HTTPException, Depends
+from sqlalchemy.orm import Session
+from edge_lab.persistence.database import get_db
+from edge_lab.persistence.models import User
+from edge_lab.security.auth import get_current_user
+from edge_lab.services.snapshot_reads import SnapshotReadService
+from pydantic import BaseModel
+
+router = APIRouter(tags=["Analytics"])
+
+
+# ==========================================================
+# SCHEMA
+# ==========================================================
+
+class AnalyticsBatchRequest(BaseModel):
+    node_type: str
+    ids: list[str] | None = None
+    parent_id: str | None = None
+    fields: list[str] | None = None
+
+
+# ==========================================================
+# BATCH SUMMARY METRICS (ISOLATED, ONE QUERY)
+# ==========================================================
+
+@router.post("/batch")
+def read_analytics_batch(
+    payload: AnalyticsBatchRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    try:
+        return SnapshotReadService.read_batch(
+            db,
+            current_user,
+            payload.node_type,
+            ids=payload.ids,
+            parent_id=payload.parent_id,
+            fields=payload.fields,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,34 @@
+from fastapi import APIRouter, HTTPException, Depends
+from sqlalchemy.orm import Session
+from edge_lab.persistence.database import get_db
+from edge_lab.persistence.models import ComputeJob, User
+from edge_lab.security.auth import get_current_user
+from edge_lab.services.job_queue import JobQueueService
+import uuid
+
+router = APIRouter(tags=["Jobs"])
+
+
+# ==========================================================
+# GET JOB (STATUS / PROGRESS / TIMINGS)
+# ==========================================================
+
+@router.get("/{job_id}")
+def get_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    job = (
+        db.query(ComputeJob)
+        .filter(
+            ComputeJob.id == uuid.UUID(job_id),
+            ComputeJob.user_id == current_user.id,
+        )
+        .first()
+    )
+
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found.")
+
+    return JobQueueService.to_dict(job)
@@ -1,15 +1,22 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Header
 from sqlalchemy.orm import Session
 from edge_lab.persistence.database import get_db
 from edge_lab.persistence.models import (
     Portfolio,
     PortfolioAnalytics,
+    PortfolioCovariance,
     Strategy,
     StrategyAnalytics,
     User,
 )
 from edge_lab.security.auth import get_current_user
 from edge_lab.analytics.hierarchy_compute import HierarchyComputeService
+from edge_lab.analytics.covariance import CovarianceEngine
+from edge_lab.analytics.distribution import DistributionSketch
+from edge_lab.services.job_queue import JobQueueService
+from edge_lab.services.dirty_propagation import DirtyPropagationService
+from edge_lab.services.snapshot_reads import SnapshotReadService
+from edge_lab.persistence.query_counter import QueryCounter
 import uuid
 from pydantic import BaseModel
 
@@ -24,6 +31,16 @@ class PortfolioCreate(BaseModel):
     name: str
 
 
+class AllocationConfig(BaseModel):
+    kelly_fraction: float = 0.5
+    max_weight: float = 1.0
+
+
+class AllocationUpdate(BaseModel):
+    mode: str
+    config: AllocationConfig | None = None
+
+
 # ==========================================================
 # HELPERS
 # ==========================================================
@@ -136,7 +153,7 @@ def delete_portfolio(
     for s in strategies:
         s.portfolio_id = default_portfolio.id
 
-    default_portfolio.is_dirty = True
+    DirtyPropagationService.mark_portfolios(db, current_user.id, [default_portfolio.id])
 
     db.delete(portfolio)
     db.commit()
@@ -180,8 +197,11 @@ def move_strategy(
 
     strategy.portfolio_id = new_portfolio.id
 
-    old_portfolio.is_dirty = True
-    new_portfolio.is_dirty = True
+    DirtyPropagationService.mark_portfolios(
+        db,
+        current_user.id,
+        [old_portfolio.id, new_portfolio.id],
+    )
 
     db.commit()
 
@@ -195,11 +215,43 @@ def move_strategy(
 @router.post("/{portfolio_id}/compute")
 def compute_portfolio(
     portfolio_id: str,
+    background: bool = False,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    if background:
+        job = JobQueueService.enqueue(db, current_user, "portfolio", portfolio_id)
+        return {"status": "queued", "job_id": job.id}
+
+    with QueryCounter(db) as queries:
+        HierarchyComputeService.compute_portfolio(portfolio_id, db, current_user)
+    return {"status": "computed", "query_count": queries.count}
+
+
+# ==========================================================
+# UPDATE ALLOCATION (re-weight without child recompute)
+# ==========================================================
+
+@router.put("/{portfolio_id}/allocation")
+def update_allocation(
+    portfolio_id: str,
+    payload: AllocationUpdate,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    HierarchyComputeService.compute_portfolio(portfolio_id, db, current_user)
-    return {"status": "computed"}
+    snapshot = HierarchyComputeService.reallocate_portfolio(
+        portfolio_id,
+        payload.mode,
+        payload.config.model_dump() if payload.config else None,
+        db,
+        current_user,
+    )
+
+    return {
+        "allocation_mode": snapshot.allocation_mode,
+        "allocation_config": snapshot.allocation_config_json,
+        "weights": snapshot.combined_metrics_json.get("weights"),
+    }
 
 
 # ==========================================================
@@ -229,31 +281,88 @@ def get_portfolio(
 
 @router.get("/{portfolio_id}/analytics")
 def get_portfolio_analytics(
+    portfolio_id: str,
+    revalidate: bool = False,
+    wait: float = 0.0,
+    if_none_match: str | None = Header(None),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    portfolio = get_owned_portfolio(portfolio_id, db, current_user)
+
+    def load():
+        return (
+            db.query(PortfolioAnalytics)
+            .filter(
+                PortfolioAnalytics.user_id == current_user.id,
+                PortfolioAnalytics.id == portfolio.id,
+            )
+            .first()
+        )
+
+    def serialize(snapshot):
+        return {
+            "combined_metrics": snapshot.combined_metrics_json,
+            "combined_equity": snapshot.combined_equity_json,
+            "distribution": DistributionSketch.view(snapshot.distribution_json),
+            "strategy_count": snapshot.strategy_count,
+            "allocation_mode": snapshot.allocation_mode,
+            "allocation_config": snapshot.allocation_config_json,
+            "is_dirty": snapshot.is_dirty,
+            "updated_at": snapshot.updated_at,
+        }
+
+    return SnapshotReadService.serve(
+        db,
+        current_user,
+        "portfolio",
+        portfolio,
+        load,
+        serialize,
+        "Portfolio analytics not computed.",
+        revalidate=revalidate,
+        wait=wait,
+        if_none_match=if_none_match,
+    )
+
+
+# ==========================================================
+# GET PORTFOLIO CORRELATION
+# ==========================================================
+
+@router.get("/{portfolio_id}/correlation")
+def get_portfolio_correlation(
     portfolio_id: str,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     portfolio = get_owned_portfolio(portfolio_id, db, current_user)
 
-    snapshot = (
-        db.query(PortfolioAnalytics)
+    covariance = (
+        db.query(PortfolioCovariance)
         .filter(
-            PortfolioAnalytics.user_id == current_user.id,
-            PortfolioAnalytics.id == portfolio.id,
+            PortfolioCovariance.user_id == current_user.id,
+            PortfolioCovariance.portfolio_id == portfolio.id,
         )
         .first()
     )
 
-    if not snapshot:
-        raise HTTPException(status_code=404, detail="Portfolio analytics not computed.")
+    if not covariance:
+        raise HTTPException(status_code=404, detail="Portfolio correlation not computed.")
+
+    stats = CovarianceEngine.stats(covariance)
 
     return {
-        "combined_metrics": snapshot.combined_metrics_json,
-        "combined_equity": snapshot.combined_equity_json,
-        "strategy_count": snapshot.strategy_count,
-        "is_dirty": snapshot.is_dirty,
-        "updated_at": snapshot.updated_at,
-    }# ==========================================================
+        "strategy_ids": stats["strategy_ids"],
+        "bucket": covariance.bucket,
+        "n_obs": stats["n_obs"],
+        "covariance": None if stats["covariance"] is None else stats["covariance"].tolist(),
+        "correlation": None if stats["correlation"] is None else stats["correlation"].tolist(),
+        "updated_at": covariance.updated_at,
+    }
+
+
+# ==========================================================
 # LIST SYSTEMS FOR PORTFOLIO
 # ==========================================================
 
@@ -1,11 +1,27 @@
-from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Depends, Request, Header
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session, defer
 from edge_lab.persistence.database import get_db
-from edge_lab.persistence.models import Run, Trade, User, RunAnalytics
+from edge_lab.persistence.models import Run, User, RunAnalytics
 from edge_lab.security.auth import get_current_user
 from edge_lab.persistence.models import VariantAnalytics
 from edge_lab.analytics.hierarchy_compute import HierarchyComputeService
+from edge_lab.services.job_queue import JobQueueService
+from edge_lab.persistence.query_counter import QueryCounter
+from edge_lab.services.trade_import import TradeImportService
+from edge_lab.services.trade_listing import TradeListingService
+from edge_lab.services.dirty_propagation import DirtyPropagationService
+from edge_lab.services.snapshot_reads import SnapshotReadService
+from edge_lab.persistence.trade_store import ColumnarTradeStore
+from edge_lab.analytics.trade_frame import TradeFrame
+from edge_lab.analytics.risk_of_ruin import RiskOfRuinEngine
+from edge_lab.analytics.kelly_simulation import KellySimulationEngine
+from edge_lab.analytics.simulation_cache import SimulationCache
+from edge_lab.analytics.distribution import DistributionSketch
+from edge_lab.analytics.equity_levels import EquityLevels
+from edge_lab.analytics.incremental import IncrementalRunAnalytics
 import uuid
+from datetime import datetime
 from pydantic import BaseModel
 
 router = APIRouter(tags=["Runs"])
@@ -138,9 +154,14 @@ def delete_run(
 ):
     run = get_owned_run(run_id, db, current_user)
 
+    # ancestors' roll-up stats still count this run
+    DirtyPropagationService.from_runs(db, current_user.id, [run.id], reset_rollups=True)
+
     db.delete(run)
     db.commit()
 
+    ColumnarTradeStore.delete(current_user.id, run.id)
+
     return {"status": "deleted"}
 
 
@@ -151,88 +172,236 @@ def delete_run(
 @router.post("/{run_id}/compute-analytics")
 def compute_analytics(
     run_id: str,
+    background: bool = False,
+    sections: str | None = None,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    HierarchyComputeService.compute_run(run_id, db, current_user)
-    return {"status": "computed"}
+    # comma-separated subset of RUN_SECTIONS, e.g. ?sections=metrics,equity
+    selected = None
+    if sections:
+        selected = tuple(s.strip() for s in sections.split(",") if s.strip())
+
+    if background:
+        if selected:
+            raise HTTPException(
+                status_code=400,
+                detail="Background jobs refresh every stale section; omit sections.",
+            )
+        job = JobQueueService.enqueue(db, current_user, "run", run_id)
+        return {"status": "queued", "job_id": job.id}
+
+    with QueryCounter(db) as queries:
+        HierarchyComputeService.compute_run(run_id, db, current_user, sections=selected)
+    return {"status": "computed", "query_count": queries.count}
 
 
 # ==========================================================
-# GET ANALYTICS (PERSISTED ONLY)
+# GET ANALYTICS (PERSISTED, OPTIONAL STALE-WHILE-REVALIDATE)
 # ==========================================================
 
 @router.get("/{run_id}/analytics")
 def get_analytics(
     run_id: str,
+    revalidate: bool = False,
+    wait: float = 0.0,
+    resolution: int | None = None,
+    if_none_match: str | None = Header(None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
+    # resolution: equity from the smallest stored downsampled level with at
+    # least that many points (see EquityLevels); equity_json is only read
+    # when no level is fine enough
+    if resolution is not None and resolution < 2:
+        raise HTTPException(status_code=400, detail="resolution must be at least 2.")
+
     run = get_owned_run(run_id, db, current_user)
 
-    analytics = (
-        db.query(RunAnalytics)
-        .filter(
-            RunAnalytics.user_id == current_user.id,
-            RunAnalytics.run_id == run.id,
+    def load():
+        query = db.query(RunAnalytics)
+        if resolution is not None:
+            query = query.options(defer(RunAnalytics.equity_json))
+        return (
+            query
+            .filter(
+                RunAnalytics.user_id == current_user.id,
+                RunAnalytics.run_id == run.id,
+            )
+            .first()
         )
-        .first()
+
+    def equity(analytics):
+        if resolution is not None:
+            level = EquityLevels.load(db, current_user.id, run.id, resolution)
+            if level is not None:
+                return level
+        return IncrementalRunAnalytics.equity(analytics)
+
+    def serialize(analytics):
+        return {
+            "metrics": analytics.metrics_json,
+            "equity": equity(analytics),
+            "walk_forward": analytics.walk_forward_json,
+            "monte_carlo": analytics.monte_carlo_json,
+            "risk_of_ruin": analytics.risk_of_ruin_json,
+            "regime": analytics.regime_json,
+            "kelly": analytics.kelly_json,
+            "distribution": DistributionSketch.view(analytics.distribution_json),
+            "is_dirty": analytics.is_dirty,
+            "stale_sections": HierarchyComputeService.stale_sections(analytics, run.data_version),
+        }
+
+    def stale(analytics):
+        return bool(HierarchyComputeService.stale_sections(analytics, run.data_version))
+
+    return SnapshotReadService.serve(
+        db,
+        current_user,
+        "run",
+        run,
+        load,
+        serialize,
+        "Analytics not computed.",
+        revalidate=revalidate,
+        wait=wait,
+        if_none_match=if_none_match,
+        stale=stale,
     )
 
-    if not analytics:
-        raise HTTPException(
-            status_code=404,
-            detail="Analytics not computed.",
+
+# ==========================================================
+# RISK OF RUIN (INTERACTIVE, CACHED PATHS)
+# ==========================================================
+
+@router.get("/{run_id}/risk-of-ruin")
+def get_risk_of_ruin(
+    run_id: str,
+    position_fraction: float = 1.0,
+    ruin_threshold: float = 0.7,
+    simulations: int = 10000,
+    max_trades: int = 500,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    run = get_owned_run(run_id, db, current_user)
+
+    # trades are only read when this run version's paths are not cached
+    def load_r_values():
+        return TradeFrame.load(db=db, run_id=run.id, user_id=current_user.id).r_multiple
+
+    try:
+        return RiskOfRuinEngine.simulate_cached(
+            (current_user.id, run.id, run.data_version),
+            load_r_values,
+            simulations=simulations,
+            position_fraction=position_fraction,
+            ruin_threshold=ruin_threshold,
+            max_trades=max_trades,
         )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    return {
-        "metrics": analytics.metrics_json,
-        "equity": analytics.equity_json,
-        "walk_forward": analytics.walk_forward_json,
-        "monte_carlo": analytics.monte_carlo_json,
-        "risk_of_ruin": analytics.risk_of_ruin_json,
-        "regime": analytics.regime_json,
-        "kelly": analytics.kelly_json,
-        "is_dirty": analytics.is_dirty,
-    }
+
+# ==========================================================
+# KELLY (ON DEMAND, ANALYTIC BY DEFAULT)
+# ==========================================================
+
+@router.get("/{run_id}/kelly")
+def get_kelly(
+    run_id: str,
+    mode: str = "analytic",
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    # analytic: Newton optimum plus a few bracketing ruin simulations;
+    # grid: the full sweep persisted in the kelly section
+    run = get_owned_run(run_id, db, current_user)
+
+    frame = TradeFrame.load(db=db, run_id=run.id, user_id=current_user.id)
+
+    try:
+        result = SimulationCache.get_or_compute(
+            db,
+            current_user.id,
+            "kelly",
+            frame.r_multiple,
+            {"mode": mode},
+            lambda: KellySimulationEngine.generate_from_r(frame.r_multiple, mode=mode),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    db.commit()
+
+    return result
 
 
 # ==========================================================
-# TRADES FOR RUN
+# TRADES FOR RUN (KEYSET PAGES OR STREAM)
 # ==========================================================
 
 @router.get("/{run_id}/trades")
 def list_trades_for_run(
     run_id: str,
+    direction: str | None = None,
+    timeframe: str | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    cursor: str | None = None,
+    limit: int | None = None,
+    format: str = "json",
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     run = get_owned_run(run_id, db, current_user)
 
-    trades = (
-        db.query(Trade)
-        .filter(
-            Trade.run_id == run.id,
-            Trade.user_id == current_user.id,
+    try:
+        stmt = TradeListingService.query(
+            current_user.id,
+            run_id=run.id,
+            direction=direction,
+            timeframe=timeframe,
+            start=start,
+            end=end,
+            cursor=cursor,
         )
-        .all()
-    )
+        return TradeListingService.respond(db, stmt, format, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
-    return [
-        {
-            "id": t.id,
-            "entry_price": t.entry_price,
-            "exit_price": t.exit_price,
-            "stop_loss": t.stop_loss,
-            "size": t.size,
-            "direction": t.direction,
-            "timestamp": t.timestamp,
-            "timeframe": t.timeframe,
-            "r_multiple": t.r_multiple,
-            "is_win": t.is_win,
-            "raw_return": t.raw_return,
-            "log_return": t.log_return,
-            "created_at": t.created_at,
-        }
-        for t in trades
-    ]
+
+# ==========================================================
+# BULK TRADE IMPORT (CSV / NDJSON / ARROW IPC)
+# ==========================================================
+
+@router.post("/{run_id}/trades:bulk")
+async def bulk_import_trades(
+    run_id: str,
+    request: Request,
+    format: str | None = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    run = await run_in_threadpool(get_owned_run, run_id, db, current_user)
+
+    payload = await request.body()
+
+    try:
+        fmt = format or TradeImportService.detect_format(
+            content_type=request.headers.get("content-type"),
+        )
+        imported = await run_in_threadpool(
+            TradeImportService.import_frames,
+            db,
+            current_user.id,
+            run.id,
+            TradeImportService.iter_frames(payload, fmt),
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {
+        "status": "imported",
+        "imported": imported,
+    }
@@ -1,9 +1,13 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Header
 from sqlalchemy.orm import Session
 from edge_lab.persistence.database import get_db
 from edge_lab.persistence.models import *
 from edge_lab.security.auth import get_current_user
 from edge_lab.analytics.hierarchy_compute import HierarchyComputeService
+from edge_lab.analytics.distribution import DistributionSketch
+from edge_lab.services.job_queue import JobQueueService
+from edge_lab.services.snapshot_reads import SnapshotReadService
+from edge_lab.persistence.query_counter import QueryCounter
 import uuid, statistics
 from pydantic import BaseModel
 from typing import Optional
@@ -190,33 +194,57 @@ def create_system(
 @router.post("/{system_id}/compute-analytics")
 def compute_strategy_analytics(
     system_id: str,
+    background: bool = False,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    HierarchyComputeService.compute_strategy(system_id, db, current_user)
-    return {"status": "computed"}
+    if background:
+        job = JobQueueService.enqueue(db, current_user, "strategy", system_id)
+        return {"status": "queued", "job_id": job.id}
+
+    with QueryCounter(db) as queries:
+        HierarchyComputeService.compute_strategy(system_id, db, current_user)
+    return {"status": "computed", "query_count": queries.count}
 
 @router.get("/{system_id}/analytics")
 def get_strategy_analytics(
     system_id: str,
+    revalidate: bool = False,
+    wait: float = 0.0,
+    if_none_match: str | None = Header(None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    snapshot = (
-        db.query(StrategyAnalytics)
-        .filter(
-            StrategyAnalytics.user_id == current_user.id,
-            StrategyAnalytics.strategy_id == uuid.UUID(system_id),
+    strategy = HierarchyComputeService._get_owned_strategy(system_id, db, current_user)
+
+    def load():
+        return (
+            db.query(StrategyAnalytics)
+            .filter(
+                StrategyAnalytics.user_id == current_user.id,
+                StrategyAnalytics.strategy_id == strategy.id,
+            )
+            .first()
         )
-        .first()
-    )
 
-    if not snapshot:
-        raise HTTPException(status_code=404, detail="Strategy analytics not computed.")
+    def serialize(snapshot):
+        return {
+            "aggregated_metrics": snapshot.aggregated_metrics_json,
+            "distribution": DistributionSketch.view(snapshot.distribution_json),
+            "variant_count": snapshot.variant_count,
+            "is_dirty": snapshot.is_dirty,
+            "updated_at": snapshot.updated_at,
+        }
 
-    return {
-        "aggregated_metrics": snapshot.aggregated_metrics_json,
-        "variant_count": snapshot.variant_count,
-        "is_dirty": snapshot.is_dirty,
-        "updated_at": snapshot.updated_at,
-    }
+    return SnapshotReadService.serve(
+        db,
+        current_user,
+        "strategy",
+        strategy,
+        load,
+        serialize,
+        "Strategy analytics not computed.",
+        revalidate=revalidate,
+        wait=wait,
+        if_none_match=if_none_match,
+    )
@@ -3,6 +3,9 @@ from sqlalchemy.orm import Session
 from edge_lab.persistence.database import get_db
 from edge_lab.persistence.models import Trade, Run, User, RunAnalytics
 from edge_lab.security.auth import get_current_user
+from edge_lab.analytics.hierarchy_compute import HierarchyComputeService
+from edge_lab.services.dirty_propagation import DirtyPropagationService
+from edge_lab.services.trade_listing import TradeListingService
 import uuid
 import math
 from datetime import datetime
@@ -132,22 +135,15 @@ def create_trade(
         is_win=is_win,
     )
 
+    # the version bump commits with the trade, so a compute that reads
+    # the new trade never records the old data_version
     db.add(trade)
+    DirtyPropagationService.from_trades(db, current_user.id, [run.id])
     db.commit()
     db.refresh(trade)
 
-    analytics = (
-        db.query(RunAnalytics)
-        .filter(
-            RunAnalytics.user_id == current_user.id,
-            RunAnalytics.run_id == run.id,
-        )
-        .first()
-    )
-
-    if analytics:
-        analytics.is_dirty = True
-        db.commit()
+    # metrics/equity brought up to date in place; simulation sections stay lazy
+    HierarchyComputeService.append_trade(db, current_user, run, r_multiple, trade.timestamp)
 
     return {
         "id": trade.id,
@@ -207,8 +203,10 @@ def update_trade(
     )
 
     if analytics:
-        analytics.is_dirty = True
-        db.commit()
+        analytics.running_state_json = None
+
+    DirtyPropagationService.from_trades(db, current_user.id, [trade.run_id])
+    db.commit()
 
     return {"status": "updated"}
 
@@ -239,46 +237,44 @@ def delete_trade(
     )
 
     if analytics:
-        analytics.is_dirty = True
-        db.commit()
+        analytics.running_state_json = None
+
+    DirtyPropagationService.from_trades(db, current_user.id, [run_id])
+    db.commit()
 
     return {"status": "deleted"}
 
 
 # ==========================================================
-# LIST TRADES (ISOLATED)
+# LIST TRADES (ISOLATED, KEYSET PAGES OR STREAM)
 # ==========================================================
 
 @router.get("/")
 def list_trades(
+    run_id: str | None = None,
+    direction: str | None = None,
+    timeframe: str | None = None,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    cursor: str | None = None,
+    limit: int | None = None,
+    format: str = "json",
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    trades = (
-        db.query(Trade)
-        .filter(Trade.user_id == current_user.id)
-        .all()
-    )
-
-    return [
-        {
-            "id": t.id,
-            "run_id": t.run_id,
-            "entry_price": t.entry_price,
-            "exit_price": t.exit_price,
-            "stop_loss": t.stop_loss,
-            "size": t.size,
-            "direction": t.direction,
-            "timestamp": t.timestamp,
-            "timeframe": t.timeframe,
-            "r_multiple": t.r_multiple,
-            "is_win": t.is_win,
-            "raw_return": t.raw_return,
-            "log_return": t.log_return,
-            "created_at": t.created_at,
-        }
-        for t in trades
-    ]
+    try:
+        stmt = TradeListingService.query(
+            current_user.id,
+            run_id=uuid.UUID(run_id) if run_id else None,
+            direction=direction,
+            timeframe=timeframe,
+            start=start,
+            end=end,
+            cursor=cursor,
+        )
+        return TradeListingService.respond(db, stmt, format, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 # ==========================================================
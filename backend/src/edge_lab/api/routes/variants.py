@@ -1,10 +1,14 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Header
 from sqlalchemy.orm import Session
 from edge_lab.persistence.database import get_db
 from edge_lab.persistence.models import Variant, Run, Strategy, User, VariantAnalytics, RunAnalytics
 from edge_lab.security.auth import get_current_user
 from edge_lab.analytics.variant_analyzer import VariantAnalyzer
 from edge_lab.analytics.hierarchy_compute import HierarchyComputeService
+from edge_lab.analytics.distribution import DistributionSketch
+from edge_lab.services.job_queue import JobQueueService
+from edge_lab.services.snapshot_reads import SnapshotReadService
+from edge_lab.persistence.query_counter import QueryCounter
 import uuid, statistics
 from pydantic import BaseModel
 
@@ -197,11 +201,17 @@ def create_variant(
 @router.post("/{variant_id}/compute-analytics")
 def compute_variant_analytics(
     variant_id: str,
+    background: bool = False,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
-    HierarchyComputeService.compute_variant(variant_id, db, current_user)
-    return {"status": "computed"}
+    if background:
+        job = JobQueueService.enqueue(db, current_user, "variant", variant_id)
+        return {"status": "queued", "job_id": job.id}
+
+    with QueryCounter(db) as queries:
+        HierarchyComputeService.compute_variant(variant_id, db, current_user)
+    return {"status": "computed", "query_count": queries.count}
 
 # ==========================================================
 # GET VARIANT ANALYTICS (SNAPSHOT ONLY)
@@ -210,29 +220,42 @@ def compute_variant_analytics(
 @router.get("/{variant_id}/analytics")
 def get_variant_analytics(
     variant_id: str,
+    revalidate: bool = False,
+    wait: float = 0.0,
+    if_none_match: str | None = Header(None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_user),
 ):
     variant = get_owned_variant(variant_id, db, current_user)
 
-    snapshot = (
-        db.query(VariantAnalytics)
-        .filter(
-            VariantAnalytics.user_id == current_user.id,
-            VariantAnalytics.variant_id == variant.id,
+    def load():
+        return (
+            db.query(VariantAnalytics)
+            .filter(
+                VariantAnalytics.user_id == current_user.id,
+                VariantAnalytics.variant_id == variant.id,
+            )
+            .first()
         )
-        .first()
-    )
 
-    if not snapshot:
-        raise HTTPException(
-            status_code=404,
-            detail="Variant analytics not computed.",
-        )
+    def serialize(snapshot):
+        return {
+            "aggregated_metrics": snapshot.aggregated_metrics_json,
+            "distribution": DistributionSketch.view(snapshot.distribution_json),
+            "run_count": snapshot.run_count,
+            "is_dirty": snapshot.is_dirty,
+            "updated_at": snapshot.updated_at,
+        }
 
-    return {
-        "aggregated_metrics": snapshot.aggregated_metrics_json,
-        "run_count": snapshot.run_count,
-        "is_dirty": snapshot.is_dirty,
-        "updated_at": snapshot.updated_at,
-    }
+    return SnapshotReadService.serve(
+        db,
+        current_user,
+        "variant",
+        variant,
+        load,
+        serialize,
+        "Variant analytics not computed.",
+        revalidate=revalidate,
+        wait=wait,
+        if_none_match=if_none_match,
+    )
@@ -12,6 +12,8 @@ from edge_lab.persistence.models import (
 )
 from edge_lab.security.password import hash_password
 from edge_lab.services.run_service import RunService
+from edge_lab.services.trade_import import TradeImportService
+from edge_lab.services.job_queue import JobQueueService
 from edge_lab.analytics.variant_analyzer import VariantAnalyzer
 from edge_lab.analytics.monte_carlo import MonteCarloEngine
 from edge_lab.analytics.risk_of_ruin import RiskOfRuinEngine
@@ -30,11 +32,13 @@ user_app = typer.Typer(help="User management")
 strategy_app = typer.Typer(help="Strategy management")
 variant_app = typer.Typer(help="Variant management")
 run_app = typer.Typer(help="Run management")
+worker_app = typer.Typer(help="Background compute worker")
 
 app.add_typer(user_app, name="user")
 app.add_typer(strategy_app, name="strategy")
 app.add_typer(variant_app, name="variant")
 app.add_typer(run_app, name="run")
+app.add_typer(worker_app, name="worker")
 
 
 # ==================================================
@@ -231,4 +235,39 @@ def close_run(user_id: str, run_id: str):
         print("Expectancy:", snapshot.expectancy)
         print("Sharpe:", snapshot.sharpe)
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+
+@run_app.command("import")
+def import_trades(
+    user_id: str,
+    run_id: str,
+    path: str,
+    format: str = typer.Option(None, help="csv, ndjson or arrow (default: from extension)"),
+):
+    db: Session = SessionLocal()
+    try:
+        fmt = format or TradeImportService.detect_format(path=path)
+
+        imported = TradeImportService.import_frames(
+            db=db,
+            user_id=uuid.UUID(user_id),
+            run_id=uuid.UUID(run_id),
+            frames=TradeImportService.iter_frames(path, fmt),
+        )
+
+        print(f"Imported {imported} trades.")
+    except ValueError as e:
+        print(f"Import failed: {e}")
+    finally:
+        db.close()
+
+
+# ==================================================
+# WORKER COMMANDS
+# ==================================================
+
+@worker_app.command("start")
+def start_worker(workers: int = 2, poll_interval: float = 1.0):
+    print(f"Worker started with {workers} processes.")
+    JobQueueService.run_worker(workers=workers, poll_interval=poll_interval)
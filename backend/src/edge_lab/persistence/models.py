@@ -8,8 +8,10 @@ from sqlalchemy import (
     Float,
     Boolean,
     Text,
+    LargeBinary,
     Index,
     UniqueConstraint,
+    text,
 )
 from sqlalchemy.dialects.postgresql import UUID, JSON
 from sqlalchemy.orm import Mapped, mapped_column, relationship
@@ -150,6 +152,14 @@ class Portfolio(Base):
         nullable=False,
     )
 
+    # bumped on every change beneath this node (see DirtyPropagationService)
+    data_version: Mapped[int] = mapped_column(
+        Integer,
+        default=0,
+        server_default="0",
+        nullable=False,
+    )
+
     created_at: Mapped[datetime] = mapped_column(
         DateTime,
         default=datetime.utcnow,
@@ -198,6 +208,14 @@ class Strategy(Base):
     description: Mapped[str] = mapped_column(Text, nullable=True)
     asset: Mapped[str] = mapped_column(String(100), nullable=False)
 
+    # bumped on every change beneath this node (see DirtyPropagationService)
+    data_version: Mapped[int] = mapped_column(
+        Integer,
+        default=0,
+        server_default="0",
+        nullable=False,
+    )
+
     created_at: Mapped[datetime] = mapped_column(
         DateTime,
         default=datetime.utcnow,
@@ -263,6 +281,14 @@ class Variant(Base):
     parameter_hash: Mapped[str] = mapped_column(String(255), nullable=False)
     parameter_json: Mapped[str] = mapped_column(Text, nullable=False)
 
+    # bumped on every change beneath this node (see DirtyPropagationService)
+    data_version: Mapped[int] = mapped_column(
+        Integer,
+        default=0,
+        server_default="0",
+        nullable=False,
+    )
+
     created_at: Mapped[datetime] = mapped_column(
         DateTime,
         default=datetime.utcnow,
@@ -324,6 +350,14 @@ class Run(Base):
     trade_limit: Mapped[int] = mapped_column(Integer, default=100)
     initial_capital: Mapped[float] = mapped_column(Float, nullable=False)
 
+    # bumped on every change beneath this node (see DirtyPropagationService)
+    data_version: Mapped[int] = mapped_column(
+        Integer,
+        default=0,
+        server_default="0",
+        nullable=False,
+    )
+
     created_at: Mapped[datetime] = mapped_column(
         DateTime,
         default=datetime.utcnow,
@@ -358,6 +392,9 @@ class Trade(Base):
 
     __table_args__ = (
         Index("ix_trades_user_id", "user_id"),
+        # keyset order of trade listings (see TradeListingService)
+        Index("ix_trades_user_id_timestamp_id", "user_id", "timestamp", "id"),
+        Index("ix_trades_run_id_timestamp_id", "run_id", "timestamp", "id"),
     )
 
     id: Mapped[uuid.UUID] = mapped_column(
@@ -525,12 +562,33 @@ class RunAnalytics(Base):
     regime_json: Mapped[dict | None] = mapped_column(JSON, nullable=True)
     kelly_json: Mapped[dict | None] = mapped_column(JSON, nullable=True)
 
+    # Running aggregates for O(1) trade appends (see IncrementalRunAnalytics)
+    running_state_json: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+
+    # This run's contribution to ancestor roll-ups (see RollupStats)
+    rollup_stats_json: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+
+    # R histogram + quantile digest, built with metrics (see DistributionSketch)
+    distribution_json: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+
+    # {section: run data_version it was computed from}; NULL means every
+    # section is at input_version (input_version tracks the metrics section)
+    section_versions_json: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+
     is_dirty: Mapped[bool] = mapped_column(
         Boolean,
         default=True,
         nullable=False,
     )
 
+    # node data_version this snapshot was built from; stale when lower
+    input_version: Mapped[int] = mapped_column(
+        Integer,
+        default=0,
+        server_default="0",
+        nullable=False,
+    )
+
     created_at: Mapped[datetime] = mapped_column(
         DateTime,
         default=datetime.utcnow,
@@ -579,6 +637,18 @@ class VariantAnalytics(Base):
         nullable=False,
     )
 
+    # Mergeable per-metric sufficient statistics (see RollupStats)
+    rollup_stats_json: Mapped[dict | None] = mapped_column(
+        JSON,
+        nullable=True,
+    )
+
+    # Merged run distributions (see DistributionSketch)
+    distribution_json: Mapped[dict | None] = mapped_column(
+        JSON,
+        nullable=True,
+    )
+
     run_count: Mapped[int] = mapped_column(
         Integer,
         nullable=False,
@@ -590,6 +660,14 @@ class VariantAnalytics(Base):
         nullable=False,
     )
 
+    # node data_version this snapshot was built from; stale when lower
+    input_version: Mapped[int] = mapped_column(
+        Integer,
+        default=0,
+        server_default="0",
+        nullable=False,
+    )
+
     created_at: Mapped[datetime] = mapped_column(
         DateTime,
         default=datetime.utcnow,
@@ -642,10 +720,24 @@ class StrategyAnalytics(Base):
 
     aggregated_metrics_json: Mapped[dict] = mapped_column(JSON, nullable=False)
 
+    # Mergeable per-metric sufficient statistics (see RollupStats)
+    rollup_stats_json: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+
+    # Merged variant distributions (see DistributionSketch)
+    distribution_json: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+
     variant_count: Mapped[int] = mapped_column(Integer, nullable=False)
 
     is_dirty: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
 
+    # node data_version this snapshot was built from; stale when lower
+    input_version: Mapped[int] = mapped_column(
+        Integer,
+        default=0,
+        server_default="0",
+        nullable=False,
+    )
+
     created_at: Mapped[datetime] = mapped_column(
         DateTime, default=datetime.utcnow, nullable=False
     )
@@ -687,10 +779,21 @@ class PortfolioAnalytics(Base):
 
     combined_equity_json: Mapped[dict] = mapped_column(JSON, nullable=False)
 
+    # Merged strategy distributions, unweighted (see DistributionSketch)
+    distribution_json: Mapped[dict | None] = mapped_column(JSON, nullable=True)
+
     strategy_count: Mapped[int] = mapped_column(Integer, nullable=False)
 
     is_dirty: Mapped[bool] = mapped_column(Boolean, default=True, nullable=False)
 
+    # node data_version this snapshot was built from; stale when lower
+    input_version: Mapped[int] = mapped_column(
+        Integer,
+        default=0,
+        server_default="0",
+        nullable=False,
+    )
+
     created_at: Mapped[datetime] = mapped_column(
         DateTime, default=datetime.utcnow
     )
@@ -699,4 +802,189 @@ class PortfolioAnalytics(Base):
         DateTime, default=datetime.utcnow, onupdate=datetime.utcnow
     )
 
-    user = relationship("User", back_populates="portfolio_analytics")
\ No newline at end of file
+    user = relationship("User", back_populates="portfolio_analytics")
+
+class ComputeJob(Base):
+    __tablename__ = "compute_jobs"
+
+    __table_args__ = (
+        Index("ix_compute_jobs_user_id", "user_id"),
+        Index("ix_compute_jobs_status_created_at", "status", "created_at"),
+        # at most one queued job per node (dedup)
+        Index(
+            "uq_compute_jobs_queued_node",
+            "user_id",
+            "node_type",
+            "node_id",
+            unique=True,
+            postgresql_where=text("status = 'queued'"),
+        ),
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid.uuid4,
+    )
+
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id"),
+        nullable=False,
+    )
+
+    node_type: Mapped[str] = mapped_column(String(20), nullable=False)
+    node_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), nullable=False)
+
+    status: Mapped[str] = mapped_column(String(20), default="queued", nullable=False)
+    progress: Mapped[float] = mapped_column(Float, default=0.0, nullable=False)
+    error: Mapped[str | None] = mapped_column(Text, nullable=True)
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        default=datetime.utcnow,
+        nullable=False,
+    )
+
+    started_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+
+    # lease: a running job whose heartbeat is older than the lease lost
+    # its worker and is requeued (or failed after too many attempts)
+    heartbeat_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+
+    user = relationship("User")
+
+
+class PortfolioCovariance(Base):
+    __tablename__ = "portfolio_covariance"
+
+    __table_args__ = (
+        UniqueConstraint("portfolio_id", name="uq_portfolio_covariance_portfolio_id"),
+        Index("ix_portfolio_covariance_user_id", "user_id"),
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid.uuid4,
+    )
+
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id"),
+        nullable=False,
+    )
+
+    portfolio_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("portfolios.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+
+    # [[strategy_id, strategy snapshot updated_at], ...] in matrix order
+    strategy_versions_json: Mapped[list] = mapped_column(JSON, nullable=False)
+
+    bucket: Mapped[str] = mapped_column(String(10), default="1D", nullable=False)
+
+    # first calendar day of the grid (days since epoch)
+    day0: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    # packed daily matrix + sufficient statistics, see CovarianceEngine
+    data: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        default=datetime.utcnow,
+        nullable=False,
+    )
+
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow,
+        nullable=False,
+    )
+
+
+class SimulationResult(Base):
+    __tablename__ = "simulation_results"
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "key", name="uq_simulation_results_user_id_key"),
+        # retention: newest rows per user and engine
+        Index("ix_simulation_results_user_id_engine_created_at", "user_id", "engine", "created_at"),
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid.uuid4,
+    )
+
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+
+    # sha256 of engine, sorted R multiset and parameters (see SimulationCache)
+    key: Mapped[str] = mapped_column(String(64), nullable=False)
+
+    engine: Mapped[str] = mapped_column(String(30), nullable=False)
+
+    result_json: Mapped[dict] = mapped_column(JSON, nullable=False)
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        default=datetime.utcnow,
+        nullable=False,
+    )
+
+
+class RunEquityLevel(Base):
+    __tablename__ = "run_equity_levels"
+
+    __table_args__ = (
+        UniqueConstraint("run_id", "resolution", name="uq_run_equity_levels_run_id_resolution"),
+        Index("ix_run_equity_levels_user_id", "user_id"),
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        primary_key=True,
+        default=uuid.uuid4,
+    )
+
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("users.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+
+    run_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True),
+        ForeignKey("runs.id", ondelete="CASCADE"),
+        nullable=False,
+    )
+
+    # maximum points in this level
+    resolution: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    point_count: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    # points of the full curve this level was downsampled from
+    source_count: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    # trade indices per bucket; doubles as appends fill the level
+    bucket_size: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    # packed trade index / equity / drawdown columns, see EquityLevels
+    data: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime,
+        default=datetime.utcnow,
+        nullable=False,
+    )
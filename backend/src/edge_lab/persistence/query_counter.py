@@ -0,0 +1,24 @@
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+
+class QueryCounter:
+    """
+    Counts ORM statements (queries, lazy loads and refreshes) a session
+    executes inside a `with` block. Flush INSERT/UPDATEs are not counted.
+    """
+
+    def __init__(self, db: Session):
+        self.db = db
+        self.count = 0
+
+    def _on_execute(self, orm_execute_state):
+        self.count += 1
+
+    def __enter__(self) -> "QueryCounter":
+        event.listen(self.db, "do_orm_execute", self._on_execute)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        event.remove(self.db, "do_orm_execute", self._on_execute)
+        return False
@@ -0,0 +1,125 @@
+import os
+import tempfile
+import uuid
+from pathlib import Path
+
+TRADE_STORE_DIR = os.getenv("TRADE_STORE_DIR")
+
+
+class ColumnarTradeStore:
+    """
+    Optional per-run Arrow IPC side store of trade columns.
+
+    Postgres stays the source of truth; files are derived copies written
+    on run close / bulk import. Each file is stamped with the run's
+    data_version and only read back at that version, so any trade write
+    that bumps the run (API, CLI, import, another host's worker) turns it
+    stale instead of wrong. Disabled unless TRADE_STORE_DIR is set and
+    pyarrow is installed.
+    """
+
+    VERSION_KEY = b"data_version"
+
+    COLUMNS = (
+        "r_multiple",
+        "log_return",
+        "raw_return",
+        "timestamp",
+        "created_at",
+    )
+
+    @staticmethod
+    def enabled() -> bool:
+        if not TRADE_STORE_DIR:
+            return False
+
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            return False
+
+        return True
+
+    @staticmethod
+    def path_for(user_id: uuid.UUID, run_id: uuid.UUID) -> Path:
+        return Path(TRADE_STORE_DIR) / str(user_id) / f"{run_id}.arrow"
+
+    @staticmethod
+    def exists(user_id: uuid.UUID, run_id: uuid.UUID) -> bool:
+        return (
+            ColumnarTradeStore.enabled()
+            and ColumnarTradeStore.path_for(user_id, run_id).exists()
+        )
+
+    @staticmethod
+    def write(user_id: uuid.UUID, run_id: uuid.UUID, columns: dict, data_version: int) -> None:
+        """
+        Write columns as a single uncompressed record batch so reads can
+        memory-map without copying. Replaces any existing file atomically;
+        concurrent writers each use their own temp file.
+        """
+        if not ColumnarTradeStore.enabled():
+            return
+
+        import pyarrow as pa
+
+        path = ColumnarTradeStore.path_for(user_id, run_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        table = pa.table(
+            {
+                name: pa.array(columns[name])
+                for name in ColumnarTradeStore.COLUMNS
+            },
+            metadata={ColumnarTradeStore.VERSION_KEY: str(data_version).encode()},
+        )
+
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{run_id}.", suffix=".tmp")
+        os.close(fd)
+
+        try:
+            with pa.OSFile(tmp, "wb") as sink:
+                with pa.ipc.new_file(sink, table.schema) as writer:
+                    writer.write_table(table, max_chunksize=max(table.num_rows, 1))
+
+            os.replace(tmp, path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+
+    @staticmethod
+    def read(user_id: uuid.UUID, run_id: uuid.UUID, data_version: int) -> dict | None:
+        """
+        Memory-mapped read; returns None when the store has no file or the
+        file was written at another data_version.
+        """
+        if not ColumnarTradeStore.exists(user_id, run_id):
+            return None
+
+        import pyarrow as pa
+
+        source = pa.memory_map(str(ColumnarTradeStore.path_for(user_id, run_id)), "r")
+        reader = pa.ipc.open_file(source)
+
+        stamp = (reader.schema.metadata or {}).get(ColumnarTradeStore.VERSION_KEY)
+        if stamp != str(data_version).encode():
+            return None
+
+        table = reader.read_all()
+
+        columns = {}
+        for name in ColumnarTradeStore.COLUMNS:
+            column = table.column(name)
+            if column.num_chunks == 1:
+                columns[name] = column.chunk(0).to_numpy(zero_copy_only=False)
+            else:
+                columns[name] = column.to_numpy()
+
+        return columns
+
+    @staticmethod
+    def delete(user_id: uuid.UUID, run_id: uuid.UUID) -> None:
+        if not ColumnarTradeStore.enabled():
+            return
+
+        ColumnarTradeStore.path_for(user_id, run_id).unlink(missing_ok=True)
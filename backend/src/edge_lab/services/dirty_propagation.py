@@ -1,76 +1,154 @@
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from edge_lab.persistence.models import (
+    Run,
+    RunAnalytics,
     Variant,
     VariantAnalytics,
+    Strategy,
     StrategyAnalytics,
     Portfolio,
 )
 
 class DirtyPropagationService:
+    """
+    Set-based invalidation. Each entry point takes a batch of changed ids
+    and, per hierarchy level, bumps the nodes' data_version and flags their
+    snapshots dirty with one UPDATE each, whatever the batch size.
 
-    @staticmethod
-    def from_run(db: Session, user_id, variant_id):
-        # Variant dirty
-        variant_snapshot = (
-            db.query(VariantAnalytics)
-            .filter_by(user_id=user_id, variant_id=variant_id)
-            .first()
-        )
-        if variant_snapshot:
-            variant_snapshot.is_dirty = True
+    data_version is the source of truth: a snapshot is stale when its
+    input_version is below its node's data_version. is_dirty is kept as
+    a display flag.
 
-        # propagate upward
-        DirtyPropagationService.from_variant(db, user_id, variant_id)
+    reset_rollups also clears the ancestors' rollup_stats_json, for changes
+    that make the stored roll-up statistics wrong (not merely stale), such
+    as a run recomputed without a roll-up or a deleted run.
+    """
 
     @staticmethod
-    def from_variant(db: Session, user_id, variant_id):
+    def from_trades(db: Session, user_id, run_ids):
+        """
+        Trades of these runs were created, edited or deleted.
+        """
+        run_ids = list(run_ids)
+        if not run_ids:
+            return
 
-        variant = (
-            db.query(Variant)
-            .filter_by(id=variant_id, user_id=user_id)
-            .first()
+        DirtyPropagationService._bump(db, Run, Run.id.in_(run_ids), user_id)
+        DirtyPropagationService._mark(
+            db,
+            RunAnalytics,
+            RunAnalytics.run_id.in_(run_ids),
+            user_id,
+            reset_rollups=False,
         )
-        if not variant:
+
+        DirtyPropagationService.from_runs(db, user_id, run_ids)
+
+    @staticmethod
+    def from_runs(db: Session, user_id, run_ids, reset_rollups: bool = False):
+        run_ids = list(run_ids)
+        if not run_ids:
             return
 
-        # Strategy dirty
-        strategy_snapshot = (
-            db.query(StrategyAnalytics)
-            .filter_by(
-                user_id=user_id,
-                strategy_id=variant.strategy_id
-            )
-            .first()
+        variant_ids = (
+            select(Run.variant_id)
+            .where(Run.user_id == user_id, Run.id.in_(run_ids))
+            .scalar_subquery()
         )
-        if strategy_snapshot:
-            strategy_snapshot.is_dirty = True
 
-        # Portfolio dirty (strategy scoped)
-        DirtyPropagationService.from_strategy(
+        DirtyPropagationService._bump(db, Variant, Variant.id.in_(variant_ids), user_id)
+        DirtyPropagationService._mark(
             db,
+            VariantAnalytics,
+            VariantAnalytics.variant_id.in_(variant_ids),
             user_id,
-            variant.strategy_id
+            reset_rollups,
         )
 
+        DirtyPropagationService.from_variants(db, user_id, variant_ids, reset_rollups)
+
     @staticmethod
-    def from_strategy(db: Session, user_id, strategy_id):
+    def from_variants(db: Session, user_id, variant_ids, reset_rollups: bool = False):
+        """
+        variant_ids: a list of ids or a scalar subquery.
+        """
+        if isinstance(variant_ids, (list, tuple, set)):
+            variant_ids = list(variant_ids)
+            if not variant_ids:
+                return
 
-        # find portfolio of this strategy
-        from edge_lab.persistence.models import Strategy
+        strategy_ids = (
+            select(Variant.strategy_id)
+            .where(Variant.user_id == user_id, Variant.id.in_(variant_ids))
+            .scalar_subquery()
+        )
 
-        strategy = (
-            db.query(Strategy)
-            .filter_by(id=strategy_id, user_id=user_id)
-            .first()
+        DirtyPropagationService._bump(db, Strategy, Strategy.id.in_(strategy_ids), user_id)
+        DirtyPropagationService._mark(
+            db,
+            StrategyAnalytics,
+            StrategyAnalytics.strategy_id.in_(strategy_ids),
+            user_id,
+            reset_rollups,
         )
-        if not strategy:
-            return
 
-        portfolio = (
+        DirtyPropagationService.from_strategies(db, user_id, strategy_ids)
+
+    @staticmethod
+    def from_strategies(db: Session, user_id, strategy_ids):
+        """
+        strategy_ids: a list of ids or a scalar subquery.
+        """
+        if isinstance(strategy_ids, (list, tuple, set)):
+            strategy_ids = list(strategy_ids)
+            if not strategy_ids:
+                return
+
+        portfolio_ids = (
+            select(Strategy.portfolio_id)
+            .where(Strategy.user_id == user_id, Strategy.id.in_(strategy_ids))
+            .scalar_subquery()
+        )
+
+        DirtyPropagationService.mark_portfolios(db, user_id, portfolio_ids)
+
+    @staticmethod
+    def mark_portfolios(db: Session, user_id, portfolio_ids):
+        """
+        portfolio_ids: a list of ids or a scalar subquery.
+        """
+        (
             db.query(Portfolio)
-            .filter_by(id=strategy.portfolio_id, user_id=user_id)
-            .first()
+            .filter(
+                Portfolio.user_id == user_id,
+                Portfolio.id.in_(portfolio_ids),
+            )
+            .update(
+                {
+                    Portfolio.data_version: Portfolio.data_version + 1,
+                    Portfolio.is_dirty: True,
+                },
+                synchronize_session=False,
+            )
+        )
+
+    @staticmethod
+    def _bump(db: Session, model, id_filter, user_id):
+        (
+            db.query(model)
+            .filter(model.user_id == user_id, id_filter)
+            .update({model.data_version: model.data_version + 1}, synchronize_session=False)
         )
 
-        if portfolio:
-            portfolio.is_dirty = True
\ No newline at end of file
+    @staticmethod
+    def _mark(db: Session, model, id_filter, user_id, reset_rollups: bool):
+        values = {model.is_dirty: True}
+        if reset_rollups:
+            values[model.rollup_stats_json] = None
+
+        (
+            db.query(model)
+            .filter(model.user_id == user_id, id_filter)
+            .update(values, synchronize_session=False)
+        )
@@ -0,0 +1,290 @@
+import time
+import uuid
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from edge_lab.persistence.database import SessionLocal
+from edge_lab.persistence.models import ComputeJob, User
+from edge_lab.analytics.hierarchy_compute import HierarchyComputeService
+
+
+class JobQueueService:
+    """
+    Postgres-table-backed queue for hierarchy computes.
+
+    The API enqueues; `edge worker start` claims queued rows with
+    SELECT ... FOR UPDATE SKIP LOCKED and runs them in a process pool,
+    each job with its own session.
+
+    Running jobs hold a lease renewed by a heartbeat thread. Before each
+    claim, jobs whose lease expired (worker killed, host lost) are
+    requeued, or failed once they used up MAX_ATTEMPTS.
+    """
+
+    NODE_TYPES = ("run", "variant", "strategy", "portfolio")
+
+    LEASE_SECONDS = 120
+    HEARTBEAT_SECONDS = 30
+    MAX_ATTEMPTS = 3
+
+    # -----------------------------
+    # ENQUEUE (API side)
+    # -----------------------------
+    @staticmethod
+    def enqueue(
+        db: Session,
+        current_user: User,
+        node_type: str,
+        node_id: str,
+    ) -> ComputeJob:
+        if node_type not in JobQueueService.NODE_TYPES:
+            raise ValueError(f"Unknown node type '{node_type}'.")
+
+        # ownership check (raises 404)
+        owned = {
+            "run": HierarchyComputeService._get_owned_run,
+            "variant": HierarchyComputeService._get_owned_variant,
+            "strategy": HierarchyComputeService._get_owned_strategy,
+            "portfolio": HierarchyComputeService._get_owned_portfolio,
+        }[node_type]
+        node = owned(node_id, db, current_user)
+
+        existing = JobQueueService._queued_job(db, current_user.id, node_type, node.id)
+        if existing:
+            return existing
+
+        job = ComputeJob(
+            user_id=current_user.id,
+            node_type=node_type,
+            node_id=node.id,
+            status="queued",
+            progress=0.0,
+        )
+
+        db.add(job)
+        try:
+            db.commit()
+        except IntegrityError:
+            # lost the race against a concurrent enqueue of the same node
+            db.rollback()
+            return JobQueueService._queued_job(db, current_user.id, node_type, node.id)
+
+        db.refresh(job)
+        return job
+
+    @staticmethod
+    def _queued_job(db: Session, user_id, node_type: str, node_id) -> ComputeJob | None:
+        return (
+            db.query(ComputeJob)
+            .filter(
+                ComputeJob.user_id == user_id,
+                ComputeJob.node_type == node_type,
+                ComputeJob.node_id == node_id,
+                ComputeJob.status == "queued",
+            )
+            .first()
+        )
+
+    # -----------------------------
+    # CLAIM (worker side)
+    # -----------------------------
+    @staticmethod
+    def claim_next(db: Session) -> uuid.UUID | None:
+        JobQueueService.expire_leases(db)
+
+        job = (
+            db.query(ComputeJob)
+            .filter(ComputeJob.status == "queued")
+            .order_by(ComputeJob.created_at)
+            .with_for_update(skip_locked=True)
+            .first()
+        )
+
+        if not job:
+            db.rollback()
+            return None
+
+        job.status = "running"
+        job.started_at = datetime.utcnow()
+        job.heartbeat_at = job.started_at
+        job.attempts += 1
+        db.commit()
+
+        return job.id
+
+    @staticmethod
+    def expire_leases(db: Session) -> int:
+        """
+        Requeue or fail running jobs whose heartbeat is older than the
+        lease. Returns the number of jobs released.
+        """
+        cutoff = datetime.utcnow() - timedelta(seconds=JobQueueService.LEASE_SECONDS)
+
+        expired = (
+            db.query(ComputeJob)
+            .filter(
+                ComputeJob.status == "running",
+                ComputeJob.heartbeat_at < cutoff,
+            )
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+
+        for job in expired:
+            # a newer queued job for the node already covers it (dedup index)
+            if (
+                job.attempts >= JobQueueService.MAX_ATTEMPTS
+                or JobQueueService._queued_job(db, job.user_id, job.node_type, job.node_id)
+            ):
+                job.status = "failed"
+                job.error = f"Worker lease expired after {job.attempts} attempt(s)."
+                job.finished_at = datetime.utcnow()
+            else:
+                job.status = "queued"
+                job.progress = 0.0
+                job.started_at = None
+                job.heartbeat_at = None
+
+        db.commit()
+        return len(expired)
+
+    # -----------------------------
+    # EXECUTE (pool process)
+    # -----------------------------
+    @staticmethod
+    def execute(job_id: uuid.UUID) -> str:
+        db: Session = SessionLocal()
+        try:
+            job = db.get(ComputeJob, job_id)
+            user = db.get(User, job.user_id)
+            node_id = str(job.node_id)
+
+            def progress(done: int, total: int):
+                job.progress = done / total if total else 1.0
+                job.heartbeat_at = datetime.utcnow()
+                db.commit()
+
+            stop = threading.Event()
+            heartbeat = threading.Thread(
+                target=JobQueueService._heartbeat,
+                args=(job_id, stop),
+                daemon=True,
+            )
+            heartbeat.start()
+
+            try:
+                if job.node_type == "run":
+                    HierarchyComputeService.compute_run(node_id, db, user)
+                elif job.node_type == "variant":
+                    HierarchyComputeService.compute_variant(node_id, db, user, progress=progress)
+                elif job.node_type == "strategy":
+                    HierarchyComputeService.compute_strategy(node_id, db, user, progress=progress)
+                else:
+                    HierarchyComputeService.compute_portfolio(node_id, db, user, progress=progress)
+            except HTTPException as e:
+                db.rollback()
+                return JobQueueService._finish(db, job_id, "failed", str(e.detail))
+            except Exception as e:
+                db.rollback()
+                return JobQueueService._finish(db, job_id, "failed", str(e))
+            finally:
+                stop.set()
+                heartbeat.join()
+
+            return JobQueueService._finish(db, job_id, "done")
+        finally:
+            db.close()
+
+    @staticmethod
+    def _heartbeat(job_id: uuid.UUID, stop: threading.Event):
+        """
+        Renew the job's lease from a separate session until stop is set.
+        """
+        while not stop.wait(JobQueueService.HEARTBEAT_SECONDS):
+            db: Session = SessionLocal()
+            try:
+                (
+                    db.query(ComputeJob)
+                    .filter(
+                        ComputeJob.id == job_id,
+                        ComputeJob.status == "running",
+                    )
+                    .update(
+                        {ComputeJob.heartbeat_at: datetime.utcnow()},
+                        synchronize_session=False,
+                    )
+                )
+                db.commit()
+            except Exception:
+                # a missed beat is retried; the lease covers several
+                db.rollback()
+            finally:
+                db.close()
+
+    @staticmethod
+    def _finish(db: Session, job_id: uuid.UUID, status: str, error: str | None = None) -> str:
+        job = db.get(ComputeJob, job_id)
+        job.status = status
+        job.error = error
+        job.finished_at = datetime.utcnow()
+        if status == "done":
+            job.progress = 1.0
+        db.commit()
+        return status
+
+    # -----------------------------
+    # WORKER LOOP
+    # -----------------------------
+    @staticmethod
+    def run_worker(workers: int = 2, poll_interval: float = 1.0):
+        # spawn: children build their own engine/connection pool
+        context = multiprocessing.get_context("spawn")
+        in_flight = set()
+
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as pool:
+            while True:
+                in_flight = {f for f in in_flight if not f.done()}
+
+                claimed = None
+                if len(in_flight) < workers:
+                    db: Session = SessionLocal()
+                    try:
+                        claimed = JobQueueService.claim_next(db)
+                    finally:
+                        db.close()
+
+                if claimed:
+                    in_flight.add(pool.submit(JobQueueService.execute, claimed))
+                else:
+                    time.sleep(poll_interval)
+
+    # -----------------------------
+    # SERIALIZE
+    # -----------------------------
+    @staticmethod
+    def to_dict(job: ComputeJob) -> dict:
+        duration = None
+        if job.started_at:
+            end = job.finished_at or datetime.utcnow()
+            duration = (end - job.started_at).total_seconds()
+
+        return {
+            "id": job.id,
+            "node_type": job.node_type,
+            "node_id": job.node_id,
+            "status": job.status,
+            "progress": job.progress,
+            "error": job.error,
+            "created_at": job.created_at,
+            "started_at": job.started_at,
+            "finished_at": job.finished_at,
+            "heartbeat_at": job.heartbeat_at,
+            "attempts": job.attempts,
+            "duration_seconds": duration,
+        }
@@ -3,9 +3,11 @@ import math
 import numpy as np
 from sqlalchemy.orm import Session
 
-from edge_lab.persistence.models import Run, Trade, RunMetrics
+from edge_lab.persistence.models import Run, Trade, RunMetrics, RunAnalytics
 from edge_lab.analytics.equity import EquityBuilder
 from edge_lab.analytics.metrics import MetricsEngine
+from edge_lab.analytics.trade_frame import TradeFrame
+from edge_lab.services.dirty_propagation import DirtyPropagationService
 
 
 class RunService:
@@ -103,6 +105,21 @@ class RunService:
         )
 
         db.add(trade)
+
+        analytics = (
+            db.query(RunAnalytics)
+            .filter(
+                RunAnalytics.user_id == user_id,
+                RunAnalytics.run_id == run_id,
+            )
+            .first()
+        )
+
+        # no timestamp: the trade cannot be appended to the running state
+        if analytics:
+            analytics.running_state_json = None
+
+        DirtyPropagationService.from_trades(db, user_id, [run_id])
         db.commit()
         db.refresh(trade)
 
@@ -148,8 +165,8 @@ class RunService:
             user_id=user_id,
         )
 
-        log_returns = df["log_return"].values
-        raw_returns = np.exp(log_returns) - 1
+        raw_returns = df["strategy_return"].values
+        log_returns = np.log1p(raw_returns)
 
         expectancy = float(MetricsEngine.expectancy(raw_returns))
         sharpe = float(MetricsEngine.sharpe(log_returns))
@@ -176,4 +193,6 @@ class RunService:
         db.commit()
         db.refresh(snapshot)
 
+        TradeFrame.write_store(db=db, run_id=run_id, user_id=user_id)
+
         return snapshot
\ No newline at end of file
@@ -0,0 +1,249 @@
+import re
+import time
+import uuid
+import threading
+from typing import Callable
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+from sqlalchemy.orm import Session
+
+from edge_lab.persistence.models import (
+    User,
+    Run,
+    RunAnalytics,
+    Variant,
+    VariantAnalytics,
+    Strategy,
+    StrategyAnalytics,
+)
+from edge_lab.services.job_queue import JobQueueService
+
+
+class SnapshotReadService:
+    """
+    Serving of persisted analytics snapshots on GET.
+
+    Default reads are unchanged apart from an ETag and a `stale` marker
+    (input_version behind the node's data_version). Opt-in extras:
+
+    - revalidate=true: a stale or missing snapshot enqueues a compute job
+      (deduplicated by JobQueueService) and the stale snapshot is served
+      immediately
+    - If-None-Match: 304 while the snapshot is unchanged
+    - wait=<seconds> with If-None-Match: long-poll until the snapshot
+      changes, then 200 with the new version (304 on timeout). Waiters
+      hold a worker thread but no DB connection between polls; past
+      LONG_POLL_MAX_WAITERS per process the request gets 429
+
+    read_batch() serves list pages: projected summary metrics of many
+    runs, variants or strategies in one query.
+    """
+
+    LONG_POLL_MAX_SECONDS = 30.0
+    LONG_POLL_INTERVAL_SECONDS = 0.5
+
+    # sync routes run in the server's threadpool; keep most of it free
+    LONG_POLL_MAX_WAITERS = 16
+    _waiters = threading.BoundedSemaphore(LONG_POLL_MAX_WAITERS)
+
+    # node_type -> (node model, snapshot model, snapshot node key,
+    #               metrics column, parent column)
+    BATCH_NODES = {
+        "run": (Run, RunAnalytics, "run_id", "metrics_json", "variant_id"),
+        "variant": (Variant, VariantAnalytics, "variant_id", "aggregated_metrics_json", "strategy_id"),
+        "strategy": (Strategy, StrategyAnalytics, "strategy_id", "aggregated_metrics_json", "portfolio_id"),
+    }
+
+    BATCH_MAX_IDS = 500
+    BATCH_MAX_FIELDS = 30
+
+    FIELD_PATTERN = re.compile(r"^[A-Za-z0-9_]+$")
+
+    @staticmethod
+    def etag(snapshot) -> str:
+        # input_version alone misses re-weights and same-version recomputes
+        return f'"{snapshot.input_version}-{snapshot.updated_at.timestamp():.6f}"'
+
+    @staticmethod
+    def serve(
+        db: Session,
+        current_user: User,
+        node_type: str,
+        node,
+        load: Callable,
+        serialize: Callable[[object], dict],
+        missing_detail: str,
+        revalidate: bool = False,
+        wait: float = 0.0,
+        if_none_match: str | None = None,
+        stale: Callable[[object], bool] | None = None,
+    ) -> Response:
+        """
+        stale overrides the default input_version < data_version check
+        (runs also count individually stale sections).
+        """
+        if stale is None:
+            def stale(s):
+                return s.input_version < node.data_version
+
+        snapshot = load()
+        is_stale = snapshot is None or stale(snapshot)
+
+        job = None
+        if revalidate and is_stale:
+            job = JobQueueService.enqueue(db, current_user, node_type, str(node.id))
+
+        if wait > 0 and (snapshot is None or if_none_match == SnapshotReadService.etag(snapshot)):
+            snapshot = SnapshotReadService._long_poll(db, load, snapshot, wait)
+            if snapshot is not None:
+                is_stale = stale(snapshot)
+
+        if snapshot is None:
+            if job is None:
+                raise HTTPException(status_code=404, detail=missing_detail)
+            return JSONResponse(
+                status_code=202,
+                content=jsonable_encoder({"status": "queued", "job_id": job.id}),
+            )
+
+        etag = SnapshotReadService.etag(snapshot)
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+        if if_none_match == etag:
+            return Response(status_code=304, headers=headers)
+
+        body = serialize(snapshot)
+        body["stale"] = is_stale
+        if job is not None:
+            body["job_id"] = job.id
+
+        return JSONResponse(content=jsonable_encoder(body), headers=headers)
+
+    @staticmethod
+    def read_batch(
+        db: Session,
+        current_user: User,
+        node_type: str,
+        ids: list[str] | None = None,
+        parent_id: str | None = None,
+        fields: list[str] | None = None,
+    ) -> dict:
+        """
+        Summary metrics of many nodes in one query: the nodes listed in
+        ids, or every child of parent_id (run -> variant, variant ->
+        strategy, strategy -> portfolio). fields projects metric keys
+        inside the database so only those values are read; None returns
+        the whole metrics object. Other snapshot sections are never loaded.
+        Requested ids that are not the user's come back in not_found.
+        Raises ValueError on bad input.
+        """
+        if node_type not in SnapshotReadService.BATCH_NODES:
+            raise ValueError(f"Unknown node_type '{node_type}'. Use: {', '.join(SnapshotReadService.BATCH_NODES)}.")
+
+        if (ids is None) == (parent_id is None):
+            raise ValueError("Pass either ids or parent_id.")
+
+        if ids is not None and len(ids) > SnapshotReadService.BATCH_MAX_IDS:
+            raise ValueError(f"At most {SnapshotReadService.BATCH_MAX_IDS} ids per batch.")
+
+        if fields is not None:
+            if len(fields) > SnapshotReadService.BATCH_MAX_FIELDS:
+                raise ValueError(f"At most {SnapshotReadService.BATCH_MAX_FIELDS} fields per batch.")
+            bad = [f for f in fields if not SnapshotReadService.FIELD_PATTERN.match(f)]
+            if bad:
+                raise ValueError(f"Invalid field(s): {', '.join(bad)}.")
+
+        model, snapshot_model, node_key, metrics_name, parent_name = SnapshotReadService.BATCH_NODES[node_type]
+        metrics = getattr(snapshot_model, metrics_name)
+
+        if fields is None:
+            projected = [metrics]
+        else:
+            projected = [metrics[f] for f in fields]
+
+        query = (
+            db.query(
+                model.id,
+                model.data_version,
+                snapshot_model.input_version,
+                snapshot_model.is_dirty,
+                snapshot_model.updated_at,
+                *projected,
+            )
+            .outerjoin(
+                snapshot_model,
+                (getattr(snapshot_model, node_key) == model.id)
+                & (snapshot_model.user_id == current_user.id),
+            )
+            .filter(model.user_id == current_user.id)
+        )
+
+        try:
+            if ids is not None:
+                requested = [uuid.UUID(i) for i in ids]
+                query = query.filter(model.id.in_(requested))
+            else:
+                query = query.filter(getattr(model, parent_name) == uuid.UUID(parent_id))
+        except ValueError:
+            raise ValueError("Invalid id.")
+
+        items = []
+        for node_id, data_version, input_version, is_dirty, updated_at, *values in query.all():
+            computed = input_version is not None
+
+            if not computed:
+                metrics_values = None
+            elif fields is None:
+                metrics_values = values[0]
+            else:
+                metrics_values = dict(zip(fields, values))
+
+            items.append({
+                "id": node_id,
+                "computed": computed,
+                "stale": not computed or input_version < data_version,
+                "is_dirty": is_dirty,
+                "updated_at": updated_at,
+                "metrics": metrics_values,
+            })
+
+        found = {item["id"] for item in items}
+
+        return {
+            "items": items,
+            "not_found": [] if ids is None else [str(i) for i in requested if i not in found],
+        }
+
+    @staticmethod
+    def _long_poll(db: Session, load: Callable, snapshot, wait: float):
+        """
+        Re-read until the snapshot differs from the one the client holds.
+        Raises 429 when too many requests are already waiting.
+        """
+        if not SnapshotReadService._waiters.acquire(blocking=False):
+            raise HTTPException(
+                status_code=429,
+                detail="Too many long-poll waiters; retry shortly.",
+                headers={"Retry-After": "1"},
+            )
+
+        try:
+            seen = None if snapshot is None else SnapshotReadService.etag(snapshot)
+            deadline = time.monotonic() + min(wait, SnapshotReadService.LONG_POLL_MAX_SECONDS)
+
+            while time.monotonic() < deadline:
+                # end the read transaction before sleeping: the connection
+                # goes back to the pool and the worker's commit is visible
+                db.commit()
+                time.sleep(SnapshotReadService.LONG_POLL_INTERVAL_SECONDS)
+
+                db.expire_all()
+                fresh = load()
+                if fresh is not None and SnapshotReadService.etag(fresh) != seen:
+                    return fresh
+
+            return snapshot
+        finally:
+            SnapshotReadService._waiters.release()
@@ -0,0 +1,291 @@
+import io
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+from sqlalchemy.orm import Session
+
+from edge_lab.persistence.models import Run, RunAnalytics
+from edge_lab.analytics.trade_frame import TradeFrame
+from edge_lab.services.dirty_propagation import DirtyPropagationService
+
+
+class TradeImportService:
+
+    FORMATS = ("csv", "ndjson", "arrow")
+
+    EXTENSIONS = {
+        ".csv": "csv",
+        ".ndjson": "ndjson",
+        ".jsonl": "ndjson",
+        ".arrow": "arrow",
+        ".arrows": "arrow",
+        ".ipc": "arrow",
+    }
+
+    CONTENT_TYPES = {
+        "text/csv": "csv",
+        "application/x-ndjson": "ndjson",
+        "application/jsonl": "ndjson",
+        "application/vnd.apache.arrow.stream": "arrow",
+        "application/vnd.apache.arrow.file": "arrow",
+    }
+
+    # Arrow IPC file format header; streams start with a continuation marker
+    ARROW_FILE_MAGIC = b"ARROW1"
+
+    REQUIRED_COLUMNS = (
+        "entry_price",
+        "exit_price",
+        "stop_loss",
+        "size",
+        "direction",
+        "timestamp",
+    )
+
+    COPY_COLUMNS = (
+        "id",
+        "user_id",
+        "run_id",
+        "entry_price",
+        "exit_price",
+        "stop_loss",
+        "size",
+        "direction",
+        "timestamp",
+        "timeframe",
+        "raw_return",
+        "log_return",
+        "r_multiple",
+        "is_win",
+        "created_at",
+    )
+
+    CHUNK_ROWS = 50_000
+
+    # -----------------------------
+    # FORMAT DETECTION
+    # -----------------------------
+    @staticmethod
+    def detect_format(path: str | None = None, content_type: str | None = None) -> str:
+        if content_type:
+            fmt = TradeImportService.CONTENT_TYPES.get(content_type.split(";")[0].strip())
+            if fmt:
+                return fmt
+
+        if path:
+            fmt = TradeImportService.EXTENSIONS.get(Path(path).suffix.lower())
+            if fmt:
+                return fmt
+
+        raise ValueError("Unknown trade file format. Use csv, ndjson or arrow.")
+
+    # -----------------------------
+    # PARSE
+    # -----------------------------
+    @staticmethod
+    def iter_frames(source, fmt: str, chunk_rows: int | None = None):
+        """
+        Yield DataFrames of at most chunk_rows rows from a path, bytes
+        or binary file object, so large files are never fully loaded.
+        """
+        if fmt not in TradeImportService.FORMATS:
+            raise ValueError(f"Unsupported format '{fmt}'.")
+
+        if chunk_rows is None:
+            chunk_rows = TradeImportService.CHUNK_ROWS
+
+        if isinstance(source, (bytes, bytearray)):
+            source = io.BytesIO(source)
+
+        if fmt == "csv":
+            yield from pd.read_csv(source, chunksize=chunk_rows)
+
+        elif fmt == "ndjson":
+            yield from pd.read_json(source, lines=True, chunksize=chunk_rows)
+
+        else:
+            try:
+                import pyarrow as pa
+            except ImportError:
+                raise ValueError("Arrow IPC import requires pyarrow.")
+
+            if isinstance(source, str):
+                source = pa.memory_map(source)
+
+            # .arrow is usually the IPC file format, .arrows the stream
+            # format; the header tells them apart whatever the name
+            head = source.read(len(TradeImportService.ARROW_FILE_MAGIC))
+            source.seek(0)
+
+            if head == TradeImportService.ARROW_FILE_MAGIC:
+                reader = pa.ipc.open_file(source)
+                for i in range(reader.num_record_batches):
+                    yield reader.get_batch(i).to_pandas()
+            else:
+                for batch in pa.ipc.open_stream(source):
+                    yield batch.to_pandas()
+
+    # -----------------------------
+    # VALIDATE + DERIVE (VECTORIZED)
+    # -----------------------------
+    @staticmethod
+    def prepare(df: pd.DataFrame, offset: int = 0) -> pd.DataFrame:
+        """
+        Same validation and derived fields as POST /trades/, on whole columns.
+        offset is the file row of df's first row, for error messages.
+        """
+        missing = [c for c in TradeImportService.REQUIRED_COLUMNS if c not in df.columns]
+        if missing:
+            raise ValueError(f"Missing columns: {', '.join(missing)}.")
+
+        entry = df["entry_price"].to_numpy(dtype=np.float64)
+        exit_ = df["exit_price"].to_numpy(dtype=np.float64)
+        stop = df["stop_loss"].to_numpy(dtype=np.float64)
+        size = df["size"].to_numpy(dtype=np.float64)
+        direction = df["direction"].astype(str).str.lower().to_numpy()
+
+        if np.isnan(entry).any() or np.isnan(exit_).any() or np.isnan(stop).any() or np.isnan(size).any():
+            raise ValueError("Prices and size must be present on every row.")
+
+        is_long = direction == "long"
+        is_short = direction == "short"
+
+        bad = ~(is_long | is_short)
+        if bad.any():
+            raise ValueError(f"Direction must be long or short (row {offset + int(np.argmax(bad))}).")
+
+        bad = entry == stop
+        if bad.any():
+            raise ValueError(f"Stop loss cannot equal entry (row {offset + int(np.argmax(bad))}).")
+
+        sign = np.where(is_long, 1.0, -1.0)
+
+        raw_return = sign * (exit_ - entry) / entry
+        r_multiple = sign * (exit_ - entry) / (sign * (entry - stop))
+
+        bad = raw_return <= -1
+        if bad.any():
+            raise ValueError(f"Return <= -100% is not valid (row {offset + int(np.argmax(bad))}).")
+
+        timestamp = pd.to_datetime(df["timestamp"], utc=True).dt.tz_localize(None)
+        if timestamp.isna().any():
+            raise ValueError("Timestamp must be present on every row.")
+
+        if "timeframe" in df.columns:
+            timeframe = df["timeframe"].astype("string")
+        else:
+            timeframe = pd.Series(pd.NA, index=df.index, dtype="string")
+
+        return pd.DataFrame({
+            "entry_price": entry,
+            "exit_price": exit_,
+            "stop_loss": stop,
+            "size": size,
+            "direction": direction,
+            "timestamp": timestamp.to_numpy(),
+            "timeframe": timeframe.to_numpy(),
+            "raw_return": raw_return,
+            "log_return": np.log1p(raw_return),
+            "r_multiple": r_multiple,
+            "is_win": r_multiple > 0,
+        })
+
+    # -----------------------------
+    # COPY
+    # -----------------------------
+    @staticmethod
+    def _copy_chunk(cursor, df: pd.DataFrame, user_id, run_id, created_at: datetime, offset: int):
+        n = len(df)
+
+        df = df.assign(
+            id=[str(uuid.uuid4()) for _ in range(n)],
+            user_id=str(user_id),
+            run_id=str(run_id),
+            # microsecond steps keep file order under ORDER BY created_at
+            created_at=pd.Timestamp(created_at) + pd.to_timedelta(np.arange(offset, offset + n), unit="us"),
+        )
+
+        buffer = io.StringIO()
+        df.to_csv(
+            buffer,
+            columns=list(TradeImportService.COPY_COLUMNS),
+            header=False,
+            index=False,
+        )
+
+        columns = ", ".join(TradeImportService.COPY_COLUMNS)
+        with cursor.copy(f"COPY trades ({columns}) FROM STDIN WITH (FORMAT csv)") as copy:
+            copy.write(buffer.getvalue())
+
+    @staticmethod
+    def import_frames(
+        db: Session,
+        user_id: uuid.UUID,
+        run_id: uuid.UUID,
+        frames,
+    ) -> int:
+        """
+        Validate and COPY every frame in one transaction, then mark the
+        run's analytics dirty once. Returns the number of imported trades.
+        """
+        run = (
+            db.query(Run)
+            .filter(
+                Run.id == run_id,
+                Run.user_id == user_id,
+            )
+            .first()
+        )
+
+        if not run:
+            raise ValueError("Run not found.")
+
+        cursor = db.connection().connection.cursor()
+        created_at = datetime.utcnow()
+        total = 0
+        rows_read = 0
+
+        try:
+            for frame in frames:
+                prepared = TradeImportService.prepare(frame, offset=rows_read)
+                rows_read += len(frame)
+                if prepared.empty:
+                    continue
+
+                TradeImportService._copy_chunk(
+                    cursor,
+                    prepared,
+                    user_id=user_id,
+                    run_id=run.id,
+                    created_at=created_at,
+                    offset=total,
+                )
+                total += len(prepared)
+
+            analytics = (
+                db.query(RunAnalytics)
+                .filter(
+                    RunAnalytics.user_id == user_id,
+                    RunAnalytics.run_id == run.id,
+                )
+                .first()
+            )
+
+            if analytics:
+                analytics.running_state_json = None
+
+            DirtyPropagationService.from_trades(db, user_id, [run.id])
+
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            cursor.close()
+
+        TradeFrame.write_store(db=db, run_id=run.id, user_id=user_id)
+
+        return total
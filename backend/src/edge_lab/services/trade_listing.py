@@ -0,0 +1,248 @@
+import base64
+import io
+import json
+import uuid
+from datetime import datetime
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import Session
+
+from edge_lab.persistence.database import SessionLocal
+from edge_lab.persistence.models import Trade
+
+
+class TradeListingService:
+    """
+    Trade reads in (timestamp, id) order without materializing every row.
+
+    - page(): keyset pagination; the opaque cursor encodes the last row's
+      (timestamp, id), so every page is one index range scan whatever
+      its depth
+    - stream(): JSON array, NDJSON or Arrow IPC stream produced from a
+      server-side cursor in fixed-size batches; memory stays flat in the
+      number of trades
+
+    Rows are plain column tuples, never ORM objects.
+    """
+
+    FORMATS = ("json", "ndjson", "arrow")
+
+    MEDIA_TYPES = {
+        "json": "application/json",
+        "ndjson": "application/x-ndjson",
+        "arrow": "application/vnd.apache.arrow.stream",
+    }
+
+    COLUMNS = (
+        "id",
+        "run_id",
+        "entry_price",
+        "exit_price",
+        "stop_loss",
+        "size",
+        "direction",
+        "timestamp",
+        "timeframe",
+        "r_multiple",
+        "is_win",
+        "raw_return",
+        "log_return",
+        "created_at",
+    )
+
+    DEFAULT_LIMIT = 500
+    MAX_LIMIT = 5000
+
+    STREAM_BATCH_ROWS = 5000
+
+    # -----------------------------
+    # QUERY
+    # -----------------------------
+    @staticmethod
+    def query(
+        user_id,
+        run_id=None,
+        direction: str | None = None,
+        timeframe: str | None = None,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        cursor: str | None = None,
+    ):
+        """
+        start is inclusive, end exclusive. Raises ValueError on a bad cursor.
+        """
+        stmt = (
+            select(*(getattr(Trade, c) for c in TradeListingService.COLUMNS))
+            .where(Trade.user_id == user_id)
+            .order_by(Trade.timestamp, Trade.id)
+        )
+
+        if run_id is not None:
+            stmt = stmt.where(Trade.run_id == run_id)
+        if direction is not None:
+            stmt = stmt.where(Trade.direction == direction.lower())
+        if timeframe is not None:
+            stmt = stmt.where(Trade.timeframe == timeframe)
+        if start is not None:
+            stmt = stmt.where(Trade.timestamp >= start)
+        if end is not None:
+            stmt = stmt.where(Trade.timestamp < end)
+
+        if cursor is not None:
+            after = TradeListingService.decode_cursor(cursor)
+            stmt = stmt.where(tuple_(Trade.timestamp, Trade.id) > after)
+
+        return stmt
+
+    @staticmethod
+    def respond(db: Session, stmt, fmt: str, cursor: str | None, limit: int | None):
+        """
+        A keyset page when cursor or limit is given (JSON only), otherwise
+        a stream of every matching row. Raises ValueError on bad input.
+        """
+        if cursor is not None or limit is not None:
+            if fmt != "json":
+                raise ValueError("Pages are JSON; omit cursor and limit to stream.")
+            if limit is None:
+                limit = TradeListingService.DEFAULT_LIMIT
+            return TradeListingService.page(db, stmt, limit)
+
+        TradeListingService.check_format(fmt)
+
+        return StreamingResponse(
+            TradeListingService.stream(stmt, fmt),
+            media_type=TradeListingService.MEDIA_TYPES[fmt],
+        )
+
+    # -----------------------------
+    # CURSOR
+    # -----------------------------
+    @staticmethod
+    def encode_cursor(timestamp: datetime, trade_id: uuid.UUID) -> str:
+        raw = json.dumps([timestamp.isoformat(), str(trade_id)])
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+            timestamp, trade_id = json.loads(raw)
+            return datetime.fromisoformat(timestamp), uuid.UUID(trade_id)
+        except (ValueError, TypeError):
+            raise ValueError("Invalid cursor.")
+
+    # -----------------------------
+    # PAGE
+    # -----------------------------
+    @staticmethod
+    def page(db: Session, stmt, limit: int) -> dict:
+        if not 1 <= limit <= TradeListingService.MAX_LIMIT:
+            raise ValueError(f"limit must be between 1 and {TradeListingService.MAX_LIMIT}.")
+
+        rows = db.execute(stmt.limit(limit + 1)).all()
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last = rows[-1]
+            next_cursor = TradeListingService.encode_cursor(last.timestamp, last.id)
+
+        return {
+            "items": [dict(row._mapping) for row in rows],
+            "next_cursor": next_cursor,
+        }
+
+    # -----------------------------
+    # STREAM
+    # -----------------------------
+    @staticmethod
+    def check_format(fmt: str) -> None:
+        if fmt not in TradeListingService.FORMATS:
+            raise ValueError(f"Unsupported format '{fmt}'. Use json, ndjson or arrow.")
+
+        if fmt == "arrow":
+            try:
+                import pyarrow  # noqa: F401
+            except ImportError:
+                raise ValueError("Arrow IPC export requires pyarrow.")
+
+    @staticmethod
+    def stream(stmt, fmt: str):
+        """
+        Generator over response chunks. Uses its own session: the request
+        session may be closed before a streaming body is consumed.
+        """
+        db = SessionLocal()
+        try:
+            result = db.execute(
+                stmt.execution_options(yield_per=TradeListingService.STREAM_BATCH_ROWS)
+            )
+            batches = result.partitions()
+
+            if fmt == "arrow":
+                yield from TradeListingService._arrow_chunks(batches)
+            elif fmt == "ndjson":
+                for rows in batches:
+                    yield "".join(
+                        json.dumps(dict(row._mapping), default=TradeListingService._encode) + "\n"
+                        for row in rows
+                    )
+            else:
+                yield "["
+                first = True
+                for rows in batches:
+                    chunk = ",".join(
+                        json.dumps(dict(row._mapping), default=TradeListingService._encode)
+                        for row in rows
+                    )
+                    yield chunk if first else "," + chunk
+                    first = False
+                yield "]"
+        finally:
+            db.close()
+
+    @staticmethod
+    def _arrow_chunks(batches):
+        import pyarrow as pa
+
+        schema = pa.schema([
+            ("id", pa.string()),
+            ("run_id", pa.string()),
+            ("entry_price", pa.float64()),
+            ("exit_price", pa.float64()),
+            ("stop_loss", pa.float64()),
+            ("size", pa.float64()),
+            ("direction", pa.string()),
+            ("timestamp", pa.timestamp("us")),
+            ("timeframe", pa.string()),
+            ("r_multiple", pa.float64()),
+            ("is_win", pa.bool_()),
+            ("raw_return", pa.float64()),
+            ("log_return", pa.float64()),
+            ("created_at", pa.timestamp("us")),
+        ])
+
+        sink = io.BytesIO()
+        writer = pa.ipc.new_stream(sink, schema)
+
+        for rows in batches:
+            columns = list(zip(*rows))
+            columns[0] = [str(v) for v in columns[0]]
+            columns[1] = [str(v) for v in columns[1]]
+            writer.write_batch(pa.record_batch(columns, schema=schema))
+
+            yield sink.getvalue()
+            sink.seek(0)
+            sink.truncate()
+
+        writer.close()
+        yield sink.getvalue()
+
+    @staticmethod
+    def _encode(value):
+        if isinstance(value, datetime):
+            return value.isoformat()
+        if isinstance(value, uuid.UUID):
+            return str(value)
+        raise TypeError(f"Cannot encode {type(value).__name__}.")
@@ -0,0 +1,100 @@
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+os.environ.setdefault("JWT_SECRET", "test")
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from edge_lab.persistence.database import Base
+from edge_lab.persistence.models import (
+    Portfolio,
+    Run,
+    Strategy,
+    Trade,
+    User,
+    Variant,
+)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine(
+        "sqlite://",
+        poolclass=StaticPool,
+        connect_args={"check_same_thread": False},
+    )
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine, autoflush=False)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+
+@pytest.fixture
+def build_tree(db):
+    """
+    Factory for a portfolio with strategies x variants x runs, each run
+    holding `trades` random trades. Returns (user, portfolio).
+    """
+    def build(strategies=1, variants=1, runs=1, trades=30, seed=0):
+        rng = np.random.default_rng(seed)
+        start = datetime(2026, 1, 1)
+
+        user = User(email=f"u{seed}@example.com", password_hash="x")
+        db.add(user)
+        db.flush()
+
+        portfolio = Portfolio(user_id=user.id, name="Default", is_default=True)
+        db.add(portfolio)
+        db.flush()
+
+        for si in range(strategies):
+            strategy = Strategy(user_id=user.id, name=f"s{si}", asset="X", portfolio_id=portfolio.id)
+            db.add(strategy)
+            db.flush()
+
+            for vi in range(variants):
+                variant = Variant(
+                    user_id=user.id,
+                    strategy_id=strategy.id,
+                    name=f"v{si}{vi}",
+                    version_number=1,
+                    parameter_hash="h",
+                    parameter_json="{}",
+                )
+                db.add(variant)
+                db.flush()
+
+                for ri in range(runs):
+                    run = Run(user_id=user.id, variant_id=variant.id, run_type="backtest", initial_capital=1000)
+                    db.add(run)
+                    db.flush()
+
+                    for k, r in enumerate(rng.normal(0.15, 1.2, trades)):
+                        db.add(Trade(
+                            user_id=user.id,
+                            run_id=run.id,
+                            entry_price=100.0,
+                            exit_price=100.0 + r,
+                            stop_loss=99.0,
+                            size=1.0,
+                            direction="long",
+                            timestamp=start + timedelta(hours=k),
+                            raw_return=r / 100,
+                            log_return=float(np.log1p(r / 100)),
+                            r_multiple=float(r),
+                            is_win=bool(r > 0),
+                            created_at=start + timedelta(minutes=k + ri * 1000),
+                        ))
+
+        db.commit()
+        return user, portfolio
+
+    return build
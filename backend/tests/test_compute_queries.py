@@ -0,0 +1,60 @@
+from edge_lab.analytics.hierarchy_compute import HierarchyComputeService
+from edge_lab.persistence.models import Run
+from edge_lab.persistence.query_counter import QueryCounter
+from edge_lab.services.dirty_propagation import DirtyPropagationService
+
+# ORM statements per dirty run: trade read, equity levels write, CAS
+# snapshot write, and the run, snapshot and user reloads after its commit
+QUERIES_PER_DIRTY_RUN = 6
+
+
+def compute_portfolio_queries(db, user, portfolio) -> int:
+    with QueryCounter(db) as queries:
+        HierarchyComputeService.compute_portfolio(str(portfolio.id), db, user)
+    return queries.count
+
+
+def dirty(db, user, runs):
+    DirtyPropagationService.from_trades(db, user.id, [r.id for r in runs])
+    db.commit()
+
+
+def test_clean_tree_costs_constant_queries(db, build_tree):
+    counts = []
+    for seed, shape in enumerate([(1, 1, 1), (2, 2, 3)]):
+        user, portfolio = build_tree(*shape, seed=seed)
+        compute_portfolio_queries(db, user, portfolio)
+        counts.append(compute_portfolio_queries(db, user, portfolio))
+
+    assert counts[0] == counts[1]
+
+
+def test_one_dirty_run_costs_constant_queries(db, build_tree):
+    counts = []
+    for seed, shape in enumerate([(1, 1, 1), (2, 2, 3)]):
+        user, portfolio = build_tree(*shape, seed=seed)
+        compute_portfolio_queries(db, user, portfolio)
+
+        run = db.query(Run).filter(Run.user_id == user.id).first()
+        dirty(db, user, [run])
+        counts.append(compute_portfolio_queries(db, user, portfolio))
+
+    assert counts[0] == counts[1]
+
+
+def test_dirty_runs_cost_a_fixed_budget_each(db, build_tree):
+    """
+    Documented shortfall: each dirty run still reads its own trades and
+    writes its own snapshot, so the count is linear in dirty runs. Pin
+    the per-run budget so an N+1 anywhere else fails here.
+    """
+    counts = {}
+    for seed, runs in enumerate([2, 6]):
+        user, portfolio = build_tree(1, 1, runs, seed=seed)
+        compute_portfolio_queries(db, user, portfolio)
+
+        dirty(db, user, db.query(Run).filter(Run.user_id == user.id).all())
+        counts[runs] = compute_portfolio_queries(db, user, portfolio)
+
+    per_run = (counts[6] - counts[2]) / 4
+    assert per_run <= QUERIES_PER_DIRTY_RUN
@@ -0,0 +1,132 @@
+from datetime import timedelta
+
+import numpy as np
+import pytest
+
+from edge_lab.analytics.equity_levels import EquityLevels
+from edge_lab.analytics.hierarchy_compute import HierarchyComputeService
+from edge_lab.analytics.incremental import IncrementalRunAnalytics
+from edge_lab.api.routes import trades
+from edge_lab.persistence.models import Run, RunAnalytics, RunEquityLevel, Trade
+from edge_lab.services.dirty_propagation import DirtyPropagationService
+
+METRIC_KEYS = ("total_trades", "expectancy_R", "total_R", "win_rate", "max_drawdown_R", "log_growth")
+
+
+def append(db, user, run, r, timestamp):
+    trades.create_trade(
+        trades.TradeCreate(
+            run_id=str(run.id),
+            entry_price=100.0,
+            exit_price=100.0 + r,
+            stop_loss=99.0,
+            size=1.0,
+            direction="long",
+            timestamp=timestamp,
+        ),
+        db,
+        user,
+    )
+
+
+def last_timestamp(db, run):
+    return max(t for (t,) in db.query(Trade.timestamp).filter(Trade.run_id == run.id))
+
+
+def snapshot_of(db, run) -> RunAnalytics:
+    db.expire_all()
+    return db.query(RunAnalytics).filter(RunAnalytics.run_id == run.id).one()
+
+
+@pytest.fixture
+def computed_run(db, build_tree):
+    def build(trade_count=40):
+        user, _ = build_tree(1, 1, 1, trade_count)
+        run = db.query(Run).filter(Run.user_id == user.id).one()
+        HierarchyComputeService.compute_run(str(run.id), db, user)
+        return user, run
+
+    return build
+
+
+def test_in_order_append_matches_full_recompute(db, computed_run):
+    user, run = computed_run()
+    last = last_timestamp(db, run)
+
+    rng = np.random.default_rng(7)
+    for k, r in enumerate(rng.normal(0.1, 1.0, 30)):
+        append(db, user, run, float(r), last + timedelta(hours=k + 1))
+
+    snapshot = snapshot_of(db, run)
+    db.refresh(run)
+    assert snapshot.input_version == run.data_version
+    assert HierarchyComputeService.stale_sections(snapshot, run.data_version) == [
+        "walk_forward", "monte_carlo", "risk_of_ruin", "regime", "kelly",
+    ]
+
+    appended_metrics = snapshot.metrics_json
+    appended_equity = IncrementalRunAnalytics.equity(snapshot)
+
+    DirtyPropagationService.from_trades(db, user.id, [run.id])
+    db.commit()
+    HierarchyComputeService.compute_run(str(run.id), db, user, sections=("metrics", "equity"))
+
+    recomputed = snapshot_of(db, run)
+    for key in METRIC_KEYS:
+        assert appended_metrics[key] == pytest.approx(recomputed.metrics_json[key]), key
+    assert np.allclose(appended_equity["equity"], recomputed.equity_json["equity"])
+    assert np.allclose(appended_equity["drawdown"], recomputed.equity_json["drawdown"])
+
+
+def test_out_of_order_append_leaves_run_stale(db, computed_run):
+    user, run = computed_run()
+
+    append(db, user, run, 1.0, last_timestamp(db, run) - timedelta(hours=5))
+
+    snapshot = snapshot_of(db, run)
+    db.refresh(run)
+    assert snapshot.running_state_json is None
+    assert {"metrics", "equity"} <= set(HierarchyComputeService.stale_sections(snapshot, run.data_version))
+
+
+def test_equity_only_compute_does_not_repeat_the_tail(db, computed_run):
+    user, run = computed_run()
+    last = last_timestamp(db, run)
+    for k in range(5):
+        append(db, user, run, 0.5, last + timedelta(hours=k + 1))
+
+    # a version bump that keeps the running state, then equity alone
+    DirtyPropagationService.from_trades(db, user.id, [run.id])
+    db.commit()
+    HierarchyComputeService.compute_run(str(run.id), db, user, sections=("equity",))
+
+    snapshot = snapshot_of(db, run)
+    assert len(IncrementalRunAnalytics.equity(snapshot)["equity"]) == 45
+
+
+def test_append_folds_into_equity_levels(db, computed_run):
+    user, run = computed_run(trade_count=510)
+    last = last_timestamp(db, run)
+
+    rng = np.random.default_rng(3)
+    for k, r in enumerate(rng.normal(0.0, 1.5, 60)):
+        append(db, user, run, float(r), last + timedelta(hours=k + 1))
+
+    snapshot = snapshot_of(db, run)
+    curve = IncrementalRunAnalytics.equity(snapshot)
+    equity = np.asarray(curve["equity"])
+    drawdown = np.asarray(curve["drawdown"])
+
+    level = db.query(RunEquityLevel).filter(RunEquityLevel.run_id == run.id).one()
+    assert level.source_count == equity.size == 570
+    assert level.point_count <= level.resolution
+
+    index, level_equity, level_drawdown = EquityLevels.unpack(level.data, level.point_count)
+    assert index[0] == 0 and index[-1] == equity.size - 1
+
+    buckets = np.arange(equity.size) // level.bucket_size
+    for b in np.unique(buckets):
+        kept = index // level.bucket_size == b
+        assert level_equity[kept].min() == pytest.approx(equity[buckets == b].min(), rel=1e-6)
+        assert level_equity[kept].max() == pytest.approx(equity[buckets == b].max(), rel=1e-6)
+        assert level_drawdown[kept].min() == pytest.approx(drawdown[buckets == b].min(), abs=1e-6)
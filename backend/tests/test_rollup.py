@@ -0,0 +1,130 @@
+import numpy as np
+import pytest
+
+from edge_lab.analytics.rollup import RollupStats
+
+
+def stats_of(values, weights=None):
+    weights = weights if weights is not None else [1] * len(values)
+    s = RollupStats.empty()
+    for x, w in zip(values, weights):
+        s = RollupStats.merge(s, RollupStats.from_value(x, w))
+    return s
+
+
+def run(expectancy, log_growth=0.0, sharpe=0.0, max_drawdown=-1.0, trades=10):
+    return RollupStats.from_run_metrics({
+        "expectancy_R": expectancy,
+        "log_growth": log_growth,
+        "sharpe": sharpe,
+        "max_drawdown_R": max_drawdown,
+        "total_trades": trades,
+    })
+
+
+def assert_matches(s, values, weights):
+    values = np.asarray(values, dtype=float)
+    assert s["count"] == values.size
+    assert s["mean"] == pytest.approx(values.mean())
+    assert s["m2"] / s["count"] == pytest.approx(values.var(), abs=1e-12)
+    assert s["min"] == values.min()
+    assert s["max"] == values.max()
+    assert s["weight"] == sum(weights)
+    assert s["weighted_sum"] == pytest.approx(float(np.dot(values, weights)))
+
+
+def test_merge_matches_direct_moments():
+    rng = np.random.default_rng(1)
+    values = rng.normal(0.2, 1.5, 40).tolist()
+    weights = rng.integers(1, 50, 40).tolist()
+
+    # merge order and grouping do not matter
+    left = stats_of(values[:13], weights[:13])
+    right = stats_of(values[13:], weights[13:])
+
+    assert_matches(RollupStats.merge(left, right), values, weights)
+    assert_matches(RollupStats.merge(right, left), values, weights)
+
+
+def test_merge_with_empty_is_identity():
+    s = stats_of([1.0, 2.0])
+    assert RollupStats.merge(s, RollupStats.empty()) == s
+    assert RollupStats.merge(RollupStats.empty(), s) == s
+
+
+def test_remove_inverts_merge():
+    values = [0.5, -0.2, 1.3, 0.9, 0.1]
+    weights = [3, 7, 2, 5, 4]
+    whole = stats_of(values, weights)
+
+    rest = RollupStats.remove(whole, RollupStats.from_value(0.9, 5))
+
+    assert_matches(rest, [0.5, -0.2, 1.3, 0.1], [3, 7, 2, 4])
+
+
+def test_remove_extreme_needs_rebuild_unless_bounds_allowed():
+    whole = stats_of([0.5, -0.2, 1.3])
+    top = RollupStats.from_value(1.3, 1)
+
+    assert RollupStats.remove(whole, top) is None
+
+    bounded = RollupStats.remove(whole, top, exact_extremes=False)
+    assert bounded["count"] == 2
+    assert bounded["mean"] == pytest.approx(0.15)
+    assert bounded["max"] == 1.3
+
+
+def test_remove_everything_and_too_much():
+    whole = stats_of([0.5, -0.2])
+    assert RollupStats.remove(whole, whole) == RollupStats.empty()
+    assert RollupStats.remove(stats_of([0.5]), whole) is None
+
+
+def test_replace_interior_run_matches_rebuild():
+    runs = [run(0.1), run(0.4, sharpe=2.0), run(-0.3, sharpe=-1.0)]
+    parent = RollupStats.combine(runs)
+
+    new = run(0.2, sharpe=0.5)
+    swapped = RollupStats.replace(parent, runs[0], new)
+    rebuilt = RollupStats.combine([new, runs[1], runs[2]])
+
+    for name in RollupStats.METRICS:
+        assert swapped[name]["mean"] == pytest.approx(rebuilt[name]["mean"])
+        assert swapped[name]["m2"] == pytest.approx(rebuilt[name]["m2"], abs=1e-12)
+    assert RollupStats.summary(swapped) == pytest.approx(RollupStats.summary(rebuilt))
+
+
+def test_replace_ignores_extremes_of_untracked_metrics():
+    # run 0 holds the sharpe and log_growth extremes, not the expectancy ones
+    runs = [run(0.2, log_growth=5.0, sharpe=9.0), run(0.4), run(-0.3)]
+    parent = RollupStats.combine(runs)
+
+    swapped = RollupStats.replace(parent, runs[0], run(0.1))
+
+    assert swapped is not None
+    assert RollupStats.summary(swapped) == pytest.approx(
+        RollupStats.summary(RollupStats.combine([run(0.1), runs[1], runs[2]]))
+    )
+
+
+def test_replace_extreme_holder_keeps_fast_path_when_new_value_still_bounds():
+    runs = [run(0.9), run(0.4), run(-0.3)]
+    parent = RollupStats.combine(runs)
+
+    # best run improves: the new max is exact
+    swapped = RollupStats.replace(parent, runs[0], run(1.2))
+    assert swapped["expectancy_R"]["max"] == 1.2
+    assert swapped["expectancy_R"]["min"] == -0.3
+
+    # best run drops below the others: the new max is unknown
+    assert RollupStats.replace(parent, runs[0], run(0.0)) is None
+
+
+def test_replace_new_child_only_merges():
+    runs = [run(0.1), run(0.4)]
+    parent = RollupStats.combine(runs)
+
+    added = RollupStats.replace(parent, None, run(-0.5))
+
+    assert added["expectancy_R"]["count"] == 3
+    assert added["expectancy_R"]["min"] == -0.5
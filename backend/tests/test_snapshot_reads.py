@@ -0,0 +1,121 @@
+import json
+import threading
+import uuid
+
+import pytest
+from fastapi import HTTPException
+
+from edge_lab.analytics.hierarchy_compute import HierarchyComputeService
+from edge_lab.api.routes import runs
+from edge_lab.persistence.models import Run, Variant
+from edge_lab.services.dirty_propagation import DirtyPropagationService
+from edge_lab.services.snapshot_reads import SnapshotReadService
+
+
+def read(db, user, run, **kwargs):
+    return runs.get_analytics(
+        str(run.id),
+        revalidate=kwargs.get("revalidate", False),
+        wait=kwargs.get("wait", 0.0),
+        resolution=kwargs.get("resolution"),
+        if_none_match=kwargs.get("if_none_match"),
+        db=db,
+        current_user=user,
+    )
+
+
+@pytest.fixture
+def computed(db, build_tree):
+    user, _ = build_tree(1, 1, 3, trades=30)
+    run = db.query(Run).filter(Run.user_id == user.id).first()
+    HierarchyComputeService.compute_run(str(run.id), db, user)
+    return user, run
+
+
+def test_etag_round_trip_returns_304(db, computed):
+    user, run = computed
+
+    first = read(db, user, run)
+    assert first.status_code == 200
+    assert json.loads(first.body)["stale"] is False
+
+    again = read(db, user, run, if_none_match=first.headers["etag"])
+    assert again.status_code == 304
+    assert again.headers["etag"] == first.headers["etag"]
+
+
+def test_section_staleness_is_reported_per_section(db, computed):
+    user, run = computed
+
+    DirtyPropagationService.from_trades(db, user.id, [run.id])
+    db.commit()
+    HierarchyComputeService.compute_run(str(run.id), db, user, sections=("metrics", "equity"))
+
+    body = json.loads(read(db, user, run).body)
+    assert body["stale"] is True
+    assert body["stale_sections"] == ["walk_forward", "monte_carlo", "risk_of_ruin", "regime", "kelly"]
+
+    HierarchyComputeService.compute_run(str(run.id), db, user)
+    body = json.loads(read(db, user, run).body)
+    assert body["stale"] is False
+    assert body["stale_sections"] == []
+
+
+def test_long_poll_times_out_with_304(db, computed, monkeypatch):
+    user, run = computed
+    monkeypatch.setattr(SnapshotReadService, "LONG_POLL_INTERVAL_SECONDS", 0.01)
+
+    etag = read(db, user, run).headers["etag"]
+    response = read(db, user, run, if_none_match=etag, wait=0.05)
+
+    assert response.status_code == 304
+
+
+def test_long_poll_over_the_waiter_cap_gets_429(db, computed, monkeypatch):
+    user, run = computed
+    monkeypatch.setattr(SnapshotReadService, "_waiters", threading.BoundedSemaphore(1))
+    SnapshotReadService._waiters.acquire()
+
+    etag = read(db, user, run).headers["etag"]
+    with pytest.raises(HTTPException) as e:
+        read(db, user, run, if_none_match=etag, wait=1.0)
+
+    assert e.value.status_code == 429
+
+
+def test_batch_projects_fields_and_reports_not_found(db, computed):
+    user, run = computed
+    variant = db.query(Variant).filter(Variant.user_id == user.id).one()
+    missing = str(uuid.uuid4())
+
+    batch = SnapshotReadService.read_batch(
+        db,
+        user,
+        "run",
+        ids=[str(run.id), missing],
+        fields=["expectancy_R", "total_trades"],
+    )
+
+    [item] = batch["items"]
+    assert batch["not_found"] == [missing]
+    assert item["computed"] is True and item["stale"] is False
+    assert set(item["metrics"]) == {"expectancy_R", "total_trades"}
+    assert item["metrics"]["total_trades"] == 30
+
+    children = SnapshotReadService.read_batch(db, user, "run", parent_id=str(variant.id))
+    by_id = {item["id"]: item for item in children["items"]}
+    assert len(by_id) == 3
+    assert by_id[run.id]["metrics"]["total_trades"] == 30
+    assert sum(not item["computed"] for item in by_id.values()) == 2
+
+
+def test_batch_rejects_bad_input(db, computed):
+    user, run = computed
+
+    for kwargs in (
+        {"ids": [str(run.id)], "parent_id": str(run.variant_id)},
+        {"ids": [str(run.id)], "fields": ["bad field"]},
+        {"ids": ["not-a-uuid"]},
+    ):
+        with pytest.raises(ValueError):
+            SnapshotReadService.read_batch(db, user, "run", **kwargs)
@@ -0,0 +1,108 @@
+import json
+from datetime import datetime
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from edge_lab.persistence.models import Run, Trade
+from edge_lab.services import trade_listing
+from edge_lab.services.trade_listing import TradeListingService
+
+
+def all_pages(db, user_id, limit, **filters):
+    ids, cursor = [], None
+    while True:
+        stmt = TradeListingService.query(user_id, cursor=cursor, **filters)
+        page = TradeListingService.page(db, stmt, limit)
+        ids.extend(item["id"] for item in page["items"])
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return ids
+
+
+def ordered_ids(db, user_id):
+    return [
+        trade_id
+        for (trade_id,) in db.query(Trade.id)
+        .filter(Trade.user_id == user_id)
+        .order_by(Trade.timestamp, Trade.id)
+    ]
+
+
+def test_pages_cover_every_trade_once_in_order(db, build_tree):
+    # runs share timestamps, so ties are broken by id across pages
+    user, _ = build_tree(1, 1, 3, trades=25)
+
+    assert all_pages(db, user.id, limit=7) == ordered_ids(db, user.id)
+
+
+def test_cursor_is_stable_under_inserts_before_it(db, build_tree):
+    user, _ = build_tree(1, 1, 2, trades=20)
+    expected = ordered_ids(db, user.id)
+
+    first = TradeListingService.page(db, TradeListingService.query(user.id), 10)
+    assert [item["id"] for item in first["items"]] == expected[:10]
+
+    run = db.query(Run).filter(Run.user_id == user.id).first()
+    db.add(Trade(
+        user_id=user.id,
+        run_id=run.id,
+        entry_price=100.0,
+        exit_price=101.0,
+        stop_loss=99.0,
+        size=1.0,
+        direction="long",
+        timestamp=datetime(2025, 1, 1),
+        raw_return=0.01,
+        log_return=0.00995,
+        r_multiple=1.0,
+        is_win=True,
+    ))
+    db.commit()
+
+    rest = []
+    cursor = first["next_cursor"]
+    while cursor is not None:
+        page = TradeListingService.page(db, TradeListingService.query(user.id, cursor=cursor), 10)
+        rest.extend(item["id"] for item in page["items"])
+        cursor = page["next_cursor"]
+
+    assert rest == expected[10:]
+
+
+def test_filters_apply_to_every_page(db, build_tree):
+    user, _ = build_tree(1, 1, 2, trades=20)
+    run = db.query(Run).filter(Run.user_id == user.id).first()
+
+    ids = all_pages(db, user.id, limit=6, run_id=run.id)
+
+    assert len(ids) == 20
+    assert {r for (r,) in db.query(Trade.run_id).filter(Trade.id.in_(ids))} == {run.id}
+
+
+def test_bad_cursor_and_limit_raise(db, build_tree):
+    user, _ = build_tree()
+
+    with pytest.raises(ValueError):
+        TradeListingService.query(user.id, cursor="not-a-cursor")
+    with pytest.raises(ValueError):
+        TradeListingService.page(db, TradeListingService.query(user.id), TradeListingService.MAX_LIMIT + 1)
+    with pytest.raises(ValueError):
+        TradeListingService.respond(db, TradeListingService.query(user.id), "ndjson", None, 10)
+
+
+@pytest.mark.parametrize("fmt", ["json", "ndjson"])
+def test_stream_returns_every_row_in_order(db, build_tree, monkeypatch, fmt):
+    user, _ = build_tree(1, 1, 2, trades=15)
+    monkeypatch.setattr(trade_listing, "SessionLocal", sessionmaker(bind=db.get_bind()))
+    monkeypatch.setattr(TradeListingService, "STREAM_BATCH_ROWS", 4)
+
+    body = "".join(TradeListingService.stream(TradeListingService.query(user.id), fmt))
+
+    if fmt == "json":
+        rows = json.loads(body)
+    else:
+        rows = [json.loads(line) for line in body.splitlines()]
+
+    assert [row["id"] for row in rows] == [str(i) for i in ordered_ids(db, user.id)]
+    assert set(rows[0]) == set(TradeListingService.COLUMNS)